@@ -84,6 +84,7 @@ def create_test_data(request):
     
     from hotels.models import Hotel
     from messaging.models import Message
+    from messaging.conversations import envoyer_message
     
     try:
         # Récupérer l'admin
@@ -106,8 +107,6 @@ def create_test_data(request):
             user_test = User.objects.get(email='user@test.com')
         
         # Créer des hôtels de test
-        hotels_created = []
-        
         hotels_data = [
             {
                 'nom': 'Hôtel du Lac',
@@ -151,19 +150,24 @@ def create_test_data(request):
             }
         ]
         
-        for hotel_data in hotels_data:
-            if not Hotel.objects.filter(email=hotel_data['email']).exists():
-                hotel = Hotel.objects.create(
-                    created_by=admin,
-                    **hotel_data
-                )
-                hotels_created.append(hotel.nom)
+        # Une seule requête pour les e-mails déjà présents, une pour l'insertion
+        existants = set(
+            Hotel.objects.filter(
+                email__in=[hotel_data['email'] for hotel_data in hotels_data]
+            ).values_list('email', flat=True)
+        )
+        nouveaux = Hotel.objects.bulk_create([
+            Hotel(created_by=admin, **hotel_data)
+            for hotel_data in hotels_data
+            if hotel_data['email'] not in existants
+        ])
+        hotels_created = [hotel.nom for hotel in nouveaux]
         
         # Créer un message de test
         if not Message.objects.filter(expediteur=admin, destinataire=user_test).exists():
-            Message.objects.create(
-                expediteur=admin,
-                destinataire=user_test,
+            envoyer_message(
+                admin,
+                user_test,
                 sujet='Bienvenue sur RED Product',
                 contenu='Bienvenue sur la plateforme RED Product ! N\'hésitez pas à explorer toutes les fonctionnalités.'
             )
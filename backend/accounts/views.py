@@ -5,7 +5,7 @@ from rest_framework.decorators import api_view, permission_classes
 from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework_simplejwt.views import TokenObtainPairView
 from django.contrib.auth import get_user_model
-from django.db.models import Count, Avg
+from django.db.models import Count
 from accounts.serializers import (
     RegisterSerializer, 
     UserSerializer, 
@@ -14,6 +14,8 @@ from accounts.serializers import (
     PasswordResetRequestSerializer
 )
 from hotels.models import Hotel
+from hotels.stats import statistiques_catalogue
+from red_product.sparse import SparseQuerysetMixin
 
 User = get_user_model()
 
@@ -156,7 +158,7 @@ class LogoutView(APIView):
             }, status=status.HTTP_400_BAD_REQUEST)
 
 
-class UserListView(generics.ListAPIView):
+class UserListView(SparseQuerysetMixin, generics.ListAPIView):
     """
     API endpoint pour lister tous les utilisateurs (admin uniquement)
     """
@@ -183,27 +185,22 @@ def dashboard_stats(request):
     admin_users = User.objects.filter(is_admin=True).count()
     regular_users = total_users - admin_users
     
-    # Compter les hôtels
-    total_hotels = Hotel.objects.count()
-    hotels_by_devise = {
-        'XOF': Hotel.objects.filter(devise='XOF').count(),
-        'EUR': Hotel.objects.filter(devise='EUR').count(),
-        'USD': Hotel.objects.filter(devise='USD').count(),
-    }
+    # Compter les hôtels (table de résumé maintenue par trigger)
+    catalogue = statistiques_catalogue()
+    total_hotels = catalogue['total_hotels']
+    hotels_by_devise = catalogue['hotels_par_devise']
     
     # Prix moyen des hôtels
-    avg_price = Hotel.objects.aggregate(avg_prix=Avg('prix_par_nuit'))['avg_prix'] or 0
+    avg_price = catalogue['prix_moyen'] or 0
     
-    # Statistiques des messages
-    from messaging.models import Message
-    from django.db.models import Q
+    # Statistiques des messages (compteurs de la boîte, lus par clé primaire)
+    from messaging.stats import statistiques_boite
     
-    total_messages_recus = Message.objects.filter(destinataire=request.user).count()
-    total_messages_envoyes = Message.objects.filter(expediteur=request.user).count()
-    messages_non_lus = Message.objects.filter(destinataire=request.user, status='sent').count()
-    total_messages = Message.objects.filter(
-        Q(expediteur=request.user) | Q(destinataire=request.user)
-    ).distinct().count()
+    boite = statistiques_boite(request.user)
+    total_messages_recus = boite['total_recus']
+    total_messages_envoyes = boite['total_envoyes']
+    messages_non_lus = boite['non_lus']
+    total_messages = boite['total']
     
     # Statistiques par utilisateur (pour l'admin)
     user_stats = []
@@ -1,6 +1,6 @@
 # hotels/admin.py
 from django.contrib import admin
-from hotels.models import Hotel
+from hotels.models import Hotel, TauxDeChange, TypeChambre
 
 @admin.register(Hotel)
 class HotelAdmin(admin.ModelAdmin):
@@ -29,4 +29,22 @@ class HotelAdmin(admin.ModelAdmin):
     def save_model(self, request, obj, form, change):
         if not change:
             obj.created_by = request.user
-        super().save_model(request, obj, form, change)
\ No newline at end of file
+        super().save_model(request, obj, form, change)
+
+
+@admin.register(TauxDeChange)
+class TauxDeChangeAdmin(admin.ModelAdmin):
+    list_display = ['devise', 'taux', 'updated_at']
+    readonly_fields = ['updated_at']
+    
+    def has_delete_permission(self, request, obj=None):
+        # Chaque devise du catalogue doit garder un taux (trigger prix_reference)
+        return False
+
+
+@admin.register(TypeChambre)
+class TypeChambreAdmin(admin.ModelAdmin):
+    list_display = ['nom', 'hotel', 'capacite', 'nombre', 'updated_at']
+    search_fields = ['nom', 'hotel__nom']
+    raw_id_fields = ['hotel']
+    readonly_fields = ['created_at', 'updated_at']
@@ -4,4 +4,6 @@ from django.apps import AppConfig
 class HotelsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'hotels'
-    verbose_name = 'Gestion des hôtels'
\ No newline at end of file
+    verbose_name = 'Gestion des hôtels'
+    def ready(self):
+        import hotels.signals  # noqa: F401
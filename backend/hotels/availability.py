@@ -0,0 +1,167 @@
+"""
+Disponibilité des chambres: calendrier compact par type de chambre.
+
+Chaque type de chambre a, par année civile, une ligne CalendrierChambre:
+- `occupation`: tableau de 366 compteurs (chambres prises chaque nuit)
+- `complet`: bitset `bit(366)`, 1 quand plus aucune chambre n'est libre
+
+La recherche ne lit que `complet`: un séjour est un masque de nuits, et
+« au moins une nuit complète » est un ET binaire comparé à zéro, par année
+touchée (deux au plus pour un séjour à cheval sur le 31 décembre). Un
+séjour de 30 nuits coûte donc une ou deux opérations binaires par type de
+chambre, au lieu d'une jointure sur 30 lignes de nuitées.
+
+Les compteurs ne changent que par `reserver` / `liberer`, qui tiennent les
+deux colonnes cohérentes sous verrou du type de chambre.
+"""
+import datetime
+from functools import reduce
+from operator import or_
+
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Q
+
+from hotels.facets import invalider_facettes
+from hotels.models import JOURS_PAR_AN, CalendrierChambre, TypeChambre
+
+
+# Durée maximale d'un séjour recherché ou réservé
+NUITS_MAX = 365
+
+
+class ChambresIndisponibles(Exception):
+    """Pas assez de chambres libres sur une partie du séjour"""
+
+    def __init__(self, nuits):
+        self.nuits = nuits
+        super().__init__(
+            'Complet les nuits du ' + ', '.join(nuit.isoformat() for nuit in nuits[:5])
+            + ('…' if len(nuits) > 5 else '')
+        )
+
+
+def indice(jour):
+    """Position d'une nuit dans le calendrier de son année (1er janvier: 0)"""
+    return jour.timetuple().tm_yday - 1
+
+
+def segments(arrivee, depart):
+    """
+    Nuits du séjour [arrivee, depart[ découpées par année:
+    [(annee, premier indice, indice de fin exclu)]
+    """
+    resultat = []
+    debut = arrivee
+    while debut < depart:
+        fin = min(depart, datetime.date(debut.year + 1, 1, 1))
+        resultat.append((debut.year, indice(debut), indice(fin - datetime.timedelta(days=1)) + 1))
+        debut = fin
+    return resultat
+
+
+def masque(debut, fin):
+    """Bitset des nuits [debut, fin[ d'une année, au format de JoursField"""
+    return '0' * debut + '1' * (fin - debut) + '0' * (JOURS_PAR_AN - fin)
+
+
+def bits_complet(occupation, nombre):
+    """Colonne `complet` d'après les compteurs et le nombre de chambres du type"""
+    return ''.join('1' if prises >= nombre else '0' for prises in occupation)
+
+
+def filtre_disponibilite(arrivee, depart, personnes=1):
+    """
+    Condition sur Hotel: au moins un type de chambre pour `personnes`
+    libre toutes les nuits du séjour (une année sans calendrier est libre)
+    """
+    nuits_completes = reduce(or_, [
+        Q(annee=annee, complet__chevauche=masque(debut, fin))
+        for annee, debut, fin in segments(arrivee, depart)
+    ])
+    return Exists(
+        TypeChambre.objects.filter(
+            hotel=OuterRef('pk'), capacite__gte=personnes, nombre__gt=0,
+        ).filter(
+            ~Exists(CalendrierChambre.objects.filter(nuits_completes, type_chambre=OuterRef('pk')))
+        )
+    )
+
+
+def _calendriers(type_chambre, annees):
+    """Calendriers des années demandées, créés vides au besoin (type déjà verrouillé)"""
+    existants = {
+        calendrier.annee: calendrier
+        for calendrier in CalendrierChambre.objects.filter(type_chambre=type_chambre, annee__in=annees)
+    }
+    for annee in annees:
+        if annee not in existants:
+            existants[annee] = CalendrierChambre.objects.create(
+                type_chambre=type_chambre,
+                annee=annee,
+                occupation=[0] * JOURS_PAR_AN,
+                complet=bits_complet([0] * JOURS_PAR_AN, type_chambre.nombre),
+            )
+    return existants
+
+
+def _ajuster(type_chambre_id, arrivee, depart, delta):
+    with transaction.atomic():
+        # Toutes les écritures d'un type passent par ce verrou
+        type_chambre = TypeChambre.objects.select_for_update().get(pk=type_chambre_id)
+        decoupage = segments(arrivee, depart)
+        calendriers = _calendriers(type_chambre, [annee for annee, _, _ in decoupage])
+
+        refusees = []
+        for annee, debut, fin in decoupage:
+            occupation = calendriers[annee].occupation
+            for position in range(debut, fin):
+                prises = occupation[position] + delta
+                if not 0 <= prises <= type_chambre.nombre:
+                    refusees.append(datetime.date(annee, 1, 1) + datetime.timedelta(days=position))
+                occupation[position] = max(prises, 0)
+        if refusees and delta > 0:
+            raise ChambresIndisponibles(refusees)
+
+        for calendrier in calendriers.values():
+            calendrier.complet = bits_complet(calendrier.occupation, type_chambre.nombre)
+        CalendrierChambre.objects.bulk_update(calendriers.values(), ['occupation', 'complet'])
+        # Les facettes des recherches par dates en dépendent
+        transaction.on_commit(invalider_facettes)
+
+
+def reserver(type_chambre_id, arrivee, depart, nombre=1):
+    """Prendre `nombre` chambres du type pour le séjour, ou ChambresIndisponibles"""
+    _ajuster(type_chambre_id, arrivee, depart, nombre)
+
+
+def liberer(type_chambre_id, arrivee, depart, nombre=1):
+    """Rendre `nombre` chambres du type pour le séjour (sans descendre sous zéro)"""
+    _ajuster(type_chambre_id, arrivee, depart, -nombre)
+
+
+def recalculer_complet(type_chambre):
+    """Recalculer `complet` après un changement du nombre de chambres du type"""
+    calendriers = list(CalendrierChambre.objects.filter(type_chambre=type_chambre))
+    for calendrier in calendriers:
+        calendrier.complet = bits_complet(calendrier.occupation, type_chambre.nombre)
+    CalendrierChambre.objects.bulk_update(calendriers, ['complet'])
+
+
+def disponibilites(type_chambre, arrivee, depart):
+    """Chambres libres nuit par nuit: [{'date', 'libres'}]"""
+    decoupage = segments(arrivee, depart)
+    occupations = dict(
+        CalendrierChambre.objects.filter(
+            type_chambre=type_chambre, annee__in=[annee for annee, _, _ in decoupage],
+        ).values_list('annee', 'occupation')
+    )
+    resultat = []
+    for annee, debut, fin in decoupage:
+        occupation = occupations.get(annee)
+        for position in range(debut, fin):
+            prises = occupation[position] if occupation else 0
+            resultat.append({
+                'date': datetime.date(annee, 1, 1) + datetime.timedelta(days=position),
+                'libres': max(type_chambre.nombre - prises, 0),
+            })
+    return resultat
@@ -0,0 +1,189 @@
+"""
+Création, modification et suppression d'hôtels en masse.
+
+Chaque élément est validé avec les règles de HotelSerializer; les éléments
+valides sont écrits par lots (bulk_create / bulk_update / delete), un lot
+par transaction. bulk_create / bulk_update n'émettent pas de signaux: le
+géocodage des hôtels sans position ou dont l'adresse change est planifié
+ici, par lot validé. Le résultat est une liste alignée sur l'envoi:
+`{'index': i, 'id': ...}` en cas de succès, `{'index': i, 'erreurs': {...}}`
+sinon.
+"""
+from django.conf import settings
+from django.db import DatabaseError, transaction
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+
+from hotels.geo import geocoder_hotels
+from hotels.models import Hotel
+from hotels.serializers import HotelBulkSerializer
+from red_product.tasks import run_in_background
+
+
+# Nombre d'hôtels écrits par transaction
+TAILLE_LOT = getattr(settings, 'HOTEL_BULK_CHUNK_SIZE', 500)
+
+# Nombre maximal d'éléments acceptés par requête
+MAX_ELEMENTS = getattr(settings, 'HOTEL_BULK_MAX_ITEMS', 5000)
+
+
+def _lots(elements, taille=TAILLE_LOT):
+    for debut in range(0, len(elements), taille):
+        yield elements[debut:debut + taille]
+
+
+def _erreur(index, erreurs):
+    return {'index': index, 'erreurs': erreurs}
+
+
+def _erreur_lot(lot, resultats, exc):
+    """Un lot rejeté par la base: tous ses éléments sont en échec"""
+    for index, _ in lot:
+        resultats[index] = _erreur(index, {'non_field_errors': [f"Erreur d'enregistrement: {exc}"]})
+
+
+def _identifiant(element):
+    """Id d'un élément (`12` ou `{"id": 12, ...}`), None s'il est invalide"""
+    valeur = element.get('id') if isinstance(element, dict) else element
+    if isinstance(valeur, bool):
+        return None
+    try:
+        return int(valeur)
+    except (TypeError, ValueError):
+        return None
+
+
+def creer_en_masse(elements, utilisateur, context=None):
+    """Créer les hôtels valides de `elements` au nom de `utilisateur`"""
+    serializer = HotelBulkSerializer(context=context or {})
+    resultats = [None] * len(elements)
+    
+    a_creer = []
+    for index, element in enumerate(elements):
+        try:
+            donnees = serializer.run_validation(element)
+        except ValidationError as exc:
+            resultats[index] = _erreur(index, exc.detail)
+            continue
+        a_creer.append((index, Hotel(created_by=utilisateur, **donnees)))
+    
+    for lot in _lots(a_creer):
+        try:
+            with transaction.atomic():
+                Hotel.objects.bulk_create([hotel for _, hotel in lot])
+                a_localiser = [
+                    hotel.pk for _, hotel in lot if hotel.latitude is None or hotel.longitude is None
+                ]
+                if a_localiser:
+                    run_in_background(geocoder_hotels, a_localiser)
+        except DatabaseError as exc:
+            _erreur_lot(lot, resultats, exc)
+            continue
+        for index, hotel in lot:
+            resultats[index] = {'index': index, 'id': hotel.pk}
+    
+    return resultats
+
+
+def modifier_en_masse(elements, context=None):
+    """Modifier partiellement les hôtels désignés par l'`id` de chaque élément"""
+    serializer = HotelBulkSerializer(context=context or {}, partial=True)
+    resultats = [None] * len(elements)
+    
+    a_modifier = []
+    vus = set()
+    for index, element in enumerate(elements):
+        pk = _identifiant(element) if isinstance(element, dict) else None
+        if pk is None:
+            resultats[index] = _erreur(index, {'id': ["Un id d'hôtel valide est requis."]})
+            continue
+        if pk in vus:
+            resultats[index] = _erreur(index, {'id': ['Hôtel présent plusieurs fois dans la requête.']})
+            continue
+        vus.add(pk)
+        try:
+            donnees = serializer.run_validation(element)
+        except ValidationError as exc:
+            resultats[index] = _erreur(index, exc.detail)
+            continue
+        a_modifier.append((index, pk, donnees))
+    
+    for lot in _lots(a_modifier):
+        try:
+            with transaction.atomic():
+                hotels = Hotel.objects.select_for_update().defer('search_vector').in_bulk(
+                    [pk for _, pk, _ in lot]
+                )
+                maintenant = timezone.now()
+                # Un bulk_update par combinaison de champs: un champ absent de
+                # l'envoi n'est jamais réécrit avec la valeur lue
+                groupes = {}
+                a_localiser = []
+                for index, pk, donnees in lot:
+                    hotel = hotels.get(pk)
+                    if hotel is None:
+                        resultats[index] = _erreur(index, {'id': ['Hôtel introuvable.']})
+                        continue
+                    deplace = 'adresse' in donnees and donnees['adresse'] != hotel.adresse
+                    for champ, valeur in donnees.items():
+                        setattr(hotel, champ, valeur)
+                    champs = set(donnees)
+                    # Nouvelle adresse sans nouvelles coordonnées: la position
+                    # enregistrée est périmée (comme planifier_geocodage)
+                    if deplace and not {'latitude', 'longitude'} & champs:
+                        hotel.latitude = hotel.longitude = hotel.geohash = None
+                        champs |= {'latitude', 'longitude', 'geohash'}
+                    if 'adresse' in donnees and (hotel.latitude is None or hotel.longitude is None):
+                        a_localiser.append(pk)
+                    # bulk_update n'applique pas auto_now
+                    hotel.updated_at = maintenant
+                    champs = tuple(sorted(champs)) + ('updated_at',)
+                    groupes.setdefault(champs, []).append((index, hotel))
+                for champs, modifies in groupes.items():
+                    Hotel.objects.bulk_update([hotel for _, hotel in modifies], champs)
+                if a_localiser:
+                    run_in_background(geocoder_hotels, a_localiser)
+        except DatabaseError as exc:
+            _erreur_lot([(index, None) for index, _, _ in lot], resultats, exc)
+            continue
+        for modifies in groupes.values():
+            for index, hotel in modifies:
+                resultats[index] = {'index': index, 'id': hotel.pk}
+    
+    return resultats
+
+
+def supprimer_en_masse(elements):
+    """Supprimer les hôtels désignés par `elements` (ids ou objets avec `id`)"""
+    resultats = [None] * len(elements)
+    
+    a_supprimer = []
+    for index, element in enumerate(elements):
+        pk = _identifiant(element)
+        if pk is None:
+            resultats[index] = _erreur(index, {'id': ["Un id d'hôtel valide est requis."]})
+            continue
+        a_supprimer.append((index, pk))
+    
+    for lot in _lots(a_supprimer):
+        try:
+            with transaction.atomic():
+                existants = set(
+                    Hotel.objects.select_for_update()
+                    .filter(pk__in=[pk for _, pk in lot])
+                    .values_list('id', flat=True)
+                )
+                # delete() passe par le collecteur: les signaux post_delete
+                # (références des photos) restent appliqués
+                Hotel.objects.filter(pk__in=existants).delete()
+        except DatabaseError as exc:
+            _erreur_lot(lot, resultats, exc)
+            continue
+        for index, pk in lot:
+            if pk in existants:
+                resultats[index] = {'index': index, 'id': pk}
+                existants.discard(pk)
+            else:
+                resultats[index] = _erreur(index, {'id': ['Hôtel introuvable.']})
+    
+    return resultats
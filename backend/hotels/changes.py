@@ -0,0 +1,164 @@
+"""
+Flux de modifications du catalogue: `GET /api/hotels/changes/?since=<jeton>`.
+
+Un client garde une copie locale des hôtels et ne demande que ce qui a
+changé depuis son dernier jeton:
+- les hôtels créés ou modifiés, par (txid, id) croissants (index
+  hotels_txid_idx: seules les lignes modifiées sont lues)
+- les identifiants supprimés, lus dans le journal hotel_deletions
+  (trigger de la migration 0011, index hotel_deletions_txid_idx)
+
+Le jeton est opaque pour le client: position atteinte dans chacun des deux
+flux. Sans jeton, le premier appel renvoie tout le catalogue, par pages.
+
+Les positions sont des identifiants de transaction (txid, posés par les
+triggers de la migration 0012), pas des dates: une écriture n'est visible
+qu'à la validation de sa transaction, quelle que soit sa durée (import CSV,
+recalcul des prix). Le flux ne lit que les transactions antérieures à la
+plus ancienne encore en cours (xmin de l'instantané courant): toutes sont
+terminées, et toute écriture à venir aura un txid supérieur. Une
+transaction longue retarde donc le flux sans qu'aucune ligne soit manquée.
+
+Le journal des suppressions est purgé au-delà de RETENTION: un jeton plus
+ancien est refusé (410), le client doit tout recharger.
+"""
+import base64
+import datetime
+import json
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q
+from django.utils import timezone
+
+from hotels.models import HotelSupprime
+
+
+# Durée de validité d'un jeton
+RETENTION = datetime.timedelta(days=getattr(settings, 'HOTEL_CHANGES_RETENTION_DAYS', 30))
+
+# Conservation des suppressions au-delà de RETENTION: une suppression
+# encore en cours à l'émission d'un jeton reste lisible par celui-ci
+MARGE_PURGE = datetime.timedelta(days=1)
+
+LIMITE_DEFAUT = 500
+LIMITE_MAX = 1000
+
+
+class JetonInvalide(ValueError):
+    pass
+
+
+class JetonExpire(Exception):
+    pass
+
+
+def encoder_jeton(modifies, supprimes, emission):
+    """Jeton opaque: positions (txid, id) dans les deux flux, date d'émission"""
+    data = {
+        'u': list(modifies) if modifies else None,
+        'd': list(supprimes),
+        't': emission.isoformat(),
+    }
+    return base64.urlsafe_b64encode(
+        json.dumps(data, separators=(',', ':')).encode('utf-8')
+    ).decode('ascii').rstrip('=')
+
+
+def _position(valeur):
+    txid, identifiant = valeur
+    return int(txid), int(identifiant)
+
+
+def decoder_jeton(jeton):
+    """(position des modifications ou None, position des suppressions)"""
+    try:
+        padding = '=' * (-len(jeton) % 4)
+        data = json.loads(base64.urlsafe_b64decode(jeton + padding).decode('utf-8'))
+        # Jeton à positions datées (avant la migration 0012): à recharger
+        emission = datetime.datetime.fromisoformat(data['t']) if 't' in data else None
+        if emission is not None:
+            if timezone.is_naive(emission):
+                raise ValueError
+            modifies = _position(data['u']) if data['u'] is not None else None
+            supprimes = _position(data['d'])
+    except (TypeError, ValueError, KeyError, UnicodeDecodeError):
+        raise JetonInvalide('Jeton de synchronisation invalide')
+    if emission is None or emission < timezone.now() - RETENTION:
+        raise JetonExpire(
+            'Jeton expiré: les suppressions de cette période ne sont plus '
+            'connues, recharger le catalogue complet (sans since)'
+        )
+    return modifies, supprimes
+
+
+def borne_transactions():
+    """Plus ancienne transaction en cours: celles d'avant sont toutes terminées"""
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT pg_snapshot_xmin(pg_current_snapshot())::text::bigint')
+        return cursor.fetchone()[0]
+
+
+def _apres(champ, position):
+    valeur, identifiant = position
+    return Q(**{f'{champ}__gt': valeur}) | Q(**{champ: valeur, 'id__gt': identifiant})
+
+
+def modifications(queryset, jeton=None, limite=LIMITE_DEFAUT):
+    """
+    Changements depuis `jeton` (None: synchronisation complète).
+
+    Retourne (hôtels modifiés, ids supprimés, jeton suivant, reste-t-il des
+    changements). `queryset` fournit les lignes d'hôtels (colonnes, rendu);
+    il est trié et filtré ici.
+    """
+    emission = timezone.now()
+    borne = borne_transactions()
+    if jeton is None:
+        # Copie complète: seules comptent les suppressions à venir
+        position_modifies, position_supprimes = None, (borne, 0)
+    else:
+        position_modifies, position_supprimes = decoder_jeton(jeton)
+
+    hotels = queryset.filter(txid__lt=borne)
+    if position_modifies is not None:
+        hotels = hotels.filter(_apres('txid', position_modifies))
+    hotels = list(hotels.order_by('txid', 'id')[:limite + 1])
+
+    suppressions = list(
+        HotelSupprime.objects
+        .filter(_apres('txid', position_supprimes), txid__lt=borne)
+        .order_by('txid', 'id')
+        .values_list('txid', 'id', 'hotel_id')[:limite + 1]
+    )
+
+    plus = len(hotels) > limite or len(suppressions) > limite
+    hotels, suppressions = hotels[:limite], suppressions[:limite]
+
+    if hotels:
+        position_modifies = (hotels[-1].txid, hotels[-1].pk)
+    if suppressions:
+        position_supprimes = suppressions[-1][:2]
+    # Flux lu jusqu'à la borne: le jeton avance avec elle, toute écriture à
+    # venir ayant un txid supérieur
+    if len(hotels) < limite:
+        position_modifies = max(position_modifies or (0, 0), (borne, 0))
+    if len(suppressions) < limite:
+        position_supprimes = max(position_supprimes, (borne, 0))
+
+    return (
+        hotels,
+        [hotel_id for _, _, hotel_id in suppressions],
+        encoder_jeton(position_modifies, position_supprimes, emission),
+        plus,
+    )
+
+
+def purger_suppressions(avant=None):
+    """
+    Supprimer du journal les suppressions antérieures à `avant` (défaut:
+    rétention), moins MARGE_PURGE
+    """
+    avant = (avant or timezone.now() - RETENTION) - MARGE_PURGE
+    supprimees, _ = HotelSupprime.objects.filter(deleted_at__lt=avant).delete()
+    return supprimees
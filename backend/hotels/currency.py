@@ -0,0 +1,73 @@
+"""
+Conversion des prix dans la devise de référence (XOF).
+
+Le trigger hotels_prix_reference_update tient Hotel.prix_reference à jour à
+chaque écriture d'un hôtel. Quand un taux change, les hôtels de la devise
+sont recalculés ici, par lots d'id croissants et une transaction par lot,
+pour ne jamais verrouiller tout le catalogue d'un coup.
+"""
+import logging
+
+from django.conf import settings
+from django.db import connection, transaction
+
+
+logger = logging.getLogger(__name__)
+
+DEVISE_REFERENCE = 'XOF'
+
+# Hôtels recalculés par transaction
+TAILLE_LOT = getattr(settings, 'HOTEL_PRICE_RECOMPUTE_BATCH_SIZE', 5000)
+
+# updated_at change aussi: les ETags des listes (tri et filtres par prix) sont invalidés
+SQL_RECALCUL_LOT = """
+    WITH lot AS (
+        SELECT id FROM hotels
+        WHERE devise = %s AND id > %s
+        ORDER BY id
+        LIMIT %s
+    ), modifies AS (
+        UPDATE hotels AS h
+        SET prix_reference = round(h.prix_par_nuit * t.taux, 2),
+            updated_at = clock_timestamp()
+        FROM lot, exchange_rates AS t
+        WHERE h.id = lot.id
+          AND t.devise = h.devise
+          AND h.prix_reference <> round(h.prix_par_nuit * t.taux, 2)
+        RETURNING h.id
+    )
+    SELECT (SELECT max(id) FROM lot), (SELECT count(*) FROM modifies)
+"""
+
+
+def recalculer_prix_reference(devise=None, taille_lot=TAILLE_LOT):
+    """
+    Recalculer prix_reference des hôtels d'une devise (toutes si None).
+
+    Retourne le nombre d'hôtels dont le prix converti a changé.
+    """
+    from hotels.models import TauxDeChange
+
+    if devise is None:
+        devises = list(TauxDeChange.objects.values_list('devise', flat=True))
+    else:
+        devises = [devise]
+
+    total = 0
+    for code in devises:
+        dernier_id = 0
+        while True:
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.execute(SQL_RECALCUL_LOT, [code, dernier_id, taille_lot])
+                dernier_id, modifies = cursor.fetchone()
+            if dernier_id is None:
+                break
+            total += modifies
+        logger.info('Prix de référence recalculés pour %s', code)
+    if total:
+        # Les tranches de prix des facettes en cache sont périmées
+        from hotels.facets import invalider_facettes
+
+        invalider_facettes()
+    return total
+
@@ -0,0 +1,114 @@
+"""
+Export du catalogue d'hôtels en flux (CSV ou NDJSON).
+
+Les lignes sont lues par un curseur côté serveur (`iterator(chunk_size=...)`)
+sous forme de tuples, sans instancier de modèle ni de serializer, puis
+envoyées par paquets: la mémoire reste constante quelle que soit la taille
+de l'export et l'en-tête part avant même l'exécution de la requête.
+"""
+import csv
+import io
+import json
+from decimal import Decimal
+
+from django.conf import settings
+
+from hotels.models import Hotel
+
+
+# Lignes lues par aller-retour avec le curseur serveur, et envoyées par paquet
+TAILLE_LOT = getattr(settings, 'HOTEL_EXPORT_CHUNK_SIZE', 2000)
+
+# (colonne exportée, expression lue en base)
+COLONNES = [
+    ('id', 'id'),
+    ('nom', 'nom'),
+    ('adresse', 'adresse'),
+    ('latitude', 'latitude'),
+    ('longitude', 'longitude'),
+    ('email', 'email'),
+    ('telephone', 'telephone'),
+    ('prix_par_nuit', 'prix_par_nuit'),
+    ('devise', 'devise'),
+    ('image', 'image'),
+    ('created_by', 'created_by__email'),
+    ('created_at', 'created_at'),
+    ('updated_at', 'updated_at'),
+]
+
+FORMATS = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson',
+}
+
+
+def _lignes(queryset, request=None):
+    """Tuples des colonnes exportées, photo convertie en URL"""
+    storage = Hotel._meta.get_field('image').storage
+    position_image = [nom for nom, _ in COLONNES].index('image')
+
+    lignes = queryset.values_list(*[expression for _, expression in COLONNES])
+    for ligne in lignes.iterator(chunk_size=TAILLE_LOT):
+        url = None
+        if ligne[position_image]:
+            url = storage.url(ligne[position_image])
+            if request is not None:
+                url = request.build_absolute_uri(url)
+        yield ligne[:position_image] + (url,) + ligne[position_image + 1:]
+
+
+def _valeur_json(valeur):
+    # Mêmes représentations que l'API: décimaux en texte, dates ISO 8601
+    if isinstance(valeur, Decimal):
+        return str(valeur)
+    if hasattr(valeur, 'isoformat'):
+        return valeur.isoformat()
+    raise TypeError(f'{type(valeur).__name__} non sérialisable en JSON')
+
+
+def _paquets(lignes, ecrire):
+    """Regrouper les lignes formatées par `ecrire` en paquets de TAILLE_LOT"""
+    tampon = io.StringIO()
+    nombre = 0
+    for ligne in lignes:
+        ecrire(tampon, ligne)
+        nombre += 1
+        if nombre == TAILLE_LOT:
+            yield tampon.getvalue()
+            tampon = io.StringIO()
+            nombre = 0
+    if nombre:
+        yield tampon.getvalue()
+
+
+def exporter_csv(queryset, request=None):
+    """Générateur de texte CSV, en-tête compris"""
+    en_tete = io.StringIO()
+    csv.writer(en_tete).writerow([nom for nom, _ in COLONNES])
+    yield en_tete.getvalue()
+
+    def ecrire(tampon, ligne):
+        csv.writer(tampon).writerow(
+            valeur.isoformat() if hasattr(valeur, 'isoformat') else valeur
+            for valeur in ligne
+        )
+
+    yield from _paquets(_lignes(queryset, request), ecrire)
+
+
+def exporter_ndjson(queryset, request=None):
+    """Générateur NDJSON: un objet JSON par ligne"""
+    noms = [nom for nom, _ in COLONNES]
+    encodeur = json.JSONEncoder(ensure_ascii=False, default=_valeur_json)
+
+    def ecrire(tampon, ligne):
+        tampon.write(encodeur.encode(dict(zip(noms, ligne))))
+        tampon.write('\n')
+
+    yield from _paquets(_lignes(queryset, request), ecrire)
+
+
+EXPORTEURS = {
+    'csv': exporter_csv,
+    'ndjson': exporter_ndjson,
+}
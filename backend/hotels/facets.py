@@ -0,0 +1,124 @@
+"""
+Facettes de la recherche d'hôtels: nombre de résultats par devise et par
+tranche de prix, pour le jeu de filtres courant.
+
+Toutes les facettes sortent d'une seule requête `GROUPING SETS` sur le
+queryset filtré de la liste. Le résultat est mis en cache par signature
+normalisée des filtres; toute écriture sur le catalogue change la version
+du cache (`invalider_facettes`), l'expiration ne sert que de filet de
+sécurité entre processus.
+"""
+import hashlib
+import json
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+
+from hotels.currency import DEVISE_REFERENCE
+from hotels.models import Hotel
+
+
+DEVISES = [code for code, _ in Hotel.DEVISE_CHOICES]
+
+# Bornes des tranches de prix, en devise de référence (XOF)
+TRANCHES_PRIX = [
+    Decimal(borne) for borne in getattr(
+        settings, 'HOTEL_FACET_PRICE_BUCKETS', [10000, 25000, 50000, 100000, 200000]
+    )
+]
+
+DUREE_CACHE = getattr(settings, 'HOTEL_FACETS_CACHE_TIMEOUT', 300)
+
+CLE_VERSION = 'hotels:facettes:version'
+
+# Paramètres sans effet sur l'ensemble filtré (pagination, tri, rendu)
+PARAMETRES_IGNORES = {'cursor', 'page', 'page_size', 'pagination', 'ordering', 'format', 'facettes'}
+
+# width_bucket: 0 sous la première borne, i entre les bornes i et i+1,
+# len(bornes) au-delà de la dernière
+SQL_FACETTES = """
+    SELECT GROUPING(devise, tranche), devise, tranche, count(*)
+    FROM (
+        SELECT f.devise, width_bucket(f.prix_reference, %s::numeric[]) AS tranche
+        FROM ({}) AS f
+    ) AS r
+    GROUP BY GROUPING SETS ((devise), (tranche), ())
+"""
+
+
+def signature_filtres(params):
+    """
+    Signature stable des filtres d'une requête: ordre des paramètres,
+    valeurs vides, casse et espaces de la recherche sont sans effet.
+    """
+    filtres = {}
+    for nom in sorted(params):
+        if nom in PARAMETRES_IGNORES:
+            continue
+        valeurs = sorted(' '.join(valeur.split()) for valeur in params.getlist(nom))
+        valeurs = [valeur.lower() if nom == 'search' else valeur for valeur in valeurs if valeur]
+        if valeurs:
+            filtres[nom] = valeurs
+    return hashlib.md5(
+        json.dumps(filtres, ensure_ascii=False).encode(), usedforsecurity=False
+    ).hexdigest()
+
+
+def invalider_facettes():
+    """Rendre obsolètes toutes les facettes en cache (après écriture sur le catalogue)"""
+    try:
+        cache.incr(CLE_VERSION)
+    except ValueError:
+        # Clé absente (expirée, autre processus): toute valeur neuve convient
+        cache.set(CLE_VERSION, 1, None)
+
+
+def _version():
+    version = cache.get(CLE_VERSION)
+    if version is None:
+        cache.add(CLE_VERSION, 0, None)
+        version = cache.get(CLE_VERSION, 0)
+    return version
+
+
+def calculer_facettes(queryset):
+    """Facettes d'un queryset filtré, en une requête groupée"""
+    sous_requete, params = queryset.order_by().values('devise', 'prix_reference').query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(SQL_FACETTES.format(sous_requete), [TRANCHES_PRIX, *params])
+        lignes = cursor.fetchall()
+
+    total = 0
+    par_devise = dict.fromkeys(DEVISES, 0)
+    par_tranche = [0] * (len(TRANCHES_PRIX) + 1)
+    for groupement, devise, tranche, nombre in lignes:
+        # Bits de GROUPING(): 2 = devise agrégée, 1 = tranche agrégée
+        if groupement == 3:
+            total = nombre
+        elif groupement == 1:
+            par_devise[devise] = nombre
+        else:
+            par_tranche[tranche] = nombre
+
+    bornes = [None] + TRANCHES_PRIX + [None]
+    return {
+        'total': total,
+        'devise': par_devise,
+        'prix': [
+            {'min': bornes[i], 'max': bornes[i + 1], 'nombre': nombre}
+            for i, nombre in enumerate(par_tranche)
+        ],
+        'devise_prix': DEVISE_REFERENCE,
+    }
+
+
+def facettes(queryset, params):
+    """Facettes du queryset filtré, lues en cache si la signature `params` est connue"""
+    cle = f'hotels:facettes:{_version()}:{signature_filtres(params)}'
+    resultat = cache.get(cle)
+    if resultat is None:
+        resultat = calculer_facettes(queryset)
+        cache.set(cle, resultat, DUREE_CACHE)
+    return resultat
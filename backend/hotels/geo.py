@@ -0,0 +1,311 @@
+"""
+Recherche géographique sans PostGIS: geohash, rayon et rectangle.
+
+Chaque hôtel localisé porte un geohash (calculé en base par le trigger
+hotels_geohash_update, migration 0009) indexé en B-tree
+`varchar_pattern_ops`. Une zone de recherche est couverte par une poignée
+de cellules geohash: la requête devient quelques `geohash LIKE 'abc%'`
+servis par l'index, puis un filtre exact (rectangle ou distance
+haversine) sur les seuls candidats.
+
+Le géocodage des adresses passe par un fournisseur interchangeable
+(`HOTEL_GEOCODER`), avec par défaut un géocodeur hors ligne.
+"""
+import json
+import logging
+import math
+import re
+import unicodedata
+import urllib.parse
+import urllib.request
+from functools import reduce
+from operator import or_
+
+from django.conf import settings
+from django.db.models import F, FloatField, Q, Value
+from django.db.models.functions import ASin, Cos, Least, Power, Radians, Sin, Sqrt
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+
+logger = logging.getLogger(__name__)
+
+BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+
+# Longueur du geohash stocké (~5 m); doit rester égale à celle du trigger
+PRECISION = 9
+
+# Nombre maximal de cellules utilisées pour couvrir une zone de recherche
+MAX_CELLULES = getattr(settings, 'HOTEL_GEO_MAX_CELLS', 24)
+
+RAYON_TERRE_KM = 6371.0088
+KM_PAR_DEGRE = 111.32
+
+RAYON_MAX_KM = 500
+
+
+def encoder(latitude, longitude, precision=PRECISION):
+    """Geohash d'un point (même algorithme que la fonction SQL geohash_encode)"""
+    lat_min, lat_max = -90.0, 90.0
+    lng_min, lng_max = -180.0, 180.0
+    resultat = []
+    valeur = bits = 0
+    longitude_paire = True
+    while len(resultat) < precision:
+        if longitude_paire:
+            milieu = (lng_min + lng_max) / 2
+            if longitude >= milieu:
+                valeur, lng_min = valeur * 2 + 1, milieu
+            else:
+                valeur, lng_max = valeur * 2, milieu
+        else:
+            milieu = (lat_min + lat_max) / 2
+            if latitude >= milieu:
+                valeur, lat_min = valeur * 2 + 1, milieu
+            else:
+                valeur, lat_max = valeur * 2, milieu
+        longitude_paire = not longitude_paire
+        bits += 1
+        if bits == 5:
+            resultat.append(BASE32[valeur])
+            valeur = bits = 0
+    return ''.join(resultat)
+
+
+def _bits(precision):
+    """Bits de longitude et de latitude d'un geohash de cette longueur"""
+    total = 5 * precision
+    return (total + 1) // 2, total // 2
+
+
+def _indice(valeur, minimum, etendue, bits):
+    return min(int((valeur - minimum) / etendue * (1 << bits)), (1 << bits) - 1)
+
+
+def _geohash_cellule(x, y, precision):
+    """Geohash de la cellule d'indices (x: longitude, y: latitude)"""
+    bits_lng, bits_lat = _bits(precision)
+    entrelaces = 0
+    for position in range(5 * precision):
+        # Bits pairs (en partant du poids fort): longitude
+        if position % 2 == 0:
+            bit = (x >> (bits_lng - 1 - position // 2)) & 1
+        else:
+            bit = (y >> (bits_lat - 1 - position // 2)) & 1
+        entrelaces = entrelaces * 2 + bit
+    return ''.join(
+        BASE32[(entrelaces >> (5 * (precision - 1 - i))) & 31] for i in range(precision)
+    )
+
+
+def cellules(lat_min, lng_min, lat_max, lng_max, max_cellules=MAX_CELLULES):
+    """
+    Préfixes geohash couvrant le rectangle, à la précision la plus fine
+    possible sans dépasser `max_cellules`. Liste vide: zone trop grande,
+    pas de préfixe utile.
+    """
+    for precision in range(PRECISION, 0, -1):
+        bits_lng, bits_lat = _bits(precision)
+        x_min = _indice(lng_min, -180.0, 360.0, bits_lng)
+        x_max = _indice(lng_max, -180.0, 360.0, bits_lng)
+        y_min = _indice(lat_min, -90.0, 180.0, bits_lat)
+        y_max = _indice(lat_max, -90.0, 180.0, bits_lat)
+        if (x_max - x_min + 1) * (y_max - y_min + 1) <= max_cellules:
+            return [
+                _geohash_cellule(x, y, precision)
+                for x in range(x_min, x_max + 1)
+                for y in range(y_min, y_max + 1)
+            ]
+    return []
+
+
+def _rectangles(lat_min, lng_min, lat_max, lng_max):
+    """Découper un rectangle qui traverse l'antiméridien (lng_min > lng_max)"""
+    if lng_min <= lng_max:
+        return [(lat_min, lng_min, lat_max, lng_max)]
+    return [(lat_min, lng_min, lat_max, 180.0), (lat_min, -180.0, lat_max, lng_max)]
+
+
+def filtre_rectangle(lat_min, lng_min, lat_max, lng_max):
+    """Condition Q: hôtels situés dans le rectangle (index geohash + filtre exact)"""
+    rectangles = _rectangles(lat_min, lng_min, lat_max, lng_max)
+    condition = None
+    for rectangle in rectangles:
+        bas, gauche, haut, droite = rectangle
+        zone = Q(
+            latitude__gte=bas, latitude__lte=haut,
+            longitude__gte=gauche, longitude__lte=droite,
+        )
+        prefixes = cellules(*rectangle, max_cellules=max(1, MAX_CELLULES // len(rectangles)))
+        if prefixes:
+            zone &= reduce(or_, [Q(geohash__startswith=prefixe) for prefixe in prefixes])
+        condition = zone if condition is None else condition | zone
+    return condition
+
+
+def rectangle_autour(latitude, longitude, rayon_km):
+    """Rectangle englobant le cercle (bornes en degrés)"""
+    delta_lat = rayon_km / KM_PAR_DEGRE
+    lat_min = max(-90.0, latitude - delta_lat)
+    lat_max = min(90.0, latitude + delta_lat)
+    cos_lat = math.cos(math.radians(max(abs(lat_min), abs(lat_max))))
+    if cos_lat < 1e-6 or rayon_km / (KM_PAR_DEGRE * cos_lat) >= 180:
+        # Près d'un pôle: toutes les longitudes
+        return lat_min, -180.0, lat_max, 180.0
+    delta_lng = rayon_km / (KM_PAR_DEGRE * cos_lat)
+    lng_min = (longitude - delta_lng + 540) % 360 - 180
+    lng_max = (longitude + delta_lng + 540) % 360 - 180
+    return lat_min, lng_min, lat_max, lng_max
+
+
+def expression_distance(latitude, longitude):
+    """Distance haversine (km) entre le point et chaque hôtel, calculée en base"""
+    lat1 = math.radians(latitude)
+    lat2 = Radians(F('latitude'))
+    delta_lat = Radians(F('latitude') - latitude) / 2
+    delta_lng = Radians(F('longitude') - longitude) / 2
+    a = Power(Sin(delta_lat), 2) + math.cos(lat1) * Cos(lat2) * Power(Sin(delta_lng), 2)
+    # LEAST: les arrondis peuvent porter à juste au-dessus de 1 (asin hors domaine)
+    return 2 * RAYON_TERRE_KM * ASin(Least(Sqrt(a), Value(1.0)), output_field=FloatField())
+
+
+def filtrer_rayon(queryset, latitude, longitude, rayon_km):
+    """Hôtels à moins de `rayon_km` du point, annotés de leur `distance` (km)"""
+    return (
+        queryset.filter(filtre_rectangle(*rectangle_autour(latitude, longitude, rayon_km)))
+        .annotate(distance=expression_distance(latitude, longitude))
+        .filter(distance__lte=rayon_km)
+    )
+
+
+# Géocodage des adresses
+
+def _normaliser(texte):
+    """Minuscules sans accents ni ponctuation: 'Thiès-Nord, ' -> 'thies nord'"""
+    texte = unicodedata.normalize('NFKD', texte.lower())
+    texte = ''.join(c for c in texte if not unicodedata.combining(c))
+    return re.sub(r'[^a-z0-9]+', ' ', texte).strip()
+
+
+class GeocodeurHorsLigne:
+    """
+    Géocodeur sans réseau: reconnaît dans l'adresse des localités connues
+    (la première citée, donc la plus précise, l'emporte). Suffit au développement et aux adresses
+    sénégalaises courantes; complété par `HOTEL_GEOCODER_PLACES`.
+    """
+    LIEUX = {
+        'dakar': (14.6928, -17.4467),
+        'plateau': (14.6681, -17.4322),
+        'medina': (14.6843, -17.4497),
+        'fann': (14.6915, -17.4636),
+        'point e': (14.6960, -17.4615),
+        'mermoz': (14.7071, -17.4743),
+        'ouakam': (14.7247, -17.4904),
+        'ngor': (14.7497, -17.5139),
+        'almadies': (14.7448, -17.5196),
+        'yoff': (14.7563, -17.4714),
+        'corniche ouest': (14.6936, -17.4718),
+        'pikine': (14.7549, -17.3900),
+        'rufisque': (14.7167, -17.2667),
+        'thies': (14.7910, -16.9359),
+        'mbour': (14.4220, -16.9640),
+        'saly': (14.4469, -17.0167),
+        'saint louis': (16.0179, -16.4896),
+        'touba': (14.8500, -15.8833),
+        'kaolack': (14.1520, -16.0726),
+        'ziguinchor': (12.5681, -16.2719),
+        'cap skirring': (12.3936, -16.7464),
+        'tambacounda': (13.7707, -13.6673),
+        'abidjan': (5.3600, -4.0083),
+        'bamako': (12.6392, -8.0029),
+        'paris': (48.8566, 2.3522),
+    }
+
+    def __init__(self):
+        self.lieux = {
+            _normaliser(nom): coordonnees
+            for nom, coordonnees in {
+                **self.LIEUX, **getattr(settings, 'HOTEL_GEOCODER_PLACES', {}),
+            }.items()
+        }
+
+    def __call__(self, adresse):
+        texte = f' {_normaliser(adresse)} '
+        positions = {nom: texte.find(f' {nom} ') for nom in self.lieux}
+        trouves = [nom for nom, position in positions.items() if position >= 0]
+        if not trouves:
+            return None
+        # Une adresse va du plus précis au plus général: « Route de Ngor, Dakar »
+        return self.lieux[min(trouves, key=lambda nom: (positions[nom], -len(nom)))]
+
+
+class GeocodeurNominatim:
+    """Géocodeur OpenStreetMap Nominatim (réseau; respecter sa politique d'usage)"""
+    url = 'https://nominatim.openstreetmap.org/search'
+
+    def __call__(self, adresse):
+        parametres = urllib.parse.urlencode({'q': adresse, 'format': 'json', 'limit': 1})
+        requete = urllib.request.Request(
+            f'{self.url}?{parametres}',
+            headers={'User-Agent': getattr(settings, 'HOTEL_GEOCODER_USER_AGENT', 'red-product')},
+        )
+        with urllib.request.urlopen(requete, timeout=10) as reponse:
+            resultats = json.load(reponse)
+        if not resultats:
+            return None
+        return float(resultats[0]['lat']), float(resultats[0]['lon'])
+
+
+_geocodeur = None
+
+
+def get_geocodeur():
+    """Fournisseur configuré: appelable `adresse -> (latitude, longitude) | None`"""
+    global _geocodeur
+    if _geocodeur is None:
+        chemin = getattr(settings, 'HOTEL_GEOCODER', 'hotels.geo.GeocodeurHorsLigne')
+        _geocodeur = import_string(chemin)()
+    return _geocodeur
+
+
+def _localiser(hotel_id, adresse):
+    """Enregistrer la position géocodée de l'adresse; True si l'hôtel a été localisé"""
+    from hotels.models import Hotel
+
+    coordonnees = get_geocodeur()(adresse)
+    if coordonnees is None:
+        logger.info("Adresse non géocodée pour l'hôtel %s: %s", hotel_id, adresse)
+        return False
+    # L'adresse a pu changer pendant l'appel: ne rien écraser dans ce cas
+    return bool(Hotel.objects.filter(pk=hotel_id, adresse=adresse).update(
+        latitude=coordonnees[0],
+        longitude=coordonnees[1],
+        updated_at=timezone.now(),
+    ))
+
+
+def geocoder_hotel(hotel_id):
+    """Localiser un hôtel d'après son adresse (tâche d'arrière-plan)"""
+    from hotels.facets import invalider_facettes
+    from hotels.models import Hotel
+
+    adresse = Hotel.objects.filter(pk=hotel_id).values_list('adresse', flat=True).first()
+    if adresse and _localiser(hotel_id, adresse):
+        # Facettes des recherches par rayon / rectangle
+        invalider_facettes()
+
+
+def geocoder_hotels(hotel_ids):
+    """
+    Localiser plusieurs hôtels (écritures en masse, import CSV), en une
+    tâche d'arrière-plan; les facettes ne sont invalidées qu'une fois
+    """
+    from hotels.facets import invalider_facettes
+    from hotels.models import Hotel
+
+    adresses = Hotel.objects.filter(pk__in=hotel_ids).exclude(adresse='').values_list('id', 'adresse')
+    localises = 0
+    for hotel_id, adresse in adresses.iterator():
+        localises += _localiser(hotel_id, adresse)
+    if localises:
+        invalider_facettes()
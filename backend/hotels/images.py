@@ -0,0 +1,126 @@
+import io
+import logging
+import os
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.utils import timezone
+from PIL import Image, ImageOps, features
+
+
+logger = logging.getLogger(__name__)
+
+# Largeurs (px) des variantes générées pour chaque photo d'hôtel
+LARGEURS = getattr(settings, 'HOTEL_IMAGE_WIDTHS', (320, 640, 1280))
+
+# (extension, format Pillow, options d'encodage), du plus compact au plus compatible
+FORMATS = [
+    ('avif', 'AVIF', {'quality': 55}),
+    ('webp', 'WEBP', {'quality': 78, 'method': 6}),
+    ('jpeg', 'JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+]
+
+# Formats qui conservent la transparence (canal alpha); les autres reçoivent
+# l'image posée sur un fond blanc
+FORMATS_TRANSPARENTS = {'avif', 'webp'}
+
+FOND = (255, 255, 255)
+
+
+def formats_disponibles():
+    """Formats pris en charge par l'installation Pillow courante"""
+    return [f for f in FORMATS if f[0] == 'jpeg' or features.check(f[0])]
+
+
+def largeurs_cibles(largeur_originale):
+    """Largeurs à produire sans jamais agrandir l'original"""
+    largeurs = [largeur for largeur in LARGEURS if largeur <= largeur_originale]
+    return largeurs or [largeur_originale]
+
+
+def _sur_fond(image):
+    """Image RGBA posée sur un fond blanc (formats sans transparence)"""
+    fond = Image.new('RGB', image.size, FOND)
+    fond.paste(image, mask=image.getchannel('A'))
+    return fond
+
+
+def generer_variantes(hotel_id, forcer=False):
+    """
+    Générer les miniatures d'un hôtel à côté de sa photo originale.
+
+    L'orientation EXIF est appliquée aux pixels puis les métadonnées sont
+    abandonnées: les variantes ne contiennent ni EXIF ni coordonnées GPS.
+    Une photo transparente (PNG, WebP...) le reste en WebP / AVIF.
+
+    `forcer`: réécrire les miniatures déjà présentes au lieu de les réutiliser.
+    """
+    from hotels.models import Hotel
+
+    hotel = Hotel.objects.filter(pk=hotel_id).only('id', 'image').first()
+    if hotel is None or not hotel.image:
+        return
+    nom = hotel.image.name
+    storage = hotel.image.storage
+
+    with storage.open(nom, 'rb') as fichier:
+        with Image.open(fichier) as original:
+            image = ImageOps.exif_transpose(original)
+            image = image.convert('RGBA' if image.has_transparency_data else 'RGB')
+
+    # Sur un stockage adressé par contenu, les miniatures d'une photo déjà
+    # traitée (même empreinte) existent déjà: on les réutilise telles quelles
+    partage = hasattr(storage, 'save_derivative')
+
+    base, _ = os.path.splitext(nom)
+    variantes = {}
+    for largeur in largeurs_cibles(image.width):
+        redimensionnee = opaque = None
+        for extension, format_pillow, options in formats_disponibles():
+            chemin = f'{base}_{largeur}w.{extension}'
+            if not (partage and not forcer and storage.exists(chemin)):
+                if redimensionnee is None:
+                    hauteur = max(1, round(image.height * largeur / image.width))
+                    redimensionnee = image.resize((largeur, hauteur), Image.Resampling.LANCZOS)
+                rendu = redimensionnee
+                if rendu.mode == 'RGBA' and extension not in FORMATS_TRANSPARENTS:
+                    if opaque is None:
+                        opaque = _sur_fond(redimensionnee)
+                    rendu = opaque
+                tampon = io.BytesIO()
+                rendu.save(tampon, format_pillow, **options)
+                if partage:
+                    if forcer:
+                        storage.delete(chemin)
+                    chemin = storage.save_derivative(chemin, ContentFile(tampon.getvalue()))
+                else:
+                    chemin = storage.save(chemin, ContentFile(tampon.getvalue()))
+            variantes.setdefault(extension, {})[str(largeur)] = chemin
+
+    # La photo a pu être remplacée pendant le traitement: ne rien écraser dans ce cas
+    Hotel.objects.filter(pk=hotel_id, image=nom).update(
+        image_variants=variantes,
+        updated_at=timezone.now(),
+    )
+    logger.info('Variantes générées pour %s: %s', nom, ', '.join(variantes))
+
+
+def construire_srcset(variantes, request=None):
+    """
+    Transformer les variantes stockées en attributs `srcset` par format.
+
+    Exemple: {'webp': 'https://.../photo_320w.webp 320w, https://.../photo_640w.webp 640w'}
+    """
+    from hotels.models import Hotel
+
+    storage = Hotel._meta.get_field('image').storage
+    srcset = {}
+    for extension, tailles in (variantes or {}).items():
+        urls = []
+        for largeur, chemin in sorted(tailles.items(), key=lambda item: int(item[0])):
+            url = storage.url(chemin)
+            if request is not None:
+                url = request.build_absolute_uri(url)
+            urls.append(f'{url} {largeur}w')
+        srcset[extension] = ', '.join(urls)
+    return srcset
@@ -0,0 +1,197 @@
+"""
+Import d'hôtels depuis un CSV via COPY PostgreSQL.
+
+Le fichier est lu en flux et validé par lots avec les règles de
+HotelSerializer. Les lignes valides sont chargées par `COPY` dans une table
+temporaire, puis fusionnées dans `hotels` en deux requêtes ensemblistes:
+UPDATE des hôtels existants (clé naturelle: e-mail, sans tenir compte de la
+casse) puis INSERT des nouveaux. Pour un même e-mail, la dernière ligne du
+fichier l'emporte. Hors des signaux, le géocodage des hôtels créés ou
+déplacés (adresse modifiée) est planifié après le commit.
+"""
+import csv
+import io
+import time
+
+from django.conf import settings
+from django.db import connection, transaction
+from rest_framework.exceptions import ValidationError
+
+from hotels.geo import geocoder_hotels
+from hotels.serializers import HotelBulkSerializer
+from red_product.tasks import run_in_background
+
+
+# Lignes validées puis envoyées par COPY à chaque lot
+TAILLE_LOT = getattr(settings, 'HOTEL_IMPORT_BATCH_SIZE', 10000)
+
+# Nombre de lignes rejetées détaillées dans le rapport (toutes sont comptées)
+MAX_REJETS_DETAILLES = 100
+
+COLONNES = ['nom', 'adresse', 'email', 'telephone', 'prix_par_nuit', 'devise']
+COLONNES_REQUISES = ['nom', 'adresse', 'email', 'telephone', 'prix_par_nuit']
+
+SQL_TABLE_TEMPORAIRE = """
+    CREATE TEMPORARY TABLE hotels_import (
+        ligne integer NOT NULL,
+        cle varchar(254) NOT NULL,
+        nom varchar(255) NOT NULL,
+        adresse text NOT NULL,
+        email varchar(254) NOT NULL,
+        telephone varchar(20) NOT NULL,
+        prix_par_nuit numeric(10, 2) NOT NULL,
+        devise varchar(3) NOT NULL
+    ) ON COMMIT DROP
+"""
+
+SQL_COPY = """
+    COPY hotels_import (ligne, cle, nom, adresse, email, telephone, prix_par_nuit, devise)
+    FROM STDIN WITH (FORMAT csv)
+"""
+
+SQL_DOUBLONS = """
+    DELETE FROM hotels_import AS i
+    USING hotels_import AS j
+    WHERE i.cle = j.cle AND i.ligne < j.ligne
+"""
+
+# N'écrire que les hôtels réellement modifiés (updated_at, triggers).
+# clock_timestamp(): heure de l'écriture, et non du début de la transaction
+# qui couvre tout le fichier. Une nouvelle adresse rend la position périmée:
+# effacée, puis géocodée à nouveau. Retourne le nombre d'hôtels modifiés et
+# les ids de ceux sans position.
+SQL_MISE_A_JOUR = """
+    WITH modifies AS (
+        UPDATE hotels AS h
+        SET nom = i.nom,
+            adresse = i.adresse,
+            email = i.email,
+            telephone = i.telephone,
+            prix_par_nuit = i.prix_par_nuit,
+            devise = i.devise,
+            latitude = CASE WHEN h.adresse = i.adresse THEN h.latitude END,
+            longitude = CASE WHEN h.adresse = i.adresse THEN h.longitude END,
+            geohash = CASE WHEN h.adresse = i.adresse THEN h.geohash END,
+            updated_at = clock_timestamp()
+        FROM hotels_import AS i
+        WHERE lower(h.email) = i.cle
+          AND (h.nom, h.adresse, h.email, h.telephone, h.prix_par_nuit, h.devise)
+              IS DISTINCT FROM (i.nom, i.adresse, i.email, i.telephone, i.prix_par_nuit, i.devise)
+        RETURNING h.id, h.latitude IS NULL OR h.longitude IS NULL AS sans_position
+    )
+    SELECT count(*), coalesce(array_agg(id) FILTER (WHERE sans_position), '{}') FROM modifies
+"""
+
+# Retourne le nombre d'hôtels créés et leurs ids (tous sans position)
+SQL_INSERTION = """
+    WITH inseres AS (
+        INSERT INTO hotels (
+            nom, adresse, email, telephone, prix_par_nuit, devise,
+            image, image_variants, created_by_id, created_at, updated_at
+        )
+        SELECT i.nom, i.adresse, i.email, i.telephone, i.prix_par_nuit, i.devise,
+               NULL, '{}'::jsonb, %s, clock_timestamp(), clock_timestamp()
+        FROM hotels_import AS i
+        WHERE NOT EXISTS (SELECT 1 FROM hotels AS h WHERE lower(h.email) = i.cle)
+        ORDER BY i.ligne
+        RETURNING id
+    )
+    SELECT count(*), coalesce(array_agg(id), '{}') FROM inseres
+"""
+
+
+def _valider(serializer, ligne):
+    """Données validées d'une ligne CSV, ou ValidationError"""
+    if None in ligne or None in ligne.values():
+        raise ValidationError({'non_field_errors': ['Nombre de colonnes incorrect.']})
+    donnees = {
+        colonne: ligne[colonne].strip()
+        for colonne in COLONNES
+        # Colonne optionnelle vide: valeur par défaut du modèle
+        if colonne in ligne and (colonne in COLONNES_REQUISES or ligne[colonne].strip())
+    }
+    return serializer.run_validation(donnees)
+
+
+def _copier(cursor, lot):
+    """Charger un lot de lignes validées dans la table temporaire"""
+    tampon = io.StringIO()
+    ecrivain = csv.writer(tampon)
+    for numero, donnees in lot:
+        ecrivain.writerow([
+            numero,
+            donnees['email'].lower(),
+            donnees['nom'],
+            donnees['adresse'],
+            donnees['email'],
+            donnees['telephone'],
+            donnees['prix_par_nuit'],
+            donnees.get('devise', 'XOF'),
+        ])
+    tampon.seek(0)
+    cursor.copy_expert(SQL_COPY, tampon)
+
+
+def importer_hotels(fichier, utilisateur, delimiter=',', taille_lot=TAILLE_LOT):
+    """
+    Importer un CSV (flux texte) d'hôtels créés au nom de `utilisateur`.
+
+    Colonnes: nom, adresse, email, telephone, prix_par_nuit et, facultatif,
+    devise. Lève ValueError si l'en-tête est inutilisable. Retourne le
+    rapport d'import (compteurs, lignes rejetées, débit).
+    """
+    debut = time.monotonic()
+    lecteur = csv.DictReader(fichier, delimiter=delimiter)
+    manquantes = [colonne for colonne in COLONNES_REQUISES if colonne not in (lecteur.fieldnames or [])]
+    if manquantes:
+        raise ValueError(f"Colonnes manquantes dans l'en-tête: {', '.join(manquantes)}")
+
+    serializer = HotelBulkSerializer()
+    rapport = {
+        'lignes_lues': 0,
+        'inseres': 0,
+        'mis_a_jour': 0,
+        'doublons': 0,
+        'rejetes': 0,
+        'rejets': [],
+    }
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(SQL_TABLE_TEMPORAIRE)
+
+        lot = []
+        # Ligne 1: en-tête
+        for numero, ligne in enumerate(lecteur, start=2):
+            rapport['lignes_lues'] += 1
+            try:
+                donnees = _valider(serializer, ligne)
+            except ValidationError as exc:
+                rapport['rejetes'] += 1
+                if len(rapport['rejets']) < MAX_REJETS_DETAILLES:
+                    rapport['rejets'].append({'ligne': numero, 'erreurs': exc.detail})
+                continue
+            lot.append((numero, donnees))
+            if len(lot) >= taille_lot:
+                _copier(cursor, lot)
+                lot = []
+        if lot:
+            _copier(cursor, lot)
+
+        cursor.execute('ANALYZE hotels_import')
+        cursor.execute(SQL_DOUBLONS)
+        rapport['doublons'] = cursor.rowcount
+
+        # Empêcher qu'un autre import insère le même e-mail entre les deux
+        # requêtes; les lectures restent possibles
+        cursor.execute('LOCK TABLE hotels IN SHARE ROW EXCLUSIVE MODE')
+        cursor.execute(SQL_MISE_A_JOUR)
+        rapport['mis_a_jour'], deplaces = cursor.fetchone()
+        cursor.execute(SQL_INSERTION, [utilisateur.pk])
+        rapport['inseres'], inseres = cursor.fetchone()
+        if deplaces or inseres:
+            run_in_background(geocoder_hotels, deplaces + inseres)
+
+    duree = time.monotonic() - debut
+    rapport['duree_secondes'] = round(duree, 3)
+    rapport['lignes_par_minute'] = round(rapport['lignes_lues'] * 60 / duree) if duree else None
+    return rapport
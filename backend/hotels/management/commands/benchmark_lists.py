@@ -0,0 +1,142 @@
+import random
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from accounts.models import User
+from hotels.models import Hotel
+from hotels.views import HotelViewSet
+from messaging.models import BoiteMessage, Message
+from messaging.views import MessageViewSet
+
+
+# (libellé, ViewSet, chemin, paramètres de requête)
+ENDPOINTS = [
+    ('hôtels', HotelViewSet, '/api/hotels/', {}),
+    ('hôtels expand', HotelViewSet, '/api/hotels/', {'expand': 'created_by'}),
+    ('messages', MessageViewSet, '/api/messages/', {}),
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare le débit (lignes/s) des listes hôtels et messages: serializer "
+        "DRF par ligne contre lecture values() (red_product.fastpath), et "
+        "vérifie que le JSON produit est identique."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--seed', type=int, default=2000,
+            help="Hôtels et messages fictifs insérés avant la mesure (annulés à la fin)",
+        )
+        parser.add_argument(
+            '--page-sizes', default='10,100,1000',
+            help='Tailles de page mesurées, séparées par des virgules',
+        )
+        parser.add_argument(
+            '--repeat', type=int, default=5,
+            help='Mesures par cas (la meilleure est retenue)',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            page_sizes = [int(size) for size in options['page_sizes'].split(',')]
+        except ValueError:
+            raise CommandError("--page-sizes: liste d'entiers attendue (ex: 10,100,1000)")
+
+        with transaction.atomic():
+            user = self.seed(options['seed'])
+            self.stdout.write(f"{'liste':<15}{'page':>6}{'serializer l/s':>17}{'values() l/s':>15}{'gain':>7}")
+            for label, viewset, path, params in ENDPOINTS:
+                for size in page_sizes:
+                    self.measure(label, viewset, path, params, user, size, options['repeat'])
+            transaction.set_rollback(True)
+
+    def seed(self, total):
+        """Utilisateurs, hôtels et messages de test (dans la transaction annulée)"""
+        users = User.objects.bulk_create([
+            User(email=f'bench-{i}@example.invalid', username=f'bench-{i}', password='!')
+            for i in range(10)
+        ])
+        devises = [code for code, _ in Hotel.DEVISE_CHOICES]
+        Hotel.objects.bulk_create([
+            Hotel(
+                nom=f'Hôtel {i:06d}',
+                adresse='Adresse de test',
+                email=f'bench-{i}@example.invalid',
+                telephone='+221770000000',
+                prix_par_nuit=Decimal(random.randrange(1000, 50000)) / 100,
+                devise=random.choice(devises),
+                image=f'hotels/{i:064x}.jpg' if i % 2 else None,
+                image_variants={'webp': {'320': f'hotels/{i:064x}_320w.webp'}} if i % 2 else {},
+                created_by=random.choice(users),
+            )
+            for i in range(total)
+        ], batch_size=5000)
+        messages = Message.objects.bulk_create([
+            Message(
+                expediteur=random.choice(users[1:]),
+                destinataire=users[0],
+                sujet=f'Message {i}',
+                contenu='Contenu de test',
+                status=random.choice(['sent', 'read']),
+            )
+            for i in range(total)
+        ], batch_size=5000)
+        # La liste des messages se lit par la boîte de chaque utilisateur
+        BoiteMessage.objects.bulk_create([
+            BoiteMessage(
+                utilisateur_id=utilisateur_id, message=message, date_envoi=message.date_envoi,
+                recu=recu, envoye=not recu, lu=not recu or message.status == 'read',
+            )
+            for message in messages
+            for utilisateur_id, recu in ((message.destinataire_id, True), (message.expediteur_id, False))
+        ], batch_size=5000)
+        return users[0]
+
+    def build_view(self, viewset, path, params, user):
+        factory = APIRequestFactory(HTTP_HOST='localhost')
+        request = factory.get(path, params)
+        force_authenticate(request, user=user)
+        view = viewset(action_map={'get': 'list'}, format_kwarg=None, args=(), kwargs={})
+        view.request = view.initialize_request(request)
+        return view
+
+    def measure(self, label, viewset, path, params, user, size, repeat):
+        view = self.build_view(viewset, path, params, user)
+        queryset = view.filter_queryset(view.get_queryset())
+        fast_queryset, represent = view.fast_list_queryset(queryset)
+        if represent is None:
+            raise CommandError(f'{label}: pas de chemin rapide pour ce serializer')
+        renderer = JSONRenderer()
+
+        def serializer_path():
+            return renderer.render(view.get_serializer(list(queryset[:size]), many=True).data)
+
+        def values_path():
+            return renderer.render([represent(row) for row in fast_queryset[:size]])
+
+        before, expected = self.best(serializer_path, repeat)
+        after, produced = self.best(values_path, repeat)
+        if produced != expected:
+            raise CommandError(f'{label} (page {size}): JSON différent du serializer')
+
+        rows = min(size, queryset.count())
+        if not rows:
+            raise CommandError(f'{label}: liste vide, rien à mesurer')
+        self.stdout.write(
+            f'{label:<15}{size:>6}{rows / before:>17,.0f}{rows / after:>15,.0f}{before / after:>6.1f}x'
+        )
+
+    def best(self, run, repeat):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            output = run()
+            timings.append(time.perf_counter() - started)
+        return min(timings), output
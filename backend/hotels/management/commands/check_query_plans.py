@@ -0,0 +1,176 @@
+import json
+import random
+import time
+from decimal import Decimal
+from urllib.parse import parse_qsl, urlparse
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from accounts.models import User
+from hotels.models import Hotel
+from hotels.views import HotelViewSet
+
+
+# (libellé, action du ViewSet, paramètres de requête)
+# Les scénarios en mode curseur suivent aussi le lien `next` pour vérifier
+# la condition de reprise du keyset.
+SCENARIOS = [
+    ('liste', 'list', {}),
+    ('liste curseur', 'list', {'pagination': 'cursor'}),
+    ('devise', 'list', {'pagination': 'cursor', 'devise': 'EUR'}),
+    ('prix min/max', 'list', {'pagination': 'cursor', 'prix_min': '100', 'prix_max': '150'}),
+    ('devise + prix', 'list', {'pagination': 'cursor', 'devise': 'USD', 'prix_min': '100', 'prix_max': '150'}),
+    ('tri nom', 'list', {'pagination': 'cursor', 'ordering': 'nom'}),
+    ('tri -nom', 'list', {'pagination': 'cursor', 'ordering': '-nom'}),
+    ('tri prix', 'list', {'pagination': 'cursor', 'ordering': 'prix_par_nuit'}),
+    ('tri -prix', 'list', {'pagination': 'cursor', 'ordering': '-prix_par_nuit'}),
+    ('tri date', 'list', {'pagination': 'cursor', 'ordering': 'created_at'}),
+    ('devise + tri nom', 'list', {'pagination': 'cursor', 'devise': 'EUR', 'ordering': 'nom'}),
+    ('devise + tri prix', 'list', {'pagination': 'cursor', 'devise': 'EUR', 'ordering': '-prix_par_nuit'}),
+    ('rayon', 'list', {'lat': '14.6928', 'lng': '-17.4467', 'rayon': '5'}),
+    ('rayon curseur', 'list', {'pagination': 'cursor', 'lat': '14.6928', 'lng': '-17.4467', 'rayon': '5'}),
+    ('rectangle', 'list', {'pagination': 'cursor', 'bbox': '-17.55,14.65,-17.40,14.78'}),
+    ('recherche', 'list', {'search': 'hôtel 12'}),
+    ('recherche typo', 'list', {'search': 'hotle'}),
+    ('mes_hotels', 'mes_hotels', {}),
+]
+
+INDEX_NODES = {'Index Scan', 'Index Only Scan', 'Bitmap Index Scan'}
+
+
+class Command(BaseCommand):
+    help = (
+        "Vérifie par EXPLAIN que chaque combinaison liste / filtre / tri de "
+        "l'API hôtels utilise un index (aucun Seq Scan sur la table hotels)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--seed', type=int, default=0,
+            help="Nombre d'hôtels fictifs à insérer avant l'analyse (annulés à la fin)",
+        )
+        parser.add_argument(
+            '--analyze', action='store_true',
+            help='Exécuter les requêtes (EXPLAIN ANALYZE) pour mesurer leur durée',
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('Cette vérification nécessite PostgreSQL.')
+
+        failures = []
+        with transaction.atomic():
+            if options['seed']:
+                self.seed(options['seed'])
+            user = self.pick_user()
+            for label, action, params in SCENARIOS:
+                failures += self.check_scenario(label, action, params, user, options['analyze'])
+            # Rien de ce qui a été inséré ne doit survivre à la vérification
+            transaction.set_rollback(True)
+
+        if failures:
+            raise CommandError(
+                f'{len(failures)} requête(s) sans index: ' + ', '.join(sorted(set(failures)))
+            )
+        self.stdout.write(self.style.SUCCESS('Toutes les requêtes utilisent un index.'))
+
+    def seed(self, total):
+        started = time.monotonic()
+        owners = User.objects.bulk_create([
+            User(email=f'plan-{i}@example.invalid', username=f'plan-{i}', password='!')
+            for i in range(max(total // 1000, 20))
+        ])
+        devises = [code for code, _ in Hotel.DEVISE_CHOICES]
+        batch = []
+        for i in range(total):
+            batch.append(Hotel(
+                nom=f'Hôtel {random.randrange(10 ** 6):06d}',
+                adresse='Adresse de test',
+                email=f'hotel-{i}@example.invalid',
+                telephone='+221770000000',
+                prix_par_nuit=Decimal(random.randrange(1000, 50000)) / 100,
+                devise=random.choice(devises),
+                # Autour de Dakar et dans le reste de l'Afrique de l'Ouest
+                latitude=random.uniform(14.6, 14.8) if i % 100 == 0 else random.uniform(4, 25),
+                longitude=random.uniform(-17.55, -17.3) if i % 100 == 0 else random.uniform(-18, 15),
+                created_by=random.choice(owners),
+            ))
+            if len(batch) == 5000:
+                Hotel.objects.bulk_create(batch)
+                batch = []
+        Hotel.objects.bulk_create(batch)
+
+        with connection.cursor() as cursor:
+            # bulk_create donne la même date à toutes les lignes: on les étale
+            cursor.execute(
+                "UPDATE hotels SET created_at = now() - random() * interval '730 days' "
+                "WHERE email LIKE %s",
+                ['hotel-%@example.invalid'],
+            )
+            cursor.execute('ANALYZE hotels')
+        self.stdout.write(f'{total} hôtels insérés en {time.monotonic() - started:.1f}s')
+
+    def pick_user(self):
+        user = (
+            User.objects.filter(hotels__isnull=False).order_by('?').first()
+            or User.objects.first()
+        )
+        if user is None:
+            raise CommandError('Aucun utilisateur: lancer la commande avec --seed.')
+        return user
+
+    def check_scenario(self, label, action, params, user, analyze):
+        factory = APIRequestFactory(HTTP_HOST='localhost')
+        view = HotelViewSet.as_view({'get': action})
+        with CaptureQueriesContext(connection) as captured:
+            response = self.call(factory, view, action, params, user)
+            next_link = response.data.get('next') if isinstance(response.data, dict) else None
+            if params.get('pagination') == 'cursor' and next_link:
+                self.call(factory, view, action, dict(parse_qsl(urlparse(next_link).query)), user)
+        queries = [q['sql'] for q in captured.captured_queries if '"hotels"' in q['sql']]
+
+        failures = []
+        for sql in queries:
+            plan = self.explain(sql, analyze)
+            nodes = list(self.walk(plan['Plan']))
+            seq_scans = [n for n in nodes if n['Node Type'] == 'Seq Scan' and n.get('Relation Name') == 'hotels']
+            indexes = sorted({n['Index Name'] for n in nodes if n['Node Type'] in INDEX_NODES and 'Index Name' in n})
+            is_count = sql.lstrip().upper().startswith('SELECT COUNT(*)')
+            timing = f" {plan['Execution Time']:.2f}ms" if analyze else ''
+
+            if seq_scans and not is_count:
+                failures.append(label)
+                status = self.style.ERROR('SEQ SCAN')
+            elif seq_scans:
+                # Le COUNT(*) du mode page est justement ce que le curseur évite
+                status = self.style.WARNING('COUNT')
+            else:
+                status = self.style.SUCCESS('OK')
+            self.stdout.write(f"{status} {label}: {', '.join(indexes) or '-'}{timing}")
+        return failures
+
+    def call(self, factory, view, action, params, user):
+        path = '/api/hotels/' if action == 'list' else f'/api/hotels/{action}/'
+        request = factory.get(path, params)
+        force_authenticate(request, user=user)
+        response = view(request)
+        if response.status_code != 200:
+            raise CommandError(f'{path} {params} a répondu {response.status_code}')
+        return response
+
+    def explain(self, sql, analyze):
+        options = 'ANALYZE, FORMAT JSON' if analyze else 'FORMAT JSON'
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN ({options}) {sql}')
+            result = cursor.fetchone()[0]
+        if isinstance(result, str):
+            result = json.loads(result)
+        return result[0]
+
+    def walk(self, node):
+        yield node
+        for child in node.get('Plans', []):
+            yield from self.walk(child)
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from hotels.images import generer_variantes
+from hotels.models import Hotel
+
+
+class Command(BaseCommand):
+    help = "Génère les miniatures WebP/AVIF/JPEG des photos d'hôtels qui n'en ont pas encore."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all', action='store_true',
+            help='Régénérer aussi les hôtels qui ont déjà des variantes, en réécrivant leurs fichiers',
+        )
+
+    def handle(self, *args, **options):
+        hotels = Hotel.objects.exclude(image='').exclude(image__isnull=True)
+        if not options['all']:
+            hotels = hotels.filter(image_variants={})
+
+        total = 0
+        for hotel_id in hotels.values_list('id', flat=True).iterator():
+            try:
+                generer_variantes(hotel_id, forcer=options['all'])
+            except Exception as exc:
+                self.stderr.write(self.style.ERROR(f'Hôtel {hotel_id}: {exc}'))
+                continue
+            total += 1
+        self.stdout.write(self.style.SUCCESS(f'{total} photo(s) traitée(s).'))
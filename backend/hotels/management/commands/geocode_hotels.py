@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+
+from hotels.geo import geocoder_hotel
+from hotels.models import Hotel
+
+
+class Command(BaseCommand):
+    help = "Géocode l'adresse des hôtels sans position, avec le fournisseur HOTEL_GEOCODER."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all', action='store_true',
+            help='Géocoder aussi les hôtels qui ont déjà une position',
+        )
+
+    def handle(self, *args, **options):
+        hotels = Hotel.objects.exclude(adresse='')
+        if not options['all']:
+            hotels = hotels.filter(latitude__isnull=True)
+
+        total = 0
+        for hotel_id in hotels.values_list('id', flat=True).iterator():
+            try:
+                geocoder_hotel(hotel_id)
+            except Exception as exc:
+                self.stderr.write(self.style.ERROR(f'Hôtel {hotel_id}: {exc}'))
+                continue
+            total += 1
+        localises = Hotel.objects.filter(latitude__isnull=False).count()
+        self.stdout.write(self.style.SUCCESS(
+            f'{total} adresse(s) traitée(s), {localises} hôtel(s) localisé(s).'
+        ))
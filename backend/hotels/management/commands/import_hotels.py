@@ -0,0 +1,55 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.models import User
+from hotels.importer import TAILLE_LOT, importer_hotels
+
+
+class Command(BaseCommand):
+    help = (
+        "Importe (ou met à jour, clé: e-mail) des hôtels depuis un fichier CSV "
+        "via COPY PostgreSQL."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Fichier CSV (UTF-8) avec en-tête')
+        parser.add_argument(
+            '--user', required=True,
+            help="E-mail de l'utilisateur enregistré comme créateur des nouveaux hôtels",
+        )
+        parser.add_argument('--delimiter', default=',', help='Séparateur de colonnes (défaut: ,)')
+        parser.add_argument(
+            '--batch-size', type=int, default=TAILLE_LOT,
+            help=f'Lignes validées puis copiées par lot (défaut: {TAILLE_LOT})',
+        )
+
+    def handle(self, *args, **options):
+        utilisateur = User.objects.filter(email=options['user']).first()
+        if utilisateur is None:
+            raise CommandError(f"Utilisateur introuvable: {options['user']}")
+
+        try:
+            with open(options['path'], encoding='utf-8-sig', newline='') as fichier:
+                rapport = importer_hotels(
+                    fichier,
+                    utilisateur,
+                    delimiter=options['delimiter'],
+                    taille_lot=options['batch_size'],
+                )
+        except (OSError, ValueError) as exc:
+            raise CommandError(str(exc))
+
+        for rejet in rapport['rejets']:
+            erreurs = '; '.join(
+                f"{champ}: {' '.join(str(message) for message in messages)}"
+                for champ, messages in rejet['erreurs'].items()
+            )
+            self.stderr.write(f"Ligne {rejet['ligne']}: {erreurs}")
+        if rapport['rejetes'] > len(rapport['rejets']):
+            self.stderr.write(f"... {rapport['rejetes'] - len(rapport['rejets'])} autre(s) ligne(s) rejetée(s)")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{rapport['lignes_lues']} ligne(s) lue(s) en {rapport['duree_secondes']} s "
+            f"({rapport['lignes_par_minute']} lignes/min): {rapport['inseres']} insérée(s), "
+            f"{rapport['mis_a_jour']} mise(s) à jour, {rapport['doublons']} doublon(s), "
+            f"{rapport['rejetes']} rejetée(s)."
+        ))
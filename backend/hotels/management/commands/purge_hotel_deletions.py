@@ -0,0 +1,25 @@
+import datetime
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from hotels.changes import RETENTION, purger_suppressions
+
+
+class Command(BaseCommand):
+    help = (
+        "Purge le journal des suppressions d'hôtels (hotel_deletions) au-delà "
+        "de la période de rétention. Les jetons de /api/hotels/changes/ plus "
+        "anciens reçoivent ensuite un 410. À planifier (cron), ex: chaque jour."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int, default=RETENTION.days,
+            help='Jours conservés (défaut: HOTEL_CHANGES_RETENTION_DAYS)',
+        )
+
+    def handle(self, *args, **options):
+        avant = timezone.now() - datetime.timedelta(days=options['days'])
+        supprimees = purger_suppressions(avant)
+        self.stdout.write(self.style.SUCCESS(f'{supprimees} suppression(s) purgée(s).'))
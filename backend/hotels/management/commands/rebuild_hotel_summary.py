@@ -0,0 +1,75 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Count, Max, Min, Sum
+
+from hotels.models import Hotel, HotelSummary
+
+
+FIELDS = ('nombre', 'somme', 'prix_min', 'prix_max')
+
+
+class Command(BaseCommand):
+    help = (
+        "Reconstruit la table hotels_summary à partir de la table hotels, "
+        "ou signale les écarts avec --check."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check', action='store_true',
+            help='Comparer seulement, sans modifier (code retour non nul en cas d\'écart)',
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            if not options['check']:
+                # Bloque les écritures concurrentes le temps du recalcul
+                with connection.cursor() as cursor:
+                    cursor.execute('LOCK TABLE hotels IN SHARE MODE')
+
+            expected = self.compute()
+            current = {
+                row.devise: {field: getattr(row, field) for field in FIELDS}
+                for row in HotelSummary.objects.all()
+            }
+            drift = self.compare(expected, current)
+
+            if options['check']:
+                if drift:
+                    raise CommandError(f'{len(drift)} devise(s) en écart avec la table hotels.')
+                self.stdout.write(self.style.SUCCESS('hotels_summary est à jour.'))
+                return
+
+            HotelSummary.objects.all().delete()
+            HotelSummary.objects.bulk_create([
+                HotelSummary(devise=devise, **values) for devise, values in expected.items()
+            ])
+        self.stdout.write(self.style.SUCCESS(
+            f'hotels_summary reconstruite ({len(expected)} devise(s), {len(drift)} corrigée(s)).'
+        ))
+
+    def compute(self):
+        rows = (
+            Hotel.objects.order_by()
+            .values('devise')
+            .annotate(
+                nombre=Count('id'),
+                somme=Sum('prix_par_nuit'),
+                prix_min=Min('prix_par_nuit'),
+                prix_max=Max('prix_par_nuit'),
+            )
+        )
+        return {row.pop('devise'): row for row in rows}
+
+    def compare(self, expected, current):
+        empty = {'nombre': 0, 'somme': 0, 'prix_min': None, 'prix_max': None}
+        drift = []
+        for devise in sorted(set(expected) | set(current)):
+            wanted = expected.get(devise, empty)
+            stored = current.get(devise, empty)
+            differences = [f for f in FIELDS if wanted[f] != stored[f]]
+            if differences:
+                drift.append(devise)
+                details = ', '.join(f'{f}: {stored[f]} -> {wanted[f]}' for f in differences)
+                self.stdout.write(self.style.WARNING(f'{devise}: {details}'))
+        return drift
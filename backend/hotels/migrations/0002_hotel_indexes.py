@@ -0,0 +1,49 @@
+# Generated by Django 4.2.8 on 2026-10-18 06:34
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('hotels', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='hotel',
+            name='created_by',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='hotels', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='hotel',
+            index=models.Index(fields=['-created_at', '-id'], name='hotels_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='hotel',
+            index=models.Index(fields=['devise', '-created_at', '-id'], name='hotels_devise_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='hotel',
+            index=models.Index(fields=['devise', 'prix_par_nuit', 'id'], name='hotels_devise_prix_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='hotel',
+            index=models.Index(fields=['devise', 'nom', 'id'], name='hotels_devise_nom_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='hotel',
+            index=models.Index(fields=['prix_par_nuit', 'id'], name='hotels_prix_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='hotel',
+            index=models.Index(fields=['nom', 'id'], name='hotels_nom_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='hotel',
+            index=models.Index(fields=['created_by', '-created_at', '-id'], name='hotels_createur_created_idx'),
+        ),
+    ]
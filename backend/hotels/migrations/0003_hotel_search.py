@@ -0,0 +1,75 @@
+# Generated by Django 4.2.8 on 2026-10-18 06:35
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.contrib.postgres.operations import TrigramExtension, UnaccentExtension
+from django.db import migrations
+
+
+# Configuration plein texte française insensible aux accents
+CREATE_SEARCH_CONFIG = """
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM pg_ts_config WHERE cfgname = 'french_unaccent') THEN
+        CREATE TEXT SEARCH CONFIGURATION french_unaccent (COPY = french);
+        ALTER TEXT SEARCH CONFIGURATION french_unaccent
+            ALTER MAPPING FOR hword, hword_part, word WITH unaccent, french_stem;
+    END IF;
+END
+$$;
+"""
+
+DROP_SEARCH_CONFIG = "DROP TEXT SEARCH CONFIGURATION IF EXISTS french_unaccent;"
+
+# Le vecteur est recalculé en base pour couvrir tous les chemins d'écriture
+# (save, bulk_create, update, COPY). Django écrit search_vector à NULL lors
+# d'un save complet, ce qui déclenche aussi le recalcul.
+CREATE_TRIGGER = """
+CREATE FUNCTION hotels_search_vector_update() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector :=
+        setweight(to_tsvector('french_unaccent', coalesce(NEW.nom, '')), 'A') ||
+        setweight(to_tsvector('french_unaccent', coalesce(NEW.adresse, '')), 'B') ||
+        setweight(to_tsvector('simple', coalesce(NEW.email, '')), 'C');
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER hotels_search_vector_trigger
+    BEFORE INSERT OR UPDATE OF nom, adresse, email, search_vector ON hotels
+    FOR EACH ROW EXECUTE FUNCTION hotels_search_vector_update();
+
+UPDATE hotels SET search_vector = NULL;
+"""
+
+DROP_TRIGGER = """
+DROP TRIGGER IF EXISTS hotels_search_vector_trigger ON hotels;
+DROP FUNCTION IF EXISTS hotels_search_vector_update();
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hotels', '0002_hotel_indexes'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        UnaccentExtension(),
+        migrations.RunSQL(CREATE_SEARCH_CONFIG, DROP_SEARCH_CONFIG),
+        migrations.AddField(
+            model_name='hotel',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunSQL(CREATE_TRIGGER, DROP_TRIGGER),
+        migrations.AddIndex(
+            model_name='hotel',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='hotels_search_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='hotel',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['nom'], name='hotels_nom_trgm_idx', opclasses=['gin_trgm_ops']),
+        ),
+    ]
@@ -0,0 +1,143 @@
+# Generated by Django 4.2.8 on 2026-10-18 06:37
+
+from django.db import migrations, models
+
+
+# Triggers par instruction avec tables de transition: un INSERT ... SELECT,
+# un bulk_create ou un COPY de N lignes ne produit qu'un seul UPSERT par
+# devise. Les bornes min/max sont recalculées via l'index
+# (devise, prix_par_nuit, id) lorsque des lignes disparaissent.
+CREATE_TRIGGERS = """
+CREATE FUNCTION hotels_summary_on_insert() RETURNS trigger AS $$
+BEGIN
+    INSERT INTO hotels_summary AS s (devise, nombre, somme, prix_min, prix_max)
+    SELECT devise, count(*), sum(prix_par_nuit), min(prix_par_nuit), max(prix_par_nuit)
+    FROM nouvelles
+    GROUP BY devise
+    ON CONFLICT (devise) DO UPDATE SET
+        nombre = s.nombre + EXCLUDED.nombre,
+        somme = s.somme + EXCLUDED.somme,
+        prix_min = LEAST(s.prix_min, EXCLUDED.prix_min),
+        prix_max = GREATEST(s.prix_max, EXCLUDED.prix_max);
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE FUNCTION hotels_summary_on_delete() RETURNS trigger AS $$
+BEGIN
+    UPDATE hotels_summary s SET
+        nombre = s.nombre - d.nombre,
+        somme = s.somme - d.somme,
+        prix_min = (SELECT min(h.prix_par_nuit) FROM hotels h WHERE h.devise = s.devise),
+        prix_max = (SELECT max(h.prix_par_nuit) FROM hotels h WHERE h.devise = s.devise)
+    FROM (
+        SELECT devise, count(*) AS nombre, sum(prix_par_nuit) AS somme
+        FROM anciennes
+        GROUP BY devise
+    ) d
+    WHERE s.devise = d.devise;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE FUNCTION hotels_summary_on_update() RETURNS trigger AS $$
+DECLARE
+    devises varchar[];
+BEGIN
+    WITH modifiees AS (
+        SELECT o.devise AS ancienne_devise, o.prix_par_nuit AS ancien_prix,
+               n.devise, n.prix_par_nuit
+        FROM anciennes o
+        JOIN nouvelles n ON n.id = o.id
+        WHERE o.devise IS DISTINCT FROM n.devise
+           OR o.prix_par_nuit IS DISTINCT FROM n.prix_par_nuit
+    ), delta AS (
+        SELECT devise, sum(nombre) AS nombre, sum(somme) AS somme
+        FROM (
+            SELECT devise, 1 AS nombre, prix_par_nuit AS somme FROM modifiees
+            UNION ALL
+            SELECT ancienne_devise, -1, -ancien_prix FROM modifiees
+        ) mouvements
+        GROUP BY devise
+    ), upsert AS (
+        INSERT INTO hotels_summary AS s (devise, nombre, somme)
+        SELECT devise, nombre, somme FROM delta
+        ON CONFLICT (devise) DO UPDATE SET
+            nombre = s.nombre + EXCLUDED.nombre,
+            somme = s.somme + EXCLUDED.somme
+        RETURNING s.devise
+    )
+    SELECT array_agg(devise) INTO devises FROM upsert;
+
+    IF devises IS NOT NULL THEN
+        UPDATE hotels_summary s SET
+            prix_min = (SELECT min(h.prix_par_nuit) FROM hotels h WHERE h.devise = s.devise),
+            prix_max = (SELECT max(h.prix_par_nuit) FROM hotels h WHERE h.devise = s.devise)
+        WHERE s.devise = ANY(devises);
+    END IF;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE FUNCTION hotels_summary_on_truncate() RETURNS trigger AS $$
+BEGIN
+    UPDATE hotels_summary SET nombre = 0, somme = 0, prix_min = NULL, prix_max = NULL;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER hotels_summary_insert AFTER INSERT ON hotels
+    REFERENCING NEW TABLE AS nouvelles
+    FOR EACH STATEMENT EXECUTE FUNCTION hotels_summary_on_insert();
+CREATE TRIGGER hotels_summary_delete AFTER DELETE ON hotels
+    REFERENCING OLD TABLE AS anciennes
+    FOR EACH STATEMENT EXECUTE FUNCTION hotels_summary_on_delete();
+CREATE TRIGGER hotels_summary_update AFTER UPDATE ON hotels
+    REFERENCING OLD TABLE AS anciennes NEW TABLE AS nouvelles
+    FOR EACH STATEMENT EXECUTE FUNCTION hotels_summary_on_update();
+CREATE TRIGGER hotels_summary_truncate AFTER TRUNCATE ON hotels
+    FOR EACH STATEMENT EXECUTE FUNCTION hotels_summary_on_truncate();
+
+-- Les triggers verrouillent déjà `hotels`: l'état initial est cohérent
+INSERT INTO hotels_summary (devise, nombre, somme, prix_min, prix_max)
+SELECT devise, count(*), sum(prix_par_nuit), min(prix_par_nuit), max(prix_par_nuit)
+FROM hotels
+GROUP BY devise;
+"""
+
+DROP_TRIGGERS = """
+DROP TRIGGER IF EXISTS hotels_summary_insert ON hotels;
+DROP TRIGGER IF EXISTS hotels_summary_delete ON hotels;
+DROP TRIGGER IF EXISTS hotels_summary_update ON hotels;
+DROP TRIGGER IF EXISTS hotels_summary_truncate ON hotels;
+DROP FUNCTION IF EXISTS hotels_summary_on_insert();
+DROP FUNCTION IF EXISTS hotels_summary_on_delete();
+DROP FUNCTION IF EXISTS hotels_summary_on_update();
+DROP FUNCTION IF EXISTS hotels_summary_on_truncate();
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hotels', '0003_hotel_search'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HotelSummary',
+            fields=[
+                ('devise', models.CharField(choices=[('XOF', 'F XOF'), ('EUR', 'EUR'), ('USD', 'USD')], max_length=3, primary_key=True, serialize=False)),
+                ('nombre', models.BigIntegerField(default=0)),
+                ('somme', models.DecimalField(decimal_places=2, default=0, max_digits=20)),
+                ('prix_min', models.DecimalField(decimal_places=2, max_digits=10, null=True)),
+                ('prix_max', models.DecimalField(decimal_places=2, max_digits=10, null=True)),
+            ],
+            options={
+                'verbose_name': 'Résumé par devise',
+                'verbose_name_plural': 'Résumés par devise',
+                'db_table': 'hotels_summary',
+            },
+        ),
+        migrations.RunSQL(CREATE_TRIGGERS, DROP_TRIGGERS),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 4.2.8 on 2026-10-18 06:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hotels', '0005_hotel_image_variants'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FichierMedia',
+            fields=[
+                ('chemin', models.CharField(max_length=255, primary_key=True, serialize=False)),
+                ('nombre_references', models.IntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Fichier média',
+                'verbose_name_plural': 'Fichiers média',
+                'db_table': 'media_files',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='hotel',
+            index=models.Index(fields=['image'], name='hotels_image_idx'),
+        ),
+        # Références des photos déjà en place (anciens noms non hachés compris)
+        migrations.RunSQL(
+            sql="""
+                INSERT INTO media_files (chemin, nombre_references, created_at)
+                SELECT image, count(*), now()
+                FROM hotels
+                WHERE image IS NOT NULL AND image <> ''
+                GROUP BY image
+            """,
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.8 on 2026-10-18 06:51
+
+from django.db import migrations, models
+import django.db.models.functions.text
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hotels', '0006_media_files'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='hotel',
+            index=models.Index(django.db.models.functions.text.Lower('email'), name='hotels_email_idx'),
+        ),
+    ]
@@ -0,0 +1,90 @@
+# Generated by Django 4.2.8 on 2026-10-18 06:54
+
+from django.db import migrations, models
+
+
+# Taux initiaux vers XOF: parité fixe pour l'euro, valeur indicative pour le
+# dollar (à tenir à jour dans l'admin)
+SEED_RATES = """
+INSERT INTO exchange_rates (devise, taux, updated_at) VALUES
+    ('XOF', 1, now()),
+    ('EUR', 655.957, now()),
+    ('USD', 600, now())
+ON CONFLICT (devise) DO NOTHING;
+"""
+
+# Comme search_vector, le prix converti est calculé en base pour couvrir
+# save, bulk_create, bulk_update, update() et COPY. prix_reference figure
+# dans la liste des colonnes: une écriture de Django (valeur en mémoire
+# périmée) redéclenche le calcul.
+CREATE_TRIGGER = """
+CREATE FUNCTION hotels_prix_reference_update() RETURNS trigger AS $$
+DECLARE
+    taux_devise numeric;
+BEGIN
+    SELECT taux INTO taux_devise FROM exchange_rates WHERE devise = NEW.devise;
+    IF taux_devise IS NULL THEN
+        RAISE EXCEPTION 'Aucun taux de change pour la devise %', NEW.devise
+            USING ERRCODE = 'foreign_key_violation';
+    END IF;
+    NEW.prix_reference := round(NEW.prix_par_nuit * taux_devise, 2);
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER hotels_prix_reference_trigger
+    BEFORE INSERT OR UPDATE OF prix_par_nuit, devise, prix_reference ON hotels
+    FOR EACH ROW EXECUTE FUNCTION hotels_prix_reference_update();
+"""
+
+DROP_TRIGGER = """
+DROP TRIGGER IF EXISTS hotels_prix_reference_trigger ON hotels;
+DROP FUNCTION IF EXISTS hotels_prix_reference_update();
+"""
+
+# Conversion des hôtels existants, sans passer par le trigger
+BACKFILL = """
+UPDATE hotels AS h
+SET prix_reference = round(h.prix_par_nuit * t.taux, 2)
+FROM exchange_rates AS t
+WHERE t.devise = h.devise;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hotels', '0007_hotel_email_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TauxDeChange',
+            fields=[
+                ('devise', models.CharField(choices=[('XOF', 'F XOF'), ('EUR', 'EUR'), ('USD', 'USD')], max_length=3, primary_key=True, serialize=False)),
+                ('taux', models.DecimalField(decimal_places=10, max_digits=20)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Taux de change',
+                'verbose_name_plural': 'Taux de change',
+                'db_table': 'exchange_rates',
+            },
+        ),
+        migrations.RunSQL(SEED_RATES, reverse_sql=migrations.RunSQL.noop),
+        migrations.RemoveIndex(
+            model_name='hotel',
+            name='hotels_prix_idx',
+        ),
+        migrations.AddField(
+            model_name='hotel',
+            name='prix_reference',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=16),
+        ),
+        migrations.RunSQL(BACKFILL, reverse_sql=migrations.RunSQL.noop),
+        migrations.RunSQL(CREATE_TRIGGER, reverse_sql=DROP_TRIGGER),
+        migrations.AddIndex(
+            model_name='hotel',
+            index=models.Index(fields=['prix_reference', 'id'], name='hotels_prix_reference_idx'),
+        ),
+    ]
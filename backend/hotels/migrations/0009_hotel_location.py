@@ -0,0 +1,110 @@
+# Generated by Django 4.2.8 on 2026-10-18 06:58
+
+import django.core.validators
+from django.db import migrations, models
+
+
+# Même algorithme que hotels.geo.encoder (bissections alternées longitude /
+# latitude, 5 bits par caractère base32)
+CREATE_GEOHASH_FUNCTION = """
+CREATE FUNCTION geohash_encode(lat double precision, lng double precision, longueur integer)
+RETURNS varchar AS $$
+DECLARE
+    alphabet constant text := '0123456789bcdefghjkmnpqrstuvwxyz';
+    lat_min double precision := -90;
+    lat_max double precision := 90;
+    lng_min double precision := -180;
+    lng_max double precision := 180;
+    milieu double precision;
+    valeur integer := 0;
+    bits integer := 0;
+    longitude_paire boolean := true;
+    resultat varchar := '';
+BEGIN
+    IF lat IS NULL OR lng IS NULL THEN
+        RETURN NULL;
+    END IF;
+    WHILE length(resultat) < longueur LOOP
+        IF longitude_paire THEN
+            milieu := (lng_min + lng_max) / 2;
+            IF lng >= milieu THEN
+                valeur := valeur * 2 + 1;
+                lng_min := milieu;
+            ELSE
+                valeur := valeur * 2;
+                lng_max := milieu;
+            END IF;
+        ELSE
+            milieu := (lat_min + lat_max) / 2;
+            IF lat >= milieu THEN
+                valeur := valeur * 2 + 1;
+                lat_min := milieu;
+            ELSE
+                valeur := valeur * 2;
+                lat_max := milieu;
+            END IF;
+        END IF;
+        longitude_paire := NOT longitude_paire;
+        bits := bits + 1;
+        IF bits = 5 THEN
+            resultat := resultat || substr(alphabet, valeur + 1, 1);
+            valeur := 0;
+            bits := 0;
+        END IF;
+    END LOOP;
+    RETURN resultat;
+END
+$$ LANGUAGE plpgsql IMMUTABLE;
+"""
+
+DROP_GEOHASH_FUNCTION = "DROP FUNCTION IF EXISTS geohash_encode(double precision, double precision, integer);"
+
+# Précision 9 (~5 m): hotels.geo.PRECISION
+CREATE_TRIGGER = """
+CREATE FUNCTION hotels_geohash_update() RETURNS trigger AS $$
+BEGIN
+    NEW.geohash := geohash_encode(NEW.latitude, NEW.longitude, 9);
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER hotels_geohash_trigger
+    BEFORE INSERT OR UPDATE OF latitude, longitude, geohash ON hotels
+    FOR EACH ROW EXECUTE FUNCTION hotels_geohash_update();
+"""
+
+DROP_TRIGGER = """
+DROP TRIGGER IF EXISTS hotels_geohash_trigger ON hotels;
+DROP FUNCTION IF EXISTS hotels_geohash_update();
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hotels', '0008_reference_prices'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='hotel',
+            name='geohash',
+            field=models.CharField(blank=True, editable=False, max_length=12, null=True),
+        ),
+        migrations.AddField(
+            model_name='hotel',
+            name='latitude',
+            field=models.FloatField(blank=True, null=True, validators=[django.core.validators.MinValueValidator(-90), django.core.validators.MaxValueValidator(90)], verbose_name='Latitude'),
+        ),
+        migrations.AddField(
+            model_name='hotel',
+            name='longitude',
+            field=models.FloatField(blank=True, null=True, validators=[django.core.validators.MinValueValidator(-180), django.core.validators.MaxValueValidator(180)], verbose_name='Longitude'),
+        ),
+        migrations.AddIndex(
+            model_name='hotel',
+            index=models.Index(fields=['geohash'], name='hotels_geohash_idx', opclasses=['varchar_pattern_ops']),
+        ),
+        migrations.RunSQL(CREATE_GEOHASH_FUNCTION, reverse_sql=DROP_GEOHASH_FUNCTION),
+        migrations.RunSQL(CREATE_TRIGGER, reverse_sql=DROP_TRIGGER),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 4.2.8 on 2026-10-18 07:18
+
+import django.contrib.postgres.fields
+from django.db import migrations, models
+import django.db.models.deletion
+import hotels.models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hotels', '0009_hotel_location'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TypeChambre',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nom', models.CharField(max_length=100, verbose_name='Nom')),
+                ('capacite', models.PositiveSmallIntegerField(default=2, verbose_name='Personnes par chambre')),
+                ('nombre', models.PositiveSmallIntegerField(default=1, verbose_name='Nombre de chambres')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('hotel', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='types_chambre', to='hotels.hotel')),
+            ],
+            options={
+                'verbose_name': 'Type de chambre',
+                'verbose_name_plural': 'Types de chambre',
+                'db_table': 'room_types',
+                'ordering': ['hotel', 'capacite', 'id'],
+            },
+        ),
+        migrations.CreateModel(
+            name='CalendrierChambre',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('annee', models.PositiveSmallIntegerField()),
+                ('occupation', django.contrib.postgres.fields.ArrayField(base_field=models.PositiveSmallIntegerField(), size=366)),
+                ('complet', hotels.models.JoursField()),
+                ('type_chambre', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='calendriers', to='hotels.typechambre')),
+            ],
+            options={
+                'verbose_name': 'Calendrier de chambre',
+                'verbose_name_plural': 'Calendriers de chambre',
+                'db_table': 'room_calendars',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='typechambre',
+            index=models.Index(fields=['hotel', 'capacite'], name='room_types_hotel_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='calendrierchambre',
+            constraint=models.UniqueConstraint(fields=('type_chambre', 'annee'), name='room_calendars_unique'),
+        ),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 4.2.8 on 2026-10-18 07:21
+
+from django.db import migrations, models
+
+
+# Une ligne par hôtel supprimé, par instruction (suppressions en masse
+# comprises). clock_timestamp(): au plus près de la validation, pour que
+# la marge du flux (hotels.changes) couvre la fin de la transaction.
+CREATE_TRIGGER = """
+CREATE FUNCTION hotels_deletion_log() RETURNS trigger AS $$
+BEGIN
+    INSERT INTO hotel_deletions (hotel_id, deleted_at)
+    SELECT id, clock_timestamp() FROM anciennes;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER hotels_deletion_log_trigger AFTER DELETE ON hotels
+    REFERENCING OLD TABLE AS anciennes
+    FOR EACH STATEMENT EXECUTE FUNCTION hotels_deletion_log();
+"""
+
+DROP_TRIGGER = """
+DROP TRIGGER IF EXISTS hotels_deletion_log_trigger ON hotels;
+DROP FUNCTION IF EXISTS hotels_deletion_log();
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hotels', '0010_room_availability'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HotelSupprime',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hotel_id', models.BigIntegerField()),
+                ('deleted_at', models.DateTimeField()),
+            ],
+            options={
+                'verbose_name': 'Hôtel supprimé',
+                'verbose_name_plural': 'Hôtels supprimés',
+                'db_table': 'hotel_deletions',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='hotel',
+            index=models.Index(fields=['updated_at', 'id'], name='hotels_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='hotelsupprime',
+            index=models.Index(fields=['deleted_at', 'id'], name='hotel_deletions_idx'),
+        ),
+        migrations.RunSQL(CREATE_TRIGGER, reverse_sql=DROP_TRIGGER),
+    ]
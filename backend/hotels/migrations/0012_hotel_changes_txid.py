@@ -0,0 +1,75 @@
+# Generated by Django 4.2.8 on 2026-10-18 07:55
+
+from django.db import migrations, models
+
+
+# Transaction de chaque écriture, en bigint (xid8 sur 64 bits, sans
+# rebouclage). Le flux (hotels.changes) ne lit que les transactions
+# antérieures à la plus ancienne encore en cours: aucune ligne ne peut
+# apparaître plus tard derrière un jeton déjà rendu.
+CREATE_TRIGGERS = """
+CREATE FUNCTION hotels_txid_update() RETURNS trigger AS $$
+BEGIN
+    NEW.txid := pg_current_xact_id()::text::bigint;
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER hotels_txid_update_trigger BEFORE INSERT OR UPDATE ON hotels
+    FOR EACH ROW EXECUTE FUNCTION hotels_txid_update();
+
+CREATE OR REPLACE FUNCTION hotels_deletion_log() RETURNS trigger AS $$
+BEGIN
+    INSERT INTO hotel_deletions (hotel_id, deleted_at, txid)
+    SELECT id, clock_timestamp(), pg_current_xact_id()::text::bigint FROM anciennes;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+"""
+
+DROP_TRIGGERS = """
+DROP TRIGGER IF EXISTS hotels_txid_update_trigger ON hotels;
+DROP FUNCTION IF EXISTS hotels_txid_update();
+
+CREATE OR REPLACE FUNCTION hotels_deletion_log() RETURNS trigger AS $$
+BEGIN
+    INSERT INTO hotel_deletions (hotel_id, deleted_at)
+    SELECT id, clock_timestamp() FROM anciennes;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hotels', '0011_hotel_changes'),
+    ]
+
+    operations = [
+        # Lignes existantes: 0, avant toute transaction à venir
+        migrations.AddField(
+            model_name='hotel',
+            name='txid',
+            field=models.BigIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='hotelsupprime',
+            name='txid',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.RemoveIndex(
+            model_name='hotel',
+            name='hotels_updated_idx',
+        ),
+        migrations.AddIndex(
+            model_name='hotel',
+            index=models.Index(fields=['txid', 'id'], name='hotels_txid_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='hotelsupprime',
+            index=models.Index(fields=['txid', 'id'], name='hotel_deletions_txid_idx'),
+        ),
+        migrations.RunSQL(CREATE_TRIGGERS, reverse_sql=DROP_TRIGGERS),
+    ]
@@ -1,4 +1,9 @@
-from django.db import models
+from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
+from django.core.validators import MaxValueValidator, MinValueValidator
+from django.db import connection, models, transaction
+from django.db.models.functions import Lower
 from accounts.models import User
 
 class Hotel(models.Model):
@@ -14,16 +19,323 @@ class Hotel(models.Model):
     telephone = models.CharField(max_length=20, verbose_name="Numéro de téléphone")
     prix_par_nuit = models.DecimalField(max_digits=10, decimal_places=2, verbose_name="Prix par nuit")
     devise = models.CharField(max_length=3, choices=DEVISE_CHOICES, default='XOF')
+    # Prix converti dans la devise de référence (XOF), pour filtrer, trier et
+    # moyenner entre devises. Calculé par le trigger hotels_prix_reference_update
+    # (migration 0008) depuis exchange_rates: la valeur en mémoire après save()
+    # n'est pas rafraîchie.
+    prix_reference = models.DecimalField(max_digits=16, decimal_places=2, default=0, editable=False)
+    latitude = models.FloatField(
+        null=True, blank=True, verbose_name="Latitude",
+        validators=[MinValueValidator(-90), MaxValueValidator(90)],
+    )
+    longitude = models.FloatField(
+        null=True, blank=True, verbose_name="Longitude",
+        validators=[MinValueValidator(-180), MaxValueValidator(180)],
+    )
+    # Cellule geohash de la position, calculée par le trigger hotels_geohash_update
+    # (migration 0009); sert la recherche par rayon / rectangle (hotels.geo)
+    geohash = models.CharField(max_length=12, null=True, blank=True, editable=False)
     image = models.ImageField(upload_to='hotels/', null=True, blank=True, verbose_name="Photo")
-    created_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name='hotels')
+    # {format: {largeur: chemin}}, rempli en arrière-plan par hotels.images
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
+    created_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name='hotels', db_index=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # Transaction de la dernière écriture, posée par le trigger
+    # hotels_txid_update (migration 0012): position dans le flux de
+    # modifications (hotels.changes)
+    txid = models.BigIntegerField(default=0, editable=False)
+    # Maintenu par le trigger hotels_search_vector_update (migration 0003)
+    search_vector = SearchVectorField(null=True, editable=False)
+    
+    # Chemin de la photo au chargement (None: inconnu, instance non lue en base)
+    _image_initiale = None
+    # (adresse, latitude, longitude) au chargement, pour relancer le géocodage
+    _localisation_initiale = None
     
     class Meta:
         db_table = 'hotels'
         verbose_name = 'Hôtel'
         verbose_name_plural = 'Hôtels'
         ordering = ['-created_at']
+        # Index alignés sur les chemins d'accès de HotelViewSet: tri par défaut
+        # (-created_at), filtres devise / prix (prix_reference sans devise),
+        # tris nom / prix et mes_hotels.
+        # L'id termine chaque index pour servir la pagination par curseur.
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], name='hotels_created_idx'),
+            models.Index(fields=['devise', '-created_at', '-id'], name='hotels_devise_created_idx'),
+            models.Index(fields=['devise', 'prix_par_nuit', 'id'], name='hotels_devise_prix_idx'),
+            models.Index(fields=['devise', 'nom', 'id'], name='hotels_devise_nom_idx'),
+            models.Index(fields=['prix_reference', 'id'], name='hotels_prix_reference_idx'),
+            models.Index(fields=['nom', 'id'], name='hotels_nom_idx'),
+            models.Index(fields=['created_by', '-created_at', '-id'], name='hotels_createur_created_idx'),
+            GinIndex(fields=['search_vector'], name='hotels_search_idx'),
+            GinIndex(fields=['nom'], name='hotels_nom_trgm_idx', opclasses=['gin_trgm_ops']),
+            models.Index(fields=['image'], name='hotels_image_idx'),
+            # Clé naturelle des imports CSV (hotels.importer)
+            models.Index(Lower('email'), name='hotels_email_idx'),
+            # Recherche par préfixe geohash (LIKE 'abc%'), quelle que soit la collation
+            models.Index(fields=['geohash'], name='hotels_geohash_idx', opclasses=['varchar_pattern_ops']),
+            # Flux de modifications (hotels.changes): lignes modifiées depuis un jeton
+            models.Index(fields=['txid', 'id'], name='hotels_txid_idx'),
+        ]
+    
+    def __str__(self):
+        return self.nom
+    
+    def save(self, *args, **kwargs):
+        # Photo écrite par le stockage (pre_save) et référence prise par le
+        # signal post_save dans une même transaction (FichierMedia.reserver)
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Photo lue en base, pour détecter un remplacement au prochain save()
+        if 'image' in field_names:
+            instance._image_initiale = values[field_names.index('image')] or ''
+        if {'adresse', 'latitude', 'longitude'}.issubset(field_names):
+            instance._localisation_initiale = tuple(
+                values[field_names.index(nom)] for nom in ('adresse', 'latitude', 'longitude')
+            )
+        return instance
+
+
+class HotelSummary(models.Model):
+    """
+    Agrégats du catalogue par devise.
+
+    Table maintenue par les triggers hotels_summary_* (migration 0004) dans
+    la même transaction que chaque écriture sur `hotels`, y compris les
+    écritures en masse. Ne pas modifier directement: utiliser la commande
+    `rebuild_hotel_summary`.
+    """
+    devise = models.CharField(max_length=3, choices=Hotel.DEVISE_CHOICES, primary_key=True)
+    nombre = models.BigIntegerField(default=0)
+    somme = models.DecimalField(max_digits=20, decimal_places=2, default=0)
+    prix_min = models.DecimalField(max_digits=10, decimal_places=2, null=True)
+    prix_max = models.DecimalField(max_digits=10, decimal_places=2, null=True)
+    
+    class Meta:
+        db_table = 'hotels_summary'
+        verbose_name = 'Résumé par devise'
+        verbose_name_plural = 'Résumés par devise'
+    
+    def __str__(self):
+        return f"{self.devise}: {self.nombre}"
+
+
+class HotelSupprime(models.Model):
+    """
+    Journal des suppressions d'hôtels, lu par le flux de modifications
+    (hotels.changes) pour renvoyer des « pierres tombales ».
+
+    Alimenté par le trigger hotels_deletion_log (migration 0011), donc
+    aussi pour les suppressions en masse et en SQL. Purgé au-delà de
+    HOTEL_CHANGES_RETENTION_DAYS par la commande `purge_hotel_deletions`.
+    """
+    hotel_id = models.BigIntegerField()
+    deleted_at = models.DateTimeField()
+    # Transaction de la suppression (voir Hotel.txid)
+    txid = models.BigIntegerField(default=0)
+    
+    class Meta:
+        db_table = 'hotel_deletions'
+        verbose_name = 'Hôtel supprimé'
+        verbose_name_plural = 'Hôtels supprimés'
+        indexes = [
+            # Purge par date
+            models.Index(fields=['deleted_at', 'id'], name='hotel_deletions_idx'),
+            models.Index(fields=['txid', 'id'], name='hotel_deletions_txid_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.hotel_id} ({self.deleted_at})"
+
+
+class TauxDeChange(models.Model):
+    """
+    Taux de conversion d'une devise vers la devise de référence (XOF).
+
+    `taux` est la valeur d'une unité de la devise en XOF (XOF: 1). Toute
+    modification déclenche le recalcul par lots de Hotel.prix_reference
+    (hotels.currency). Une devise du catalogue doit toujours avoir un taux:
+    le trigger refuse d'enregistrer un hôtel dans une devise sans taux.
+    """
+    devise = models.CharField(max_length=3, choices=Hotel.DEVISE_CHOICES, primary_key=True)
+    taux = models.DecimalField(max_digits=20, decimal_places=10)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'exchange_rates'
+        verbose_name = 'Taux de change'
+        verbose_name_plural = 'Taux de change'
+    
+    def __str__(self):
+        return f"1 {self.devise} = {self.taux} XOF"
+
+
+class FichierMedia(models.Model):
+    """
+    Décompte des références vers un fichier du stockage média.
+
+    Les fichiers sont dédupliqués par contenu (hotels.storage): un même
+    fichier peut servir plusieurs hôtels et n'est supprimé, avec ses
+    miniatures, que lorsque plus aucun hôtel ne le référence.
+    """
+    chemin = models.CharField(max_length=255, primary_key=True)
+    nombre_references = models.IntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        db_table = 'media_files'
+        verbose_name = 'Fichier média'
+        verbose_name_plural = 'Fichiers média'
+    
+    def __str__(self):
+        return f"{self.chemin} ({self.nombre_references})"
+    
+    @classmethod
+    def acquerir(cls, chemin):
+        """Ajouter une référence (UPSERT atomique)"""
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                INSERT INTO {cls._meta.db_table} (chemin, nombre_references, created_at)
+                VALUES (%s, 1, now())
+                ON CONFLICT (chemin) DO UPDATE
+                SET nombre_references = {cls._meta.db_table}.nombre_references + 1
+                """,
+                [chemin],
+            )
+    
+    @classmethod
+    def reserver(cls, chemin):
+        """
+        Verrouiller la ligne du fichier (créée au besoin, sans référence)
+        jusqu'à la fin de la transaction courante, avant de se fier à un
+        exemplaire déjà écrit: un nettoyer() concurrent attend alors la
+        référence prise par l'enregistrement en cours, ou a déjà supprimé le
+        fichier, qui est réécrit.
+        """
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                INSERT INTO {cls._meta.db_table} (chemin, nombre_references, created_at)
+                VALUES (%s, 0, now())
+                ON CONFLICT (chemin) DO UPDATE
+                SET nombre_references = {cls._meta.db_table}.nombre_references
+                """,
+                [chemin],
+            )
+    
+    @classmethod
+    def liberer(cls, chemin):
+        """Retirer une référence; le fichier est supprimé après commit s'il n'en reste aucune"""
+        from red_product.tasks import run_in_background
+        
+        updated = cls.objects.filter(chemin=chemin).update(
+            nombre_references=models.F('nombre_references') - 1
+        )
+        if updated:
+            run_in_background(cls.nettoyer, chemin)
+    
+    @classmethod
+    def nettoyer(cls, chemin):
+        """Supprimer le fichier et ses miniatures s'il n'est plus référencé"""
+        with transaction.atomic():
+            fichier = cls.objects.select_for_update().filter(chemin=chemin).first()
+            if fichier is None or fichier.nombre_references > 0:
+                return
+            # Garde-fou: ne jamais supprimer un fichier encore visible en base
+            if Hotel.objects.filter(image=chemin).exists():
+                return
+            fichier.delete()
+            storage = Hotel._meta.get_field('image').storage
+            if hasattr(storage, 'delete_with_derivatives'):
+                storage.delete_with_derivatives(chemin)
+            else:
+                storage.delete(chemin)
+
+
+# Une position par nuit de l'année: index = jour de l'année - 1 (366 pour les
+# années bissextiles, la dernière position reste libre les autres années)
+JOURS_PAR_AN = 366
+
+
+class JoursField(models.Field):
+    """
+    Un bit par nuit de l'année (`bit(366)` PostgreSQL), valeur Python '0101...'.
+
+    Recherche: `complet__chevauche=masque` est vrai si un bit est à 1 à la
+    fois dans la colonne et dans le masque: un ET binaire et une comparaison.
+    """
+    description = "Bitset des nuits de l'année"
+
+    def db_type(self, connection):
+        return f'bit({JOURS_PAR_AN})'
+
+    def get_prep_value(self, value):
+        return None if value is None else str(value)
+
+
+@JoursField.register_lookup
+class Chevauche(models.Lookup):
+    lookup_name = 'chevauche'
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        zero = f'0::bit({JOURS_PAR_AN})'
+        return f'({lhs} & {rhs}::bit({JOURS_PAR_AN})) <> {zero}', lhs_params + rhs_params
+
+
+class TypeChambre(models.Model):
+    """Type de chambre d'un hôtel (ex: double, suite), disponible en `nombre` exemplaires"""
+    hotel = models.ForeignKey(Hotel, on_delete=models.CASCADE, related_name='types_chambre', db_index=False)
+    nom = models.CharField(max_length=100, verbose_name="Nom")
+    capacite = models.PositiveSmallIntegerField(default=2, verbose_name="Personnes par chambre")
+    nombre = models.PositiveSmallIntegerField(default=1, verbose_name="Nombre de chambres")
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'room_types'
+        verbose_name = 'Type de chambre'
+        verbose_name_plural = 'Types de chambre'
+        ordering = ['hotel', 'capacite', 'id']
+        indexes = [
+            # Recherche de disponibilité: types d'un hôtel assez grands
+            models.Index(fields=['hotel', 'capacite'], name='room_types_hotel_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.hotel} - {self.nom}"
+
+
+class CalendrierChambre(models.Model):
+    """
+    Occupation d'un type de chambre sur une année civile.
+
+    `occupation` compte les chambres prises chaque nuit; `complet` en est
+    le résumé binaire (1: plus aucune chambre libre), seul lu par la
+    recherche. Une année sans ligne est entièrement libre. Écrire par
+    hotels.availability, qui tient les deux colonnes cohérentes.
+    """
+    type_chambre = models.ForeignKey(TypeChambre, on_delete=models.CASCADE, related_name='calendriers')
+    annee = models.PositiveSmallIntegerField()
+    occupation = ArrayField(models.PositiveSmallIntegerField(), size=JOURS_PAR_AN)
+    complet = JoursField()
+    
+    class Meta:
+        db_table = 'room_calendars'
+        verbose_name = 'Calendrier de chambre'
+        verbose_name_plural = 'Calendriers de chambre'
+        constraints = [
+            models.UniqueConstraint(fields=['type_chambre', 'annee'], name='room_calendars_unique'),
+        ]
     
     def __str__(self):
-        return self.nom
\ No newline at end of file
+        return f"{self.type_chambre} ({self.annee})"
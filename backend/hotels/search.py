@@ -0,0 +1,74 @@
+import re
+
+from django.contrib.postgres.search import SearchQuery, SearchRank, TrigramWordSimilarity
+from django.db.models import F, FloatField, Q
+from django.db.models.functions import Cast
+from rest_framework import filters
+from rest_framework.settings import api_settings
+
+
+# Configuration plein texte créée par la migration 0003: français, sans accents
+SEARCH_CONFIG = 'french_unaccent'
+
+WORD_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def build_search_query(terms):
+    """
+    Construire une requête tsquery adaptée à la saisie en cours.
+
+    Les mots complets doivent tous correspondre, le dernier mot est traité
+    comme un préfixe (`hôt` trouve `Hôtel`).
+    """
+    words = WORD_RE.findall(terms)
+    if not words:
+        return None
+    parts = words[:-1] + [f'{words[-1]}:*']
+    return SearchQuery(' & '.join(parts), search_type='raw', config=SEARCH_CONFIG)
+
+
+class HotelSearchFilter(filters.BaseFilterBackend):
+    """
+    Recherche des hôtels via l'index plein texte et l'index trigramme.
+
+    - `search_vector` (GIN) couvre nom, adresse et email, pondérés dans cet ordre
+    - `nom %> terme` (GIN gin_trgm_ops) tolère les fautes de frappe sur le nom
+
+    Sans paramètre `ordering`, les résultats sont triés par pertinence
+    (`rank`), y compris par la pagination par curseur (HotelOrderingFilter).
+    Ce filtre doit donc être placé après OrderingFilter.
+    """
+    search_param = api_settings.SEARCH_PARAM
+    ordering_param = api_settings.ORDERING_PARAM
+
+    def filter_queryset(self, request, queryset, view):
+        terms = request.query_params.get(self.search_param, '').strip()
+        if not terms:
+            return queryset
+
+        query = build_search_query(terms)
+        similarity = TrigramWordSimilarity(terms, 'nom')
+        condition = Q(nom__trigram_word_similar=terms)
+        if query is not None:
+            condition |= Q(search_vector=query)
+            rank = SearchRank(F('search_vector'), query) + similarity
+        else:
+            rank = similarity
+
+        # double precision: la valeur relue depuis un curseur (pagination par
+        # curseur, triée sur `rank`) se compare exactement à celle de la base
+        queryset = queryset.filter(condition).annotate(rank=Cast(rank, FloatField()))
+        if not request.query_params.get(self.ordering_param):
+            queryset = queryset.order_by('-rank', '-id')
+        return queryset
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                'name': self.search_param,
+                'required': False,
+                'in': 'query',
+                'description': 'Recherche plein texte (nom, adresse, email), tolérante aux fautes.',
+                'schema': {'type': 'string'},
+            },
+        ]
@@ -1,16 +1,28 @@
 from rest_framework import serializers
-from hotels.models import Hotel
+from hotels.images import construire_srcset
+from hotels.availability import NUITS_MAX
+from hotels.models import Hotel, TypeChambre
 from accounts.models import User
+from red_product.sparse import SparseFieldsMixin
 
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """Serializer pour l'utilisateur créateur"""
     class Meta:
         model = User
         fields = ['id', 'email', 'username', 'first_name', 'last_name']
 
 
-class HotelSerializer(serializers.ModelSerializer):
+class ImageSrcsetMixin(serializers.Serializer):
+    """Expose les miniatures de la photo sous forme de srcset par format"""
+    image_srcset = serializers.SerializerMethodField()
+    method_field_sources = {'image_srcset': ['image_variants']}
+    
+    def get_image_srcset(self, obj):
+        return construire_srcset(obj.image_variants, self.context.get('request'))
+
+
+class HotelSerializer(SparseFieldsMixin, ImageSrcsetMixin, serializers.ModelSerializer):
     """Serializer pour les hôtels"""
     created_by = UserSerializer(read_only=True)
     
@@ -20,11 +32,14 @@ class HotelSerializer(serializers.ModelSerializer):
             'id', 
             'nom', 
             'adresse', 
+            'latitude', 
+            'longitude', 
             'email', 
             'telephone', 
             'prix_par_nuit', 
             'devise', 
             'image', 
+            'image_srcset', 
             'created_by', 
             'created_at', 
             'updated_at'
@@ -44,8 +59,68 @@ class HotelSerializer(serializers.ModelSerializer):
         return value
 
 
-class HotelListSerializer(serializers.ModelSerializer):
+class HotelListSerializer(SparseFieldsMixin, ImageSrcsetMixin, serializers.ModelSerializer):
     """Serializer simplifié pour la liste des hôtels"""
+    # Distance en km, seulement pour une recherche autour d'un point (?lat=&lng=)
+    distance = serializers.SerializerMethodField()
+    # Annotation du queryset, aucune colonne à lire
+    method_field_sources = {**ImageSrcsetMixin.method_field_sources, 'distance': []}
+    expandable_fields = {
+        'created_by': (UserSerializer, {}),
+    }
+    
     class Meta:
         model = Hotel
-        fields = ['id', 'nom', 'adresse', 'prix_par_nuit', 'devise', 'image']
\ No newline at end of file
+        fields = [
+            'id', 'nom', 'adresse', 'latitude', 'longitude', 'distance',
+            'prix_par_nuit', 'devise', 'image', 'image_srcset',
+        ]
+    
+    def get_distance(self, obj):
+        distance = getattr(obj, 'distance', None)
+        return round(distance, 3) if distance is not None else None
+
+
+class HotelBulkSerializer(HotelSerializer):
+    """Validation des envois en masse (JSON, donc sans photo)"""
+    image_srcset = None
+    
+    class Meta(HotelSerializer.Meta):
+        fields = [
+            'id', 
+            'nom', 
+            'adresse', 
+            'latitude', 
+            'longitude', 
+            'email', 
+            'telephone', 
+            'prix_par_nuit', 
+            'devise', 
+            'created_by', 
+            'created_at', 
+            'updated_at'
+        ]
+
+
+class TypeChambreSerializer(serializers.ModelSerializer):
+    """Serializer pour les types de chambre d'un hôtel"""
+    
+    class Meta:
+        model = TypeChambre
+        fields = ['id', 'hotel', 'nom', 'capacite', 'nombre', 'created_at', 'updated_at']
+        read_only_fields = ['id', 'created_at', 'updated_at']
+
+
+class SejourSerializer(serializers.Serializer):
+    """Séjour [arrivee, depart[ d'une réservation ou d'une recherche de disponibilité"""
+    arrivee = serializers.DateField()
+    depart = serializers.DateField()
+    nombre = serializers.IntegerField(min_value=1, default=1)
+    
+    def validate(self, data):
+        nuits = (data['depart'] - data['arrivee']).days
+        if nuits < 1:
+            raise serializers.ValidationError({'depart': ["Le départ doit suivre l'arrivée"]})
+        if nuits > NUITS_MAX:
+            raise serializers.ValidationError({'depart': [f'Séjour limité à {NUITS_MAX} nuits']})
+        return data
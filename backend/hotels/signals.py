@@ -0,0 +1,111 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from hotels.availability import recalculer_complet
+from hotels.currency import recalculer_prix_reference
+from hotels.facets import invalider_facettes
+from hotels.geo import geocoder_hotel
+from hotels.images import generer_variantes
+from hotels.models import FichierMedia, Hotel, TauxDeChange, TypeChambre
+from red_product.tasks import run_in_background
+
+
+@receiver(pre_save, sender=Hotel)
+def detecter_nouvelle_image(sender, instance, update_fields=None, **kwargs):
+    """Repérer une photo fraîchement envoyée, avant son écriture par le stockage"""
+    instance._nouvelle_image = False
+    if update_fields is not None and 'image' not in update_fields:
+        return
+    if instance._image_initiale is None and not instance._state.adding:
+        # Instance construite sans lecture préalable: photo actuellement en base
+        instance._image_initiale = (
+            Hotel.objects.filter(pk=instance.pk).values_list('image', flat=True).first() or ''
+        )
+    image = instance.image
+    if not image:
+        instance.image_variants = {}
+    elif not image._committed:
+        instance._nouvelle_image = True
+        instance.image_variants = {}
+
+
+@receiver(post_save, sender=Hotel)
+def suivre_image(sender, instance, update_fields=None, **kwargs):
+    """
+    Mettre à jour les références de fichiers et planifier les miniatures.
+
+    L'ancienne photo n'est supprimée du disque que si plus aucun hôtel ne
+    la partage (voir FichierMedia).
+    """
+    if update_fields is not None and 'image' not in update_fields:
+        return
+    ancienne = instance._image_initiale or ''
+    nouvelle = instance.image.name or ''
+    if nouvelle != ancienne:
+        if nouvelle:
+            FichierMedia.acquerir(nouvelle)
+        if ancienne:
+            FichierMedia.liberer(ancienne)
+    instance._image_initiale = nouvelle
+
+    # Générer les miniatures en arrière-plan une fois la transaction validée
+    if instance._nouvelle_image:
+        run_in_background(generer_variantes, instance.pk)
+
+
+@receiver(post_save, sender=Hotel)
+def planifier_geocodage(sender, instance, update_fields=None, **kwargs):
+    """Géocoder en arrière-plan un hôtel sans position, ou dont seule l'adresse a changé"""
+    if update_fields is not None and 'adresse' not in update_fields:
+        return
+    initiale = instance._localisation_initiale
+    actuelle = (instance.adresse, instance.latitude, instance.longitude)
+    instance._localisation_initiale = actuelle
+    if not instance.adresse:
+        return
+    
+    sans_position = instance.latitude is None or instance.longitude is None
+    # Nouvelle adresse sans nouvelles coordonnées: la position enregistrée est périmée
+    adresse_deplacee = (
+        initiale is not None
+        and initiale[0] != instance.adresse
+        and initiale[1:] == actuelle[1:]
+    )
+    if sans_position or adresse_deplacee:
+        run_in_background(geocoder_hotel, instance.pk)
+
+
+@receiver(post_delete, sender=Hotel)
+def liberer_image(sender, instance, **kwargs):
+    """Libérer la photo d'un hôtel supprimé (y compris via queryset ou cascade)"""
+    image = instance.__dict__.get('image')
+    chemin = getattr(image, 'name', image)
+    if chemin:
+        FichierMedia.liberer(chemin)
+
+
+@receiver(post_save, sender=Hotel)
+@receiver(post_delete, sender=Hotel)
+def invalider_facettes_hotel(sender, **kwargs):
+    """Les facettes en cache ne valent plus une fois l'écriture validée"""
+    transaction.on_commit(invalider_facettes)
+
+
+@receiver(post_save, sender=TypeChambre)
+def suivre_type_chambre(sender, instance, created, **kwargs):
+    """Le nombre de chambres a pu changer: nuits complètes à recalculer"""
+    if not created:
+        recalculer_complet(instance)
+    transaction.on_commit(invalider_facettes)
+
+
+@receiver(post_delete, sender=TypeChambre)
+def invalider_facettes_type_chambre(sender, **kwargs):
+    transaction.on_commit(invalider_facettes)
+
+
+@receiver(post_save, sender=TauxDeChange)
+def recalculer_prix_apres_taux(sender, instance, **kwargs):
+    """Reconvertir les prix de la devise, par lots et en arrière-plan"""
+    run_in_background(recalculer_prix_reference, instance.devise)
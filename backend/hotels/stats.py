@@ -0,0 +1,48 @@
+from django.db.models import Count, Sum
+
+from hotels.currency import DEVISE_REFERENCE
+from hotels.models import Hotel, HotelSummary, TauxDeChange
+
+
+DEVISES = [code for code, _ in Hotel.DEVISE_CHOICES]
+
+
+def statistiques_catalogue():
+    """
+    Statistiques du catalogue complet, lues dans hotels_summary (une ligne par devise)
+
+    La somme des prix de chaque devise est convertie avec son taux: la
+    conversion étant linéaire, la moyenne obtenue est celle des prix de
+    référence.
+    """
+    taux = dict(TauxDeChange.objects.values_list('devise', 'taux'))
+    return _formater({
+        ligne.devise: (ligne.nombre, ligne.somme * taux[ligne.devise])
+        for ligne in HotelSummary.objects.all()
+    })
+
+
+def statistiques_filtrees(queryset):
+    """Statistiques d'un queryset filtré, en une seule requête groupée par devise"""
+    lignes = (
+        queryset.order_by()
+        .values('devise')
+        .annotate(nombre=Count('id'), somme=Sum('prix_reference'))
+    )
+    return _formater({
+        ligne['devise']: (ligne['nombre'], ligne['somme'])
+        for ligne in lignes
+    })
+
+
+def _formater(par_devise):
+    total = sum(nombre for nombre, _ in par_devise.values())
+    somme = sum(somme or 0 for _, somme in par_devise.values())
+    return {
+        'total_hotels': total,
+        'hotels_par_devise': {
+            code: par_devise.get(code, (0, None))[0] for code in DEVISES
+        },
+        'prix_moyen': round(somme / total, 2) if total else None,
+        'devise_prix_moyen': DEVISE_REFERENCE,
+    }
@@ -0,0 +1,78 @@
+import hashlib
+import os
+import posixpath
+import re
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.core.files.utils import validate_file_name
+
+
+# <empreinte sha256>[_<largeur>w].<extension>
+CONTENT_ADDRESSED_RE = re.compile(r'(?:^|/)(?P<digest>[0-9a-f]{64})(?P<suffix>_\d+w)?\.[a-z0-9]+$')
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    Stockage nommant chaque fichier par l'empreinte SHA-256 de son contenu.
+
+    `hotels/photo.jpg` devient `hotels/3f/3f9a...c1.jpg`: deux envois
+    identiques partagent le même fichier, et une URL ne désigne jamais
+    qu'un seul contenu (cache navigateur/CDN illimité). Le décompte des
+    références est tenu par hotels.models.FichierMedia; `save()` doit
+    s'exécuter dans la transaction qui prend la référence (Hotel.save).
+    """
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        name = self.hashed_name(name, content)
+        # Référence réservée avant le test d'existence: le fichier ne peut
+        # plus être supprimé entre ce test et la fin de l'enregistrement
+        from hotels.models import FichierMedia
+        FichierMedia.reserver(name)
+        if not self.exists(name):
+            saved = self._save(name, content)
+            if saved != name:
+                # Envoi concurrent du même contenu: garder l'exemplaire déjà écrit
+                self.delete(saved)
+        validate_file_name(name, allow_relative_path=True)
+        return name
+
+    def hashed_name(self, name, content):
+        digest = hashlib.sha256()
+        if hasattr(content, 'seek'):
+            content.seek(0)
+        for chunk in content.chunks():
+            digest.update(chunk)
+        if hasattr(content, 'seek'):
+            content.seek(0)
+        digest = digest.hexdigest()
+        directory = posixpath.dirname(name.replace('\\', '/'))
+        extension = os.path.splitext(name)[1].lower()
+        return posixpath.join(directory, digest[:2], f'{digest}{extension}')
+
+    def save_derivative(self, name, content):
+        """Enregistrer un fichier dérivé (miniature) sous un nom imposé"""
+        if not self.exists(name):
+            saved = self._save(name, content)
+            if saved != name:
+                self.delete(saved)
+        return name
+
+    def delete_with_derivatives(self, name):
+        """Supprimer un fichier et ses dérivés `<nom>_<largeur>w.<ext>`"""
+        directory, filename = posixpath.split(name)
+        stem = re.escape(os.path.splitext(filename)[0])
+        derivative = re.compile(rf'^{stem}_\d+w\.[a-z0-9]+$')
+        if self.exists(directory):
+            for other in self.listdir(directory)[1]:
+                if derivative.match(other):
+                    self.delete(posixpath.join(directory, other))
+        self.delete(name)
+
+    @staticmethod
+    def is_content_addressed(name):
+        return CONTENT_ADDRESSED_RE.search(name) is not None
@@ -1,11 +1,13 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from hotels.views import HotelViewSet
+from hotels.views import HotelViewSet, TypeChambreViewSet
 
 app_name = 'hotels'
 
 # Router pour les ViewSets
 router = DefaultRouter()
+# Avant la route racine, dont le détail {id}/ capturerait 'chambres'
+router.register(r'chambres', TypeChambreViewSet, basename='type-chambre')
 router.register(r'', HotelViewSet, basename='hotel')
 
 urlpatterns = [
@@ -19,5 +21,16 @@ urlpatterns = [
 # PUT    /api/hotels/{id}/            - Modifier un hôtel (admin)
 # PATCH  /api/hotels/{id}/            - Modifier partiellement (admin)
 # DELETE /api/hotels/{id}/            - Supprimer un hôtel (admin)
+# GET    /api/hotels/?arrivee=&depart=&personnes= - Hôtels disponibles sur le séjour
 # GET    /api/hotels/mes_hotels/      - Mes hôtels
-# GET    /api/hotels/statistiques/    - Statistiques
\ No newline at end of file
+# GET    /api/hotels/changes/     - Flux de modifications (?since=jeton)
+# GET    /api/hotels/statistiques/    - Statistiques
+# GET    /api/hotels/export/          - Export CSV / NDJSON en flux (?type=)
+# POST   /api/hotels/importer/        - Importer un fichier CSV (admin)
+# POST   /api/hotels/en_masse/        - Créer une liste d'hôtels (admin)
+# PATCH  /api/hotels/en_masse/        - Modifier une liste d'hôtels (admin)
+# DELETE /api/hotels/en_masse/        - Supprimer une liste d'hôtels (admin)
+# GET    /api/hotels/chambres/?hotel= - Types de chambre (CRUD admin)
+# GET    /api/hotels/chambres/{id}/disponibilites/ - Chambres libres par nuit
+# POST   /api/hotels/chambres/{id}/reserver/ - Réserver un séjour (admin)
+# POST   /api/hotels/chambres/{id}/liberer/  - Libérer un séjour (admin)
@@ -1,10 +1,29 @@
+import csv
+import io
+
 from rest_framework import viewsets, permissions, status, filters
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
+from django.http import StreamingHttpResponse
+from django.utils import timezone
 from django_filters.rest_framework import DjangoFilterBackend
-from hotels.models import Hotel
-from hotels.serializers import HotelSerializer, HotelListSerializer
-from django.db import models
+from accounts.serializers import UserSerializer
+from hotels.availability import ChambresIndisponibles, disponibilites, filtre_disponibilite, liberer, reserver
+from hotels.bulk import MAX_ELEMENTS, creer_en_masse, modifier_en_masse, supprimer_en_masse
+from hotels.changes import LIMITE_DEFAUT, LIMITE_MAX, JetonExpire, JetonInvalide, modifications
+from hotels.export import EXPORTEURS, FORMATS
+from hotels.facets import facettes, invalider_facettes
+from hotels.geo import RAYON_MAX_KM, filtre_rectangle, filtrer_rayon
+from hotels.importer import importer_hotels
+from hotels.models import Hotel, TypeChambre
+from hotels.serializers import HotelSerializer, HotelListSerializer, SejourSerializer, TypeChambreSerializer
+from hotels.search import HotelSearchFilter
+from hotels.stats import statistiques_catalogue, statistiques_filtrees
+from red_product.conditional import ConditionalGetMixin
+from red_product.fastpath import FastListMixin, Row
+from red_product.pagination import HybridPagination
+from red_product.sparse import SparseQuerysetMixin
 
 
 class IsAuthenticatedOrAdmin(permissions.BasePermission):
@@ -32,21 +51,81 @@ class IsAuthenticatedOrAdmin(permissions.BasePermission):
         return request.user.is_admin or request.user.is_superuser or request.user.is_staff
 
 
-class HotelViewSet(viewsets.ModelViewSet):
+def version_createur(hotel):
+    """
+    Valeurs du créateur imbriqué dans la réponse (`created_by`), pour les
+    validateurs d'ETag: un changement de l'utilisateur ne touche pas
+    l'updated_at de ses hôtels. Aucune requête: seule une relation déjà lue
+    (select_related, colonnes `created_by__*` d'une ligne values()) compte.
+    """
+    if isinstance(hotel, Row):
+        return sorted((cle, valeur) for cle, valeur in hotel.items() if cle.startswith('created_by__'))
+    if not Hotel.created_by.is_cached(hotel):
+        return None
+    createur = hotel.created_by
+    return [getattr(createur, champ) for champ in UserSerializer.Meta.fields]
+
+
+class HotelOrderingFilter(filters.OrderingFilter):
+    """
+    Tri `prix_par_nuit` sur le prix de référence quand aucune devise n'est
+    filtrée: 120 EUR passe alors après 45000 XOF, et non avant.
+
+    Tri `distance` pour les recherches autour d'un point (`?lat=&lng=`).
+
+    Tri par pertinence (`rank`) pour les recherches textuelles (`?search=`),
+    y compris sous la pagination par curseur, qui lit son tri ici.
+    """
+    prix_convertis = {
+        'prix_par_nuit': 'prix_reference',
+        '-prix_par_nuit': '-prix_reference',
+    }
+    
+    def get_ordering(self, request, queryset, view):
+        ordering = super().get_ordering(request, queryset, view)
+        # `distance` n'existe que pour une recherche autour d'un point, où
+        # elle devient le tri par défaut
+        avec_distance = 'distance' in queryset.query.annotations
+        if avec_distance and not request.query_params.get(self.ordering_param):
+            return ['distance']
+        # De même pour `rank`, annoté par HotelSearchFilter
+        if 'rank' in queryset.query.annotations and not request.query_params.get(self.ordering_param):
+            return ['-rank']
+        if ordering and not avec_distance:
+            ordering = [terme for terme in ordering if terme.lstrip('-') != 'distance'] or None
+        if ordering and not request.query_params.get('devise'):
+            ordering = [self.prix_convertis.get(terme, terme) for terme in ordering]
+        return ordering
+
+
+class HotelViewSet(ConditionalGetMixin, FastListMixin, SparseQuerysetMixin, viewsets.ModelViewSet):
     """
     ViewSet pour gérer les opérations CRUD sur les hôtels
+
+    La liste est paginée par numéro de page (`?page=`) ou par curseur
+    (`?pagination=cursor`, puis les liens `next`/`previous`).
+
+    Les lectures renvoient un ETag: avec `If-None-Match`, une ressource
+    inchangée répond `304 Not Modified` sans être resérialisée.
+
+    `?fields=id,nom` et `?expand=created_by` restreignent la réponse, et
+    avec elle les colonnes lues et les jointures (red_product.sparse).
+    La liste est lue par `values()`, sans serializer par ligne
+    (red_product.fastpath).
     """
     queryset = Hotel.objects.all().select_related('created_by')
     serializer_class = HotelSerializer
     permission_classes = [IsAuthenticatedOrAdmin]
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
-    search_fields = ['nom', 'adresse', 'email']
-    ordering_fields = ['nom', 'prix_par_nuit', 'created_at']
+    pagination_class = HybridPagination
+    filter_backends = [DjangoFilterBackend, HotelOrderingFilter, HotelSearchFilter]
+    ordering_fields = ['nom', 'prix_par_nuit', 'created_at', 'distance']
     ordering = ['-created_at']
+    # Validateur des ETags de liste, même avec `?fields=`
+    sparse_required_fields = ['updated_at']
     
     def get_serializer_class(self):
         """Utiliser un serializer simplifié pour la liste"""
-        if self.action == 'list':
+        if self.action in ('list', 'changements'):
             return HotelListSerializer
         return HotelSerializer
     
@@ -56,55 +135,301 @@ class HotelViewSet(viewsets.ModelViewSet):
     
     def get_queryset(self):
         """Filtrer les hôtels selon les paramètres de recherche"""
-        queryset = Hotel.objects.all().select_related('created_by')
-        
-        # Recherche par nom
-        search = self.request.query_params.get('search', None)
-        if search:
-            queryset = queryset.filter(nom__icontains=search)
+        # La recherche textuelle (?search=) est assurée par HotelSearchFilter
+        queryset = Hotel.objects.all().select_related('created_by').defer('search_vector')
         
         # Filtre par devise
         devise = self.request.query_params.get('devise', None)
         if devise:
             queryset = queryset.filter(devise=devise)
         
-        # Filtre par prix min/max
+        # Filtre par prix min/max: dans la devise demandée, sinon en prix de
+        # référence (XOF) pour comparer toutes les devises entre elles
+        champ_prix = 'prix_par_nuit' if devise else 'prix_reference'
         prix_min = self.request.query_params.get('prix_min', None)
         if prix_min:
-            queryset = queryset.filter(prix_par_nuit__gte=prix_min)
+            queryset = queryset.filter(**{f'{champ_prix}__gte': prix_min})
         
         prix_max = self.request.query_params.get('prix_max', None)
         if prix_max:
-            queryset = queryset.filter(prix_par_nuit__lte=prix_max)
+            queryset = queryset.filter(**{f'{champ_prix}__lte': prix_max})
+        
+        # Recherche géographique: rectangle (vue carte) et/ou rayon autour d'un point
+        params = self.request.query_params
+        if params.get('bbox'):
+            try:
+                lng_min, lat_min, lng_max, lat_max = [float(v) for v in params['bbox'].split(',')]
+            except ValueError:
+                raise ValidationError({'bbox': ['Format attendu: lng_min,lat_min,lng_max,lat_max']})
+            for nom, valeur, limite in [
+                ('lng_min', lng_min, 180), ('lat_min', lat_min, 90),
+                ('lng_max', lng_max, 180), ('lat_max', lat_max, 90),
+            ]:
+                if not -limite <= valeur <= limite:
+                    raise ValidationError({'bbox': [f'{nom} doit être compris entre -{limite} et {limite}']})
+            if lat_min > lat_max:
+                raise ValidationError({'bbox': ['lat_min doit être inférieure à lat_max']})
+            queryset = queryset.filter(filtre_rectangle(lat_min, lng_min, lat_max, lng_max))
+        
+        if params.get('lat') or params.get('lng'):
+            latitude = self.parametre_nombre('lat', -90, 90)
+            longitude = self.parametre_nombre('lng', -180, 180)
+            rayon = self.parametre_nombre('rayon', 0, RAYON_MAX_KM, defaut=10)
+            queryset = filtrer_rayon(queryset, latitude, longitude, rayon)
+        
+        # Disponibilité: au moins un type de chambre libre toutes les nuits
+        # [arrivee, depart[ pour `personnes` (hotels.availability)
+        if params.get('arrivee') or params.get('depart'):
+            sejour = SejourSerializer(data={'arrivee': params.get('arrivee'), 'depart': params.get('depart')})
+            sejour.is_valid(raise_exception=True)
+            personnes = int(self.parametre_nombre('personnes', 1, 100, defaut=1))
+            queryset = queryset.filter(filtre_disponibilite(
+                sejour.validated_data['arrivee'], sejour.validated_data['depart'], personnes,
+            ))
         
         return queryset
     
+    def parametre_nombre(self, nom, minimum, maximum, defaut=None):
+        """Lire un paramètre numérique borné, 400 s'il est absent ou invalide"""
+        valeur = self.request.query_params.get(nom)
+        if not valeur and defaut is not None:
+            return defaut
+        try:
+            nombre = float(valeur)
+        except (TypeError, ValueError):
+            raise ValidationError({nom: ['Nombre requis.']})
+        if not minimum <= nombre <= maximum:
+            raise ValidationError({nom: [f'Doit être compris entre {minimum} et {maximum}.']})
+        return nombre
+    
+    def list(self, request, *args, **kwargs):
+        """
+        Liste des hôtels, 304 si rien n'a changé depuis la dernière lecture
+
+        Avec `?facettes=true`, la réponse ajoute le nombre de résultats par
+        devise et par tranche de prix pour les mêmes filtres (hotels.facets).
+        """
+        return self.page_hotels(
+            request,
+            self.filter_queryset(self.get_queryset()),
+            avec_facettes=request.query_params.get('facettes') in ('true', '1'),
+        )
+    
+    def page_hotels(self, request, queryset, avec_facettes=False):
+        """Page de `queryset` (numéro de page ou curseur), validée par ETag"""
+        queryset, represent = self.fast_list_queryset(queryset)
+        page = self.paginate_queryset(queryset)
+        
+        # Validateur tiré de la page déjà lue: aucune requête en plus et, en
+        # mode curseur, toujours aucun parcours de l'ensemble filtré
+        validateurs = [(hotel.pk, hotel.updated_at, version_createur(hotel)) for hotel in page]
+        validateurs.append(self.paginator.get_page_version())
+        
+        resultats_facettes = None
+        if avec_facettes:
+            resultats_facettes = facettes(queryset, request.query_params)
+            validateurs.append(resultats_facettes)
+        
+        def reponse():
+            if represent is not None:
+                data = [represent(hotel) for hotel in page]
+            else:
+                data = self.get_serializer(page, many=True).data
+            response = self.get_paginated_response(data)
+            if resultats_facettes is not None:
+                response.data['facettes'] = resultats_facettes
+            return response
+        
+        return self.conditional_response(request, reponse, *validateurs)
+    
+    def retrieve(self, request, *args, **kwargs):
+        """Détail d'un hôtel, validé par son updated_at et son créateur"""
+        instance = self.get_object()
+        return self.conditional_response(
+            request,
+            lambda: Response(self.get_serializer(instance).data),
+            instance.updated_at,
+            version_createur(instance),
+        )
+    
     @action(detail=False, methods=['get'])
     def mes_hotels(self, request):
-        """Retourner uniquement les hôtels créés par l'utilisateur connecté"""
-        hotels = self.get_queryset().filter(created_by=request.user)
-        serializer = self.get_serializer(hotels, many=True)
-        return Response(serializer.data)
+        """
+        Hôtels créés par l'utilisateur connecté, paginés comme la liste
+
+        Servi par l'index (created_by, created_at, id): le coût d'une page ne
+        dépend pas du nombre d'hôtels de l'utilisateur en mode curseur.
+        """
+        hotels = self.sparse_queryset(self.get_queryset().filter(created_by=request.user))
+        return self.page_hotels(request, hotels)
+    
+    @action(detail=False, methods=['get'], url_path='changes')
+    def changements(self, request):
+        """
+        Hôtels créés, modifiés ou supprimés depuis le jeton `?since=`
+
+        Réponse: `hotels` (mêmes champs que la liste, `?fields=` compris),
+        `supprimes` (ids), `since` (jeton du prochain appel) et `plus` (rappeler
+        tout de suite avec ce jeton). Sans `since`: tout le catalogue, par lots.
+        Les filtres de la liste ne s'appliquent pas: un hôtel sorti d'un
+        filtre ne produirait aucune suppression. Jeton expiré: 410, le client
+        recharge le catalogue complet (hotels.changes).
+        """
+        limite = int(self.parametre_nombre('limit', 1, LIMITE_MAX, defaut=LIMITE_DEFAUT))
+        # Trié dès ici: txid, position du jeton, est lu même avec `?fields=`
+        hotels = self.sparse_queryset(
+            Hotel.objects.all().select_related('created_by').defer('search_vector').order_by('txid', 'id')
+        )
+        hotels, represent = self.fast_list_queryset(hotels)
+        try:
+            hotels, supprimes, jeton, plus = modifications(
+                hotels, request.query_params.get('since') or None, limite,
+            )
+        except JetonInvalide as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        except JetonExpire as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_410_GONE)
+        
+        if represent is not None:
+            data = [represent(hotel) for hotel in hotels]
+        else:
+            data = self.get_serializer(hotels, many=True).data
+        return Response({
+            'hotels': data,
+            'supprimes': supprimes,
+            'since': jeton,
+            'plus': plus,
+        })
     
     @action(detail=False, methods=['get'])
     def statistiques(self, request):
-        """Retourner des statistiques sur les hôtels"""
-        queryset = self.get_queryset()
-        
-        stats = {
-            'total_hotels': queryset.count(),
-            'hotels_par_devise': {
-                'XOF': queryset.filter(devise='XOF').count(),
-                'EUR': queryset.filter(devise='EUR').count(),
-                'USD': queryset.filter(devise='USD').count(),
-            },
-            'prix_moyen': queryset.aggregate(
-                avg_prix=models.Avg('prix_par_nuit')
-            )['avg_prix'],
-        }
+        """
+        Retourner des statistiques sur les hôtels
+
+        Sans filtre, les chiffres viennent de la table hotels_summary tenue à
+        jour par trigger; avec filtres, d'une requête groupée par devise.
+        """
+        queryset = self.filter_queryset(self.get_queryset())
+        
+        if queryset.query.has_filters():
+            stats = statistiques_filtrees(queryset)
+        else:
+            stats = statistiques_catalogue()
         
         return Response(stats)
     
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        """
+        Exporter le catalogue en flux, avec les mêmes filtres et tris que la liste
+
+        `?type=csv` (par défaut) ou `?type=ndjson`. Le paramètre `format` est
+        réservé par DRF au choix du rendu.
+        """
+        type_export = request.query_params.get('type', 'csv')
+        if type_export not in EXPORTEURS:
+            return Response(
+                {'error': f"Type d'export inconnu, valeurs possibles: {', '.join(EXPORTEURS)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        queryset = self.filter_queryset(self.get_queryset())
+        response = StreamingHttpResponse(
+            EXPORTEURS[type_export](queryset, request),
+            content_type=FORMATS[type_export],
+        )
+        nom_fichier = f"hotels-{timezone.now():%Y%m%d-%H%M%S}.{type_export}"
+        response['Content-Disposition'] = f'attachment; filename="{nom_fichier}"'
+        response['Cache-Control'] = 'no-store'
+        return response
+    
+    @action(detail=False, methods=['post', 'patch', 'delete'])
+    def en_masse(self, request):
+        """
+        Créer (POST), modifier partiellement (PATCH) ou supprimer (DELETE)
+        une liste d'hôtels en une requête
+
+        POST: [{"nom": ..., "prix_par_nuit": ...}, ...]
+        PATCH: [{"id": 12, "prix_par_nuit": ...}, ...]
+        DELETE: [12, 13, ...]
+
+        Les éléments invalides sont signalés un par un sans bloquer les autres.
+        """
+        elements = request.data
+        if not isinstance(elements, list):
+            return Response(
+                {'error': 'Une liste JSON est attendue'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if len(elements) > MAX_ELEMENTS:
+            return Response(
+                {'error': f'Au plus {MAX_ELEMENTS} éléments par requête'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        context = self.get_serializer_context()
+        if request.method == 'POST':
+            resultats = creer_en_masse(elements, request.user, context)
+            code_succes = status.HTTP_201_CREATED
+        elif request.method == 'PATCH':
+            resultats = modifier_en_masse(elements, context)
+            code_succes = status.HTTP_200_OK
+        else:
+            resultats = supprimer_en_masse(elements)
+            code_succes = status.HTTP_200_OK
+        
+        echecs = sum(1 for resultat in resultats if 'erreurs' in resultat)
+        if echecs < len(resultats):
+            # Écritures en masse: aucun signal par hôtel
+            invalider_facettes()
+        if not echecs:
+            code = code_succes
+        elif echecs == len(resultats):
+            code = status.HTTP_400_BAD_REQUEST
+        else:
+            code = status.HTTP_207_MULTI_STATUS
+        
+        return Response(
+            {
+                'reussis': len(resultats) - echecs,
+                'echecs': echecs,
+                'resultats': resultats,
+            },
+            status=code
+        )
+    
+    @action(detail=False, methods=['post'])
+    def importer(self, request):
+        """
+        Importer un fichier CSV d'hôtels (champ `fichier`, multipart)
+
+        Les hôtels existants (même e-mail) sont mis à jour, les autres créés.
+        Paramètre optionnel `delimiter` (défaut: ,).
+        """
+        fichier = request.FILES.get('fichier')
+        if fichier is None:
+            return Response(
+                {'error': 'Fichier CSV manquant (champ "fichier")'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        delimiter = request.data.get('delimiter') or ','
+        try:
+            rapport = importer_hotels(
+                io.TextIOWrapper(fichier.file, encoding='utf-8-sig', newline=''),
+                request.user,
+                delimiter=delimiter,
+            )
+        except (ValueError, TypeError) as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        except csv.Error as exc:
+            # Octet NUL, champ trop long, guillemets non fermés...
+            return Response({'error': f'Fichier CSV illisible: {exc}'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        if rapport['inseres'] or rapport['mis_a_jour']:
+            invalider_facettes()
+        return Response(rapport)
+    
     def destroy(self, request, *args, **kwargs):
         """Supprimer un hôtel avec message de confirmation"""
         instance = self.get_object()
@@ -112,4 +437,53 @@ class HotelViewSet(viewsets.ModelViewSet):
         return Response(
             {"message": "Hôtel supprimé avec succès"},
             status=status.HTTP_204_NO_CONTENT
-        )
\ No newline at end of file
+        )
+
+
+class TypeChambreViewSet(viewsets.ModelViewSet):
+    """
+    Types de chambre des hôtels et leur calendrier de disponibilité
+
+    `?hotel=<id>` limite la liste aux types d'un hôtel. Les réservations
+    tiennent à jour le calendrier compact lu par la recherche d'hôtels
+    (`/api/hotels/?arrivee=&depart=&personnes=`).
+    """
+    queryset = TypeChambre.objects.all()
+    serializer_class = TypeChambreSerializer
+    permission_classes = [IsAuthenticatedOrAdmin]
+    filter_backends = [DjangoFilterBackend]
+    filterset_fields = ['hotel']
+    
+    @action(detail=True, methods=['get'])
+    def disponibilites(self, request, pk=None):
+        """Chambres libres nuit par nuit (?arrivee=&depart=, départ exclu)"""
+        type_chambre = self.get_object()
+        sejour = SejourSerializer(data=request.query_params)
+        sejour.is_valid(raise_exception=True)
+        return Response(disponibilites(
+            type_chambre, sejour.validated_data['arrivee'], sejour.validated_data['depart'],
+        ))
+    
+    @action(detail=True, methods=['post'])
+    def reserver(self, request, pk=None):
+        """Réserver `nombre` chambres de ce type pour un séjour (admin)"""
+        type_chambre = self.get_object()
+        sejour = SejourSerializer(data=request.data)
+        sejour.is_valid(raise_exception=True)
+        try:
+            reserver(type_chambre.pk, **sejour.validated_data)
+        except ChambresIndisponibles as exc:
+            return Response(
+                {'error': str(exc), 'nuits': [nuit.isoformat() for nuit in exc.nuits]},
+                status=status.HTTP_409_CONFLICT
+            )
+        return Response({'message': 'Réservation enregistrée'})
+    
+    @action(detail=True, methods=['post'])
+    def liberer(self, request, pk=None):
+        """Rendre `nombre` chambres de ce type pour un séjour (admin)"""
+        type_chambre = self.get_object()
+        sejour = SejourSerializer(data=request.data)
+        sejour.is_valid(raise_exception=True)
+        liberer(type_chambre.pk, **sejour.validated_data)
+        return Response({'message': 'Chambres libérées'})
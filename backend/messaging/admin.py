@@ -1,12 +1,20 @@
 from django.contrib import admin
-from messaging.models import Message
+from django.db.models import Q
+from accounts.models import User
+from hotels.search import build_search_query
+from messaging.models import Conversation, Message
 
 
 @admin.register(Message)
 class MessageAdmin(admin.ModelAdmin):
     list_display = ['sujet', 'expediteur', 'destinataire', 'status', 'date_envoi', 'date_lecture']
     list_filter = ['status', 'date_envoi']
-    search_fields = ['sujet', 'contenu', 'expediteur__username', 'destinataire__username']
+    list_select_related = ['expediteur', 'destinataire']
+    # Affiche le champ de recherche; la recherche elle-même est get_search_results
+    search_fields = ['sujet']
+    search_help_text = "Mots du sujet ou du contenu, ou nom d'utilisateur"
+    # Pas de COUNT(*) de toute la table à chaque recherche
+    show_full_result_count = False
     ordering = ['-date_envoi']
     readonly_fields = ['date_envoi', 'date_lecture']
     
@@ -21,4 +29,36 @@ class MessageAdmin(admin.ModelAdmin):
     
     def has_add_permission(self, request):
         """Ne pas permettre l'ajout depuis l'admin"""
-        return False
\ No newline at end of file
+        return False
+    
+    def get_queryset(self, request):
+        return super().get_queryset(request).defer('search_vector')
+    
+    def get_search_results(self, request, queryset, search_term):
+        """
+        Recherche par l'index plein texte (messages_search_idx) plutôt que
+        par ILIKE sur toute la table; les noms d'utilisateur trouvés
+        ajoutent leurs messages envoyés et reçus (index des clés étrangères)
+        """
+        terms = search_term.strip()
+        query = build_search_query(terms)
+        if query is None:
+            return queryset, False
+        condition = Q(search_vector=query)
+        utilisateurs = list(
+            User.objects.filter(username__icontains=terms).values_list('pk', flat=True)[:100]
+        )
+        if utilisateurs:
+            condition |= Q(expediteur_id__in=utilisateurs) | Q(destinataire_id__in=utilisateurs)
+        return queryset.filter(condition), False
+
+
+@admin.register(Conversation)
+class ConversationAdmin(admin.ModelAdmin):
+    list_display = ['cle', 'derniere_activite', 'created_at']
+    ordering = ['-derniere_activite']
+    readonly_fields = ['cle', 'dernier_message', 'derniere_activite', 'created_at']
+    
+    def has_add_permission(self, request):
+        """Créées à l'envoi du premier message"""
+        return False
@@ -0,0 +1,400 @@
+"""
+Conversations et boîtes de messages: champs dénormalisés tenus à jour à
+chaque écriture.
+
+- envoi: la conversation de la paire est créée au besoin; dernier message,
+  dernière activité et non lus du destinataire sont mis à jour; une entrée
+  de boîte (BoiteMessage) est écrite pour chaque partie
+- lecture, archivage d'un message non lu par le destinataire: non lus - 1
+- suppression: idem si le message était non lu, et nouveau dernier message
+- chaque écriture ajuste aussi les compteurs de boîte des utilisateurs
+  concernés (CompteurMessages)
+
+Envoi, lecture et archivage publient aussi un événement temps réel
+(messaging.events).
+
+Les actions groupées (marquer_messages_lus, archiver_messages,
+supprimer_messages) verrouillent les entrées visées par id croissant, les
+copient dans une table temporaire, puis écrivent par quelques UPDATE /
+DELETE joints à celle-ci: compteurs et non lus sont calculés en SQL, sans
+charger les entrées ni dépendre de leur nombre.
+
+Un message ne compte comme non lu que dans la boîte du destinataire, tant
+qu'il n'y est ni lu ni archivé. Chaque mise à jour est un UPDATE avec F(),
+dans la transaction de l'écriture: pas de lecture préalable, pas de perte
+entre requêtes concurrentes.
+"""
+from django.db import connection, transaction
+from django.db.models import Case, DateTimeField, F, PositiveIntegerField, When
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from messaging import events
+from messaging.models import (
+    BoiteMessage,
+    CompteurMessages,
+    Conversation,
+    Message,
+    ParticipantConversation,
+)
+
+
+def cle_conversation(utilisateur_id, interlocuteur_id):
+    return f'{min(utilisateur_id, interlocuteur_id)}:{max(utilisateur_id, interlocuteur_id)}'
+
+
+def ajuster_compteurs(utilisateur_id, **deltas):
+    """Ajouter `deltas` (ex: non_lus=-1) aux compteurs de boîte de l'utilisateur"""
+    valeurs = {
+        champ: F(champ) + delta if delta > 0 else Greatest(F(champ) + delta, 0)
+        for champ, delta in deltas.items() if delta
+    }
+    if not valeurs:
+        return
+    compteurs = CompteurMessages.objects.filter(pk=utilisateur_id)
+    if not compteurs.update(**valeurs):
+        # Utilisateur sans ligne (créé depuis la migration 0005): boîte vide
+        CompteurMessages.objects.get_or_create(pk=utilisateur_id)
+        compteurs.update(**valeurs)
+
+
+def deltas_boite(boite, signe=1):
+    """Contribution d'une entrée de boîte à chaque compteur de son utilisateur"""
+    return {
+        'total': signe,
+        'recus': signe * boite.recu,
+        'envoyes': signe * boite.envoye,
+        'non_lus': signe * (boite.recu and not boite.lu and not boite.archive),
+        'archives': signe * boite.archive,
+    }
+
+
+def conversation_entre(utilisateur, interlocuteur, date):
+    """Conversation de la paire d'utilisateurs, créée avec ses participants au besoin"""
+    conversation, creee = Conversation.objects.get_or_create(
+        cle=cle_conversation(utilisateur.pk, interlocuteur.pk),
+        defaults={'derniere_activite': date},
+    )
+    if creee:
+        participants = {(utilisateur.pk, interlocuteur.pk), (interlocuteur.pk, utilisateur.pk)}
+        ParticipantConversation.objects.bulk_create([
+            ParticipantConversation(
+                conversation=conversation,
+                utilisateur_id=utilisateur_id,
+                interlocuteur_id=interlocuteur_id,
+                derniere_activite=date,
+            )
+            for utilisateur_id, interlocuteur_id in participants
+        ])
+    return conversation
+
+
+@transaction.atomic
+def envoyer_message(expediteur, destinataire, **champs):
+    """Créer un message dans la conversation de la paire et mettre celle-ci à jour"""
+    message = Message(expediteur=expediteur, destinataire=destinataire, **champs)
+    # date_envoi (auto_now_add) n'est connue qu'à l'insertion
+    message.conversation = conversation_entre(expediteur, destinataire, timezone.now())
+    message.save()
+    
+    if expediteur.pk == destinataire.pk:
+        boites = [BoiteMessage(utilisateur=expediteur, recu=True, envoye=True)]
+    else:
+        boites = [
+            BoiteMessage(utilisateur=expediteur, envoye=True, lu=True),
+            BoiteMessage(utilisateur=destinataire, recu=True),
+        ]
+    for boite in boites:
+        boite.message = message
+        boite.date_envoi = message.date_envoi
+    BoiteMessage.objects.bulk_create(boites)
+    # Par utilisateur croissant: deux envois croisés verrouillent les
+    # lignes de compteurs dans le même ordre
+    for boite in sorted(boites, key=lambda boite: boite.utilisateur_id):
+        ajuster_compteurs(boite.utilisateur_id, **deltas_boite(boite))
+
+    # Un envoi concurrent plus récent a pu passer avant: ne pas revenir en arrière
+    Conversation.objects.filter(
+        pk=message.conversation_id, derniere_activite__lte=message.date_envoi,
+    ).update(dernier_message=message, derniere_activite=message.date_envoi)
+    ParticipantConversation.objects.filter(conversation_id=message.conversation_id).update(
+        non_lus=Case(
+            When(utilisateur_id=destinataire.pk, then=F('non_lus') + 1),
+            default=F('non_lus'),
+            output_field=PositiveIntegerField(),
+        ),
+        derniere_activite=Case(
+            When(derniere_activite__lt=message.date_envoi, then=message.date_envoi),
+            default=F('derniere_activite'),
+            output_field=DateTimeField(),
+        ),
+    )
+    events.message_envoye(message)
+    return message
+
+
+def retirer_non_lu(message):
+    """Le message ne compte plus parmi les non lus du destinataire"""
+    ajuster_compteurs(message.destinataire_id, non_lus=-1)
+    _retirer_non_lu_conversation(message)
+
+
+def _retirer_non_lu_conversation(message):
+    if message.conversation_id is None:
+        return
+    ParticipantConversation.objects.filter(
+        conversation_id=message.conversation_id,
+        utilisateur_id=message.destinataire_id,
+        non_lus__gt=0,
+    ).update(non_lus=F('non_lus') - 1)
+
+
+def _boite_non_lue(message):
+    return BoiteMessage.objects.filter(
+        message_id=message.pk,
+        utilisateur_id=message.destinataire_id,
+        recu=True,
+        lu=False,
+        archive=False,
+    )
+
+
+@transaction.atomic
+def marquer_boite_lue(message):
+    """Le destinataire a lu le message"""
+    if _boite_non_lue(message).update(lu=True):
+        retirer_non_lu(message)
+    events.message_lu(message)
+    # Message déjà archivé: il ne comptait plus parmi les non lus
+    BoiteMessage.objects.filter(
+        message_id=message.pk, utilisateur_id=message.destinataire_id, lu=False,
+    ).update(lu=True)
+
+
+@transaction.atomic
+def archiver_message(message, utilisateur):
+    """Archiver le message dans la boîte de `utilisateur` seulement"""
+    archivees = 0
+    if utilisateur.pk == message.destinataire_id and _boite_non_lue(message).update(archive=True):
+        retirer_non_lu(message)
+        archivees = 1
+    archivees += BoiteMessage.objects.filter(
+        message_id=message.pk, utilisateur=utilisateur, archive=False,
+    ).update(archive=True)
+    ajuster_compteurs(utilisateur.pk, archives=archivees)
+    events.message_archive(message, utilisateur)
+
+
+@transaction.atomic
+def supprimer_message(message):
+    """Supprimer un message en gardant sa conversation cohérente"""
+    # Par id croissant, comme les actions groupées (_selectionner)
+    boites = list(
+        BoiteMessage.objects.filter(message_id=message.pk)
+        .select_for_update()
+        .order_by('pk')
+        .only('utilisateur_id', 'recu', 'envoye', 'lu', 'archive')
+    )
+    # Compteurs par utilisateur croissant, puis conversation, puis message:
+    # le même ordre que envoyer_message et les actions groupées
+    for boite in sorted(boites, key=lambda boite: boite.utilisateur_id):
+        ajuster_compteurs(boite.utilisateur_id, **deltas_boite(boite, -1))
+    if any(deltas_boite(boite)['non_lus'] for boite in boites):
+        _retirer_non_lu_conversation(message)
+    message.delete()
+    if message.conversation_id is None:
+        return
+    # Dernier message supprimé (SET_NULL): le précédent prend sa place
+    precedent = (
+        Message.objects.filter(conversation_id=message.conversation_id)
+        .order_by('-date_envoi', '-id')
+        .values_list('pk', flat=True)
+        .first()
+    )
+    Conversation.objects.filter(
+        pk=message.conversation_id, dernier_message__isnull=True,
+    ).update(dernier_message_id=precedent)
+
+
+# Actions groupées
+
+# Entrées visées par une action groupée, copiées une fois verrouillées:
+# chaque écriture est ensuite un UPDATE / DELETE joint à cette table
+SQL_TABLE_SELECTION = """
+    CREATE TEMPORARY TABLE messaging_selection (
+        id bigint PRIMARY KEY,
+        utilisateur_id bigint NOT NULL,
+        message_id bigint NOT NULL,
+        date_envoi timestamp with time zone NOT NULL,
+        recu boolean NOT NULL,
+        envoye boolean NOT NULL,
+        lu boolean NOT NULL,
+        archive boolean NOT NULL,
+        conversation_id bigint,
+        expediteur_id bigint NOT NULL
+    ) ON COMMIT DROP
+"""
+
+# Condition SQL d'une entrée non lue (voir _boite_non_lue)
+NON_LU = 'recu AND NOT lu AND NOT archive'
+
+SQL_COMPTEURS_MANQUANTS = """
+    INSERT INTO messaging_counters (utilisateur_id, total, recus, envoyes, non_lus, archives)
+    SELECT DISTINCT utilisateur_id, 0, 0, 0, 0, 0 FROM messaging_selection
+    ON CONFLICT (utilisateur_id) DO NOTHING
+"""
+
+# Par utilisateur croissant, comme envoyer_message
+SQL_VERROU_COMPTEURS = """
+    SELECT 1 FROM messaging_counters
+    WHERE utilisateur_id IN (SELECT utilisateur_id FROM messaging_selection)
+    ORDER BY utilisateur_id
+    FOR UPDATE
+"""
+
+SQL_RETIRER_NON_LUS = f"""
+    UPDATE messaging_participant AS p
+    SET non_lus = greatest(p.non_lus - n.nombre, 0)
+    FROM (
+        SELECT utilisateur_id, conversation_id, count(*) AS nombre
+        FROM messaging_selection
+        WHERE {NON_LU} AND conversation_id IS NOT NULL
+        GROUP BY utilisateur_id, conversation_id
+    ) AS n
+    WHERE p.utilisateur_id = n.utilisateur_id AND p.conversation_id = n.conversation_id
+"""
+
+
+def _selectionner(boites):
+    """
+    Verrouiller les entrées `boites` (queryset BoiteMessage) par id
+    croissant, comme supprimer_message: deux actions concurrentes sur les
+    mêmes entrées s'attendent au lieu de s'interbloquer. Retourne leur nombre.
+    """
+    requete = (
+        boites.order_by('pk')
+        .select_for_update(of=('self',))
+        .values_list(
+            'pk', 'utilisateur_id', 'message_id', 'date_envoi', 'recu', 'envoye', 'lu', 'archive',
+            'message_partitionne__conversation_id', 'message_partitionne__expediteur_id',
+        )
+    )
+    sql, params = requete.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute('DROP TABLE IF EXISTS pg_temp.messaging_selection')
+        cursor.execute(SQL_TABLE_SELECTION)
+        cursor.execute(f'INSERT INTO messaging_selection {sql}', params)
+        nombre = cursor.rowcount
+        # Statistiques pour les jointures suivantes (boîte entière ou quelques lignes)
+        cursor.execute('ANALYZE messaging_selection')
+    return nombre
+
+
+def _ajuster_compteurs_selection(cursor, **deltas):
+    """
+    Ajouter aux compteurs de chaque utilisateur de la sélection `deltas`
+    ({champ: agrégat SQL sur messaging_selection}), en un UPDATE
+    """
+    cursor.execute(SQL_COMPTEURS_MANQUANTS)
+    cursor.execute(SQL_VERROU_COMPTEURS)
+    colonnes = ', '.join(f'{champ} = greatest(c.{champ} + d.{champ}, 0)' for champ in deltas)
+    agregats = ', '.join(f'{agregat} AS {champ}' for champ, agregat in deltas.items())
+    cursor.execute(f"""
+        UPDATE messaging_counters AS c
+        SET {colonnes}
+        FROM (SELECT utilisateur_id, {agregats} FROM messaging_selection GROUP BY utilisateur_id) AS d
+        WHERE c.utilisateur_id = d.utilisateur_id
+    """)
+
+
+@transaction.atomic
+def marquer_messages_lus(utilisateur, boites):
+    """
+    Marquer lus les messages reçus par `utilisateur` parmi `boites`
+    (queryset BoiteMessage); retourne le nombre de messages marqués
+    """
+    nombre = _selectionner(boites.filter(utilisateur=utilisateur, recu=True, lu=False))
+    if not nombre:
+        return 0
+    with connection.cursor() as cursor:
+        cursor.execute("""
+            UPDATE messaging_mailbox AS b SET lu = true
+            FROM messaging_selection AS s WHERE b.id = s.id
+        """)
+        _ajuster_compteurs_selection(cursor, non_lus=f'-count(*) FILTER (WHERE {NON_LU})')
+        cursor.execute(SQL_RETIRER_NON_LUS)
+        cursor.execute("""
+            UPDATE messaging_message AS m SET status = 'read', date_lecture = %s
+            FROM messaging_selection AS s
+            WHERE m.id = s.message_id AND m.date_envoi = s.date_envoi AND m.status = 'sent'
+        """, [timezone.now()])
+        cursor.execute("""
+            SELECT expediteur_id, array_agg(message_id ORDER BY message_id)
+            FROM messaging_selection GROUP BY expediteur_id
+        """)
+        par_expediteur = dict(cursor.fetchall())
+    events.messages_lus(utilisateur, par_expediteur)
+    return nombre
+
+
+@transaction.atomic
+def archiver_messages(utilisateur, boites):
+    """Archiver dans la boîte de `utilisateur` les messages de `boites`; retourne leur nombre"""
+    nombre = _selectionner(boites.filter(utilisateur=utilisateur, archive=False))
+    if not nombre:
+        return 0
+    with connection.cursor() as cursor:
+        cursor.execute("""
+            UPDATE messaging_mailbox AS b SET archive = true
+            FROM messaging_selection AS s WHERE b.id = s.id
+        """)
+        _ajuster_compteurs_selection(
+            cursor, archives='count(*)', non_lus=f'-count(*) FILTER (WHERE {NON_LU})',
+        )
+        cursor.execute(SQL_RETIRER_NON_LUS)
+        cursor.execute('SELECT array_agg(message_id ORDER BY message_id) FROM messaging_selection')
+        ids = cursor.fetchone()[0]
+    events.messages_archives(utilisateur, ids)
+    return nombre
+
+
+@transaction.atomic
+def supprimer_messages(utilisateur, boites):
+    """
+    Supprimer les messages de `boites` présents dans la boîte de
+    `utilisateur`, pour les deux parties comme supprimer_message; retourne
+    leur nombre
+    """
+    # Entrées de toutes les parties
+    messages = boites.filter(utilisateur=utilisateur).values('message_id')
+    if not _selectionner(BoiteMessage.objects.filter(message_id__in=messages)):
+        return 0
+    with connection.cursor() as cursor:
+        _ajuster_compteurs_selection(
+            cursor,
+            total='-count(*)',
+            recus='-count(*) FILTER (WHERE recu)',
+            envoyes='-count(*) FILTER (WHERE envoye)',
+            non_lus=f'-count(*) FILTER (WHERE {NON_LU})',
+            archives='-count(*) FILTER (WHERE archive)',
+        )
+        cursor.execute(SQL_RETIRER_NON_LUS)
+        cursor.execute('DELETE FROM messaging_mailbox AS b USING messaging_selection AS s WHERE b.id = s.id')
+        cursor.execute("""
+            DELETE FROM messaging_message AS m
+            USING (SELECT DISTINCT message_id, date_envoi FROM messaging_selection) AS s
+            WHERE m.id = s.message_id AND m.date_envoi = s.date_envoi
+        """)
+        nombre = cursor.rowcount
+        # Derniers messages supprimés: les précédents prennent leur place
+        cursor.execute("""
+            UPDATE messaging_conversation AS c
+            SET dernier_message_id = (
+                SELECT m.id FROM messaging_message AS m
+                WHERE m.conversation_id = c.id
+                ORDER BY m.date_envoi DESC, m.id DESC
+                LIMIT 1
+            )
+            WHERE c.dernier_message_id IN (SELECT message_id FROM messaging_selection)
+        """)
+    return nombre
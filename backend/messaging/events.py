@@ -0,0 +1,62 @@
+"""
+Événements temps réel de la messagerie (red_product.realtime).
+
+Publiés sur le canal de chaque utilisateur concerné, après validation de
+la transaction; le client met à jour ses listes et badges sans interroger
+`/api/messages/non_lus/` ni `/api/messages/statistiques/`.
+"""
+from red_product.pubsub import publier
+from red_product.realtime import canal_utilisateur
+
+
+def _apercu(message):
+    return {
+        'id': message.pk,
+        'conversation': message.conversation_id,
+        'expediteur': message.expediteur_id,
+        'destinataire': message.destinataire_id,
+        'sujet': message.sujet,
+        'date_envoi': message.date_envoi,
+    }
+
+
+def message_envoye(message):
+    """Nouveau message: pour le destinataire, et les autres onglets de l'expéditeur"""
+    evenement = {'type': 'message.nouveau', 'message': _apercu(message)}
+    for utilisateur_id in {message.destinataire_id, message.expediteur_id}:
+        publier(canal_utilisateur(utilisateur_id), evenement)
+
+
+def message_lu(message):
+    """Message lu par son destinataire: l'expéditeur voit l'accusé de lecture"""
+    evenement = {
+        'type': 'message.lu',
+        'message': {'id': message.pk, 'conversation': message.conversation_id},
+        'date_lecture': message.date_lecture,
+    }
+    for utilisateur_id in {message.destinataire_id, message.expediteur_id}:
+        publier(canal_utilisateur(utilisateur_id), evenement)
+
+
+def message_archive(message, utilisateur):
+    """Archivage propre à `utilisateur`: seuls ses autres onglets sont prévenus"""
+    publier(canal_utilisateur(utilisateur.pk), {
+        'type': 'message.archive',
+        'message': {'id': message.pk, 'conversation': message.conversation_id},
+    })
+
+
+def messages_lus(utilisateur, par_expediteur):
+    """Lecture groupée: un événement par expéditeur ({expediteur_id: [ids]}) et un pour le lecteur"""
+    for expediteur_id, ids in par_expediteur.items():
+        if expediteur_id != utilisateur.pk:
+            publier(canal_utilisateur(expediteur_id), {'type': 'messages.lus', 'ids': ids})
+    publier(canal_utilisateur(utilisateur.pk), {
+        'type': 'messages.lus',
+        'ids': [message_id for ids in par_expediteur.values() for message_id in ids],
+    })
+
+
+def messages_archives(utilisateur, ids):
+    """Archivage groupé, propre à `utilisateur`"""
+    publier(canal_utilisateur(utilisateur.pk), {'type': 'messages.archives', 'ids': ids})
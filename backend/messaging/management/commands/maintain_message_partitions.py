@@ -0,0 +1,87 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from messaging.partitions import (
+    compacter,
+    creer_partition,
+    decaler,
+    detacher,
+    lignes_hors_partitions,
+    mois_de,
+    nom_partition,
+    partitions,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Maintient les partitions mensuelles de messaging_message: crée les "
+        "mois à venir, compacte les mois anciens (--compact-after) et retire "
+        "les plus anciens (--detach-after). À planifier (cron), ex: chaque jour."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--ahead', type=int, default=3,
+            help='Mois créés à l\'avance après le mois courant (défaut: 3)',
+        )
+        parser.add_argument(
+            '--compact-after', type=int, metavar='MOIS',
+            help='Compacter et geler les partitions terminées depuis au moins MOIS mois',
+        )
+        parser.add_argument(
+            '--tablespace',
+            help='Tablespace où déplacer les partitions compactées',
+        )
+        parser.add_argument(
+            '--detach-after', type=int, metavar='MOIS',
+            help='Retirer de l\'application les partitions terminées depuis au moins MOIS mois',
+        )
+        parser.add_argument(
+            '--drop', action='store_true',
+            help='Supprimer les partitions retirées au lieu de les garder détachées',
+        )
+
+    def handle(self, *args, **options):
+        compact_after, detach_after = options['compact_after'], options['detach_after']
+        if options['ahead'] < 0:
+            raise CommandError('--ahead doit être positif.')
+        for option in ('compact_after', 'detach_after'):
+            if options[option] is not None and options[option] < 1:
+                raise CommandError(f"--{option.replace('_', '-')} doit être au moins 1.")
+        if options['tablespace'] and compact_after is None:
+            raise CommandError('--tablespace s\'utilise avec --compact-after.')
+        if options['drop'] and detach_after is None:
+            raise CommandError('--drop s\'utilise avec --detach-after.')
+
+        courant = mois_de(timezone.now())
+        for decalage in range(options['ahead'] + 1):
+            mois = decaler(courant, decalage)
+            if creer_partition(mois):
+                self.stdout.write(f'{nom_partition(mois)} créée.')
+
+        if detach_after is not None:
+            limite = decaler(courant, -detach_after)
+            for partition in partitions():
+                if partition['mois'] < limite:
+                    retirees = detacher(partition['mois'], supprimer=options['drop'])
+                    action = 'supprimée' if options['drop'] else 'détachée'
+                    self.stdout.write(f"{partition['nom']} {action} ({retirees} entrée(s) de boîte retirée(s)).")
+
+        if compact_after is not None:
+            limite = decaler(courant, -compact_after)
+            for partition in partitions():
+                deplacer = options['tablespace'] and partition['tablespace'] != options['tablespace']
+                if partition['mois'] < limite and (not partition['froide'] or deplacer):
+                    compacter(partition['nom'], options['tablespace'])
+                    self.stdout.write(f"{partition['nom']} compactée.")
+
+        for partition in partitions():
+            etat = ' (froide)' if partition['froide'] else ''
+            self.stdout.write(f"{partition['nom']}: {partition['taille'] // 1024} Kio{etat}")
+        hors_partitions = lignes_hors_partitions()
+        if hors_partitions:
+            self.stdout.write(self.style.WARNING(
+                f'{hors_partitions} message(s) dans la partition par défaut, hors des mois partitionnés.'
+            ))
+        self.stdout.write(self.style.SUCCESS('Partitions des messages à jour.'))
@@ -0,0 +1,74 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from accounts.models import User
+from messaging.models import BoiteMessage, CompteurMessages
+from messaging.stats import CHAMPS, comptages
+
+
+class Command(BaseCommand):
+    help = (
+        "Recalcule les compteurs messaging_counters à partir des boîtes "
+        "(messaging_mailbox), ou signale les écarts avec --check."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check', action='store_true',
+            help='Comparer seulement, sans modifier (code retour non nul en cas d\'écart)',
+        )
+        parser.add_argument(
+            '--user', type=int, action='append', dest='users',
+            help='Limiter à cet utilisateur (id, option répétable)',
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            if not options['check']:
+                # Bloque les écritures concurrentes le temps du recalcul
+                with connection.cursor() as cursor:
+                    cursor.execute('LOCK TABLE messaging_mailbox IN SHARE MODE')
+
+            utilisateurs = User.objects.all()
+            boites = BoiteMessage.objects.all()
+            compteurs = CompteurMessages.objects.all()
+            if options['users']:
+                utilisateurs = utilisateurs.filter(pk__in=options['users'])
+                boites = boites.filter(utilisateur_id__in=options['users'])
+                compteurs = compteurs.filter(pk__in=options['users'])
+
+            expected = dict.fromkeys(utilisateurs.values_list('pk', flat=True), None)
+            for row in boites.order_by().values('utilisateur_id').annotate(**comptages()):
+                expected[row.pop('utilisateur_id')] = row
+            current = {row.pop('utilisateur_id'): row for row in compteurs.values('utilisateur_id', *CHAMPS)}
+
+            drift = self.compare(expected, current)
+            if options['check']:
+                if drift:
+                    raise CommandError(f'{len(drift)} utilisateur(s) en écart avec les boîtes.')
+                self.stdout.write(self.style.SUCCESS('messaging_counters est à jour.'))
+                return
+
+            lignes = [
+                CompteurMessages(utilisateur_id=utilisateur_id, **(expected[utilisateur_id] or {}))
+                for utilisateur_id in drift
+            ]
+            CompteurMessages.objects.filter(pk__in=drift).delete()
+            CompteurMessages.objects.bulk_create(lignes, batch_size=1000)
+        self.stdout.write(self.style.SUCCESS(
+            f'messaging_counters vérifiée ({len(expected)} utilisateur(s), {len(drift)} corrigé(s)).'
+        ))
+
+    def compare(self, expected, current):
+        empty = dict.fromkeys(CHAMPS, 0)
+        drift = []
+        for utilisateur_id in sorted(expected):
+            wanted = expected[utilisateur_id] or empty
+            # Pas de ligne: compteurs à zéro (voir statistiques_boite)
+            stored = current.get(utilisateur_id, empty)
+            differences = [f for f in CHAMPS if wanted[f] != stored[f]]
+            if differences:
+                drift.append(utilisateur_id)
+                details = ', '.join(f'{f}: {stored[f]} -> {wanted[f]}' for f in differences)
+                self.stdout.write(self.style.WARNING(f'{utilisateur_id}: {details}'))
+        return drift
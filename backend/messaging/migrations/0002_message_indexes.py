@@ -0,0 +1,17 @@
+# Generated by Django 4.2.8 on 2026-10-18 07:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('messaging', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(fields=['destinataire', 'status', '-date_envoi', '-id'], name='messages_dest_status_idx'),
+        ),
+    ]
@@ -0,0 +1,118 @@
+# Generated by Django 4.2.8 on 2026-10-18 07:23
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+# Rattacher les messages existants à la conversation de leur paire
+# d'utilisateurs, puis calculer les champs dénormalisés
+REMPLIR_CONVERSATIONS = """
+INSERT INTO messaging_conversation (cle, derniere_activite, created_at)
+SELECT least(expediteur_id, destinataire_id) || ':' || greatest(expediteur_id, destinataire_id),
+       max(date_envoi), min(date_envoi)
+FROM messaging_message
+GROUP BY least(expediteur_id, destinataire_id), greatest(expediteur_id, destinataire_id);
+
+UPDATE messaging_message AS m
+SET conversation_id = c.id
+FROM messaging_conversation AS c
+WHERE c.cle = least(m.expediteur_id, m.destinataire_id) || ':' || greatest(m.expediteur_id, m.destinataire_id);
+
+UPDATE messaging_conversation AS c
+SET dernier_message_id = (
+    SELECT m.id FROM messaging_message AS m
+    WHERE m.conversation_id = c.id
+    ORDER BY m.date_envoi DESC, m.id DESC
+    LIMIT 1
+);
+
+INSERT INTO messaging_participant (conversation_id, utilisateur_id, interlocuteur_id, non_lus, derniere_activite)
+SELECT c.id, p.utilisateur_id, p.interlocuteur_id,
+       (SELECT count(*) FROM messaging_message AS m
+        WHERE m.conversation_id = c.id AND m.destinataire_id = p.utilisateur_id AND m.status = 'sent'),
+       c.derniere_activite
+FROM messaging_conversation AS c
+CROSS JOIN LATERAL (
+    SELECT split_part(c.cle, ':', 1)::bigint AS utilisateur_id, split_part(c.cle, ':', 2)::bigint AS interlocuteur_id
+    UNION
+    SELECT split_part(c.cle, ':', 2)::bigint, split_part(c.cle, ':', 1)::bigint
+) AS p;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('messaging', '0002_message_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Conversation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('cle', models.CharField(max_length=41, unique=True)),
+                ('derniere_activite', models.DateTimeField(verbose_name='Dernière activité')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Conversation',
+                'verbose_name_plural': 'Conversations',
+                'db_table': 'messaging_conversation',
+            },
+        ),
+        migrations.CreateModel(
+            name='ParticipantConversation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('non_lus', models.PositiveIntegerField(default=0, verbose_name='Messages non lus')),
+                ('derniere_activite', models.DateTimeField(verbose_name='Dernière activité')),
+            ],
+            options={
+                'verbose_name': 'Participant',
+                'verbose_name_plural': 'Participants',
+                'db_table': 'messaging_participant',
+                'ordering': ['-derniere_activite'],
+            },
+        ),
+        migrations.AddField(
+            model_name='participantconversation',
+            name='conversation',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='participants', to='messaging.conversation'),
+        ),
+        migrations.AddField(
+            model_name='participantconversation',
+            name='interlocuteur',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Interlocuteur'),
+        ),
+        migrations.AddField(
+            model_name='participantconversation',
+            name='utilisateur',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='conversations', to=settings.AUTH_USER_MODEL, verbose_name='Utilisateur'),
+        ),
+        migrations.AddField(
+            model_name='conversation',
+            name='dernier_message',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='messaging.message', verbose_name='Dernier message'),
+        ),
+        migrations.AddField(
+            model_name='message',
+            name='conversation',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='messages', to='messaging.conversation', verbose_name='Conversation'),
+        ),
+        migrations.AddIndex(
+            model_name='participantconversation',
+            index=models.Index(fields=['utilisateur', '-derniere_activite', '-id'], name='participants_activite_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='participantconversation',
+            constraint=models.UniqueConstraint(fields=('conversation', 'utilisateur'), name='participants_unique'),
+        ),
+        migrations.RunSQL(REMPLIR_CONVERSATIONS, reverse_sql=migrations.RunSQL.noop),
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(fields=['conversation', '-date_envoi', '-id'], name='messages_conversation_idx'),
+        ),
+    ]
@@ -0,0 +1,62 @@
+# Generated by Django 4.2.8 on 2026-10-18 07:25
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+# Une entrée par (utilisateur, message) pour les messages existants. Un
+# message à soi-même n'a qu'une entrée, reçue et envoyée. L'ancien statut
+# partagé 'archived' archive le message pour les deux parties.
+REMPLIR_BOITES = """
+INSERT INTO messaging_mailbox (utilisateur_id, message_id, recu, envoye, lu, archive, date_envoi)
+SELECT e.utilisateur_id, m.id, bool_or(e.recu), bool_or(e.envoye), bool_and(e.lu),
+       m.status = 'archived', m.date_envoi
+FROM messaging_message AS m
+CROSS JOIN LATERAL (
+    VALUES (m.expediteur_id, false, true, true),
+           (m.destinataire_id, true, false, m.status <> 'sent')
+) AS e (utilisateur_id, recu, envoye, lu)
+GROUP BY e.utilisateur_id, m.id;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('messaging', '0003_conversations'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BoiteMessage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('recu', models.BooleanField(default=False, verbose_name='Reçu')),
+                ('envoye', models.BooleanField(default=False, verbose_name='Envoyé')),
+                ('lu', models.BooleanField(default=False, verbose_name='Lu')),
+                ('archive', models.BooleanField(default=False, verbose_name='Archivé')),
+                ('date_envoi', models.DateTimeField(verbose_name="Date d'envoi")),
+                ('message', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='boites', to='messaging.message')),
+                ('utilisateur', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='boite_messages', to=settings.AUTH_USER_MODEL, verbose_name='Utilisateur')),
+            ],
+            options={
+                'verbose_name': 'Entrée de boîte',
+                'verbose_name_plural': 'Entrées de boîte',
+                'db_table': 'messaging_mailbox',
+                'indexes': [models.Index(condition=models.Q(('archive', False)), fields=['utilisateur', '-date_envoi', '-message'], name='mailbox_tous_idx'), models.Index(condition=models.Q(('archive', False), ('recu', True)), fields=['utilisateur', '-date_envoi', '-message'], name='mailbox_recus_idx'), models.Index(condition=models.Q(('archive', False), ('envoye', True)), fields=['utilisateur', '-date_envoi', '-message'], name='mailbox_envoyes_idx'), models.Index(condition=models.Q(('archive', False), ('lu', False), ('recu', True)), fields=['utilisateur', '-date_envoi', '-message'], name='mailbox_non_lus_idx'), models.Index(condition=models.Q(('archive', True)), fields=['utilisateur', '-date_envoi', '-message'], name='mailbox_archives_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='boitemessage',
+            constraint=models.UniqueConstraint(fields=('utilisateur', 'message'), name='mailbox_unique'),
+        ),
+        migrations.RunSQL(REMPLIR_BOITES, reverse_sql=migrations.RunSQL.noop),
+        # Non lus servis par mailbox_non_lus_idx: plus aucune lecture par
+        # (destinataire, status)
+        migrations.RemoveIndex(
+            model_name='message',
+            name='messages_dest_status_idx',
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 4.2.8 on 2026-10-18 07:30
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+# Une ligne par utilisateur, comptée sur ses entrées de boîte
+REMPLIR_COMPTEURS = """
+INSERT INTO messaging_counters (utilisateur_id, total, recus, envoyes, non_lus, archives)
+SELECT u.id,
+       count(b.id),
+       count(b.id) FILTER (WHERE b.recu),
+       count(b.id) FILTER (WHERE b.envoye),
+       count(b.id) FILTER (WHERE b.recu AND NOT b.lu AND NOT b.archive),
+       count(b.id) FILTER (WHERE b.archive)
+FROM users AS u
+LEFT JOIN messaging_mailbox AS b ON b.utilisateur_id = u.id
+GROUP BY u.id;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0001_initial'),
+        ('messaging', '0004_mailbox'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CompteurMessages',
+            fields=[
+                ('utilisateur', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='compteur_messages', serialize=False, to=settings.AUTH_USER_MODEL, verbose_name='Utilisateur')),
+                ('total', models.PositiveIntegerField(default=0)),
+                ('recus', models.PositiveIntegerField(default=0, verbose_name='Reçus')),
+                ('envoyes', models.PositiveIntegerField(default=0, verbose_name='Envoyés')),
+                ('non_lus', models.PositiveIntegerField(default=0, verbose_name='Non lus')),
+                ('archives', models.PositiveIntegerField(default=0, verbose_name='Archivés')),
+            ],
+            options={
+                'verbose_name': 'Compteurs de messages',
+                'verbose_name_plural': 'Compteurs de messages',
+                'db_table': 'messaging_counters',
+            },
+        ),
+        migrations.RunSQL(REMPLIR_COMPTEURS, reverse_sql=migrations.RunSQL.noop),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 4.2.8 on 2026-10-18 07:35
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations
+
+
+# Même configuration que la recherche d'hôtels (french_unaccent, créée par
+# hotels.0003). Le trigger couvre tous les chemins d'écriture; un save
+# complet écrit search_vector à NULL, ce qui déclenche aussi le recalcul.
+CREATE_TRIGGER = """
+CREATE FUNCTION messaging_search_vector_update() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector :=
+        setweight(to_tsvector('french_unaccent', coalesce(NEW.sujet, '')), 'A') ||
+        setweight(to_tsvector('french_unaccent', coalesce(NEW.contenu, '')), 'B');
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER messaging_search_vector_trigger
+    BEFORE INSERT OR UPDATE OF sujet, contenu, search_vector ON messaging_message
+    FOR EACH ROW EXECUTE FUNCTION messaging_search_vector_update();
+
+UPDATE messaging_message SET search_vector = NULL;
+"""
+
+DROP_TRIGGER = """
+DROP TRIGGER IF EXISTS messaging_search_vector_trigger ON messaging_message;
+DROP FUNCTION IF EXISTS messaging_search_vector_update();
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hotels', '0003_hotel_search'),
+        ('messaging', '0005_message_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='message',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunSQL(CREATE_TRIGGER, DROP_TRIGGER),
+        migrations.AddIndex(
+            model_name='message',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='messages_search_idx'),
+        ),
+    ]
@@ -0,0 +1,136 @@
+# Generated by Django 4.2.8 on 2026-10-18 07:38
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+# messaging_message devient une table partitionnée par mois de date_envoi
+# (partitions messaging_message_pAAAA_MM, voir messaging.partitions).
+#
+# Contraintes de PostgreSQL sur une table partitionnée:
+# - clé primaire contenant la clé de partitionnement: (id, date_envoi)
+# - pas de colonne IDENTITY (PostgreSQL < 17): séquence et DEFAULT nextval
+# - une clé étrangère vers la table doit viser (id, date_envoi): la boîte
+#   (messaging_mailbox) a déjà date_envoi, celle de Conversation.dernier_message
+#   est supprimée (SET_NULL reste appliqué par Django)
+#
+# Les lignes existantes sont copiées dans les partitions de leur mois, de
+# la plus ancienne jusqu'à 3 mois après le mois courant; la partition par
+# défaut reçoit ce qui tomberait hors de ces mois.
+PARTITIONNER = """
+-- Contrôles des clés étrangères à chaque ligne copiée: aucun événement
+-- différé ne doit rester en attente avant CREATE INDEX
+SET CONSTRAINTS ALL IMMEDIATE;
+
+DO $$
+DECLARE
+    contrainte record;
+BEGIN
+    FOR contrainte IN
+        SELECT conrelid::regclass AS nom_table, conname
+        FROM pg_constraint
+        WHERE contype = 'f' AND confrelid = 'messaging_message'::regclass
+    LOOP
+        EXECUTE format('ALTER TABLE %s DROP CONSTRAINT %I', contrainte.nom_table, contrainte.conname);
+    END LOOP;
+END
+$$;
+
+DROP TRIGGER messaging_search_vector_trigger ON messaging_message;
+ALTER TABLE messaging_message RENAME TO messaging_message_ancienne;
+ALTER TABLE messaging_message_ancienne ALTER COLUMN id DROP IDENTITY;
+ALTER TABLE messaging_message_ancienne DROP CONSTRAINT messaging_message_pkey;
+DROP INDEX messages_conversation_idx, messages_search_idx;
+
+CREATE SEQUENCE messaging_message_id_seq;
+CREATE TABLE messaging_message (
+    id bigint NOT NULL DEFAULT nextval('messaging_message_id_seq'),
+    sujet varchar(255) NOT NULL,
+    contenu text NOT NULL,
+    status varchar(20) NOT NULL,
+    date_envoi timestamp with time zone NOT NULL,
+    date_lecture timestamp with time zone NULL,
+    destinataire_id bigint NOT NULL REFERENCES users (id) DEFERRABLE INITIALLY DEFERRED,
+    expediteur_id bigint NOT NULL REFERENCES users (id) DEFERRABLE INITIALLY DEFERRED,
+    conversation_id bigint NULL REFERENCES messaging_conversation (id) DEFERRABLE INITIALLY DEFERRED,
+    search_vector tsvector NULL,
+    CONSTRAINT messaging_message_pkey PRIMARY KEY (id, date_envoi)
+) PARTITION BY RANGE (date_envoi);
+ALTER SEQUENCE messaging_message_id_seq OWNED BY messaging_message.id;
+
+CREATE TABLE messaging_message_default PARTITION OF messaging_message DEFAULT;
+
+DO $$
+DECLARE
+    mois date;
+    fin date;
+BEGIN
+    SELECT date_trunc('month', coalesce(min(date_envoi), now()) AT TIME ZONE 'UTC')::date
+    INTO mois FROM messaging_message_ancienne;
+    fin := (date_trunc('month', now() AT TIME ZONE 'UTC') + interval '4 months')::date;
+    WHILE mois < fin LOOP
+        EXECUTE format(
+            'CREATE TABLE %I PARTITION OF messaging_message FOR VALUES FROM (%L) TO (%L)',
+            'messaging_message_p' || to_char(mois, 'YYYY_MM'),
+            mois::timestamp AT TIME ZONE 'UTC',
+            (mois + interval '1 month')::timestamp AT TIME ZONE 'UTC'
+        );
+        mois := (mois + interval '1 month')::date;
+    END LOOP;
+END
+$$;
+
+INSERT INTO messaging_message (
+    id, sujet, contenu, status, date_envoi, date_lecture,
+    destinataire_id, expediteur_id, conversation_id, search_vector
+)
+SELECT id, sujet, contenu, status, date_envoi, date_lecture,
+       destinataire_id, expediteur_id, conversation_id, search_vector
+FROM messaging_message_ancienne;
+SELECT setval('messaging_message_id_seq', coalesce(max(id), 0) + 1, false) FROM messaging_message;
+DROP TABLE messaging_message_ancienne;
+
+-- Index partitionnés (un par partition), mêmes noms que dans le modèle
+CREATE INDEX ON messaging_message (destinataire_id);
+CREATE INDEX ON messaging_message (expediteur_id);
+CREATE INDEX messages_conversation_idx ON messaging_message (conversation_id, date_envoi DESC, id DESC);
+CREATE INDEX messages_search_idx ON messaging_message USING gin (search_vector);
+
+CREATE TRIGGER messaging_search_vector_trigger
+    BEFORE INSERT OR UPDATE OF sujet, contenu, search_vector ON messaging_message
+    FOR EACH ROW EXECUTE FUNCTION messaging_search_vector_update();
+
+ALTER TABLE messaging_mailbox ADD CONSTRAINT mailbox_message_fk
+    FOREIGN KEY (message_id, date_envoi) REFERENCES messaging_message (id, date_envoi)
+    DEFERRABLE INITIALLY DEFERRED;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('messaging', '0006_message_search'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            database_operations=[migrations.RunSQL(PARTITIONNER)],
+            state_operations=[
+                migrations.AddField(
+                    model_name='boitemessage',
+                    name='message_partitionne',
+                    field=models.ForeignObject(from_fields=('message', 'date_envoi'), on_delete=django.db.models.deletion.DO_NOTHING, related_name='boites', to='messaging.message', to_fields=('id', 'date_envoi')),
+                ),
+                migrations.AlterField(
+                    model_name='boitemessage',
+                    name='message',
+                    field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='messaging.message'),
+                ),
+                migrations.AlterField(
+                    model_name='conversation',
+                    name='dernier_message',
+                    field=models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='messaging.message', verbose_name='Dernier message'),
+                ),
+            ],
+        ),
+    ]
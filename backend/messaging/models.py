@@ -1,7 +1,86 @@
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
 from accounts.models import User
 
 
+class Conversation(models.Model):
+    """
+    Fil de messages entre deux utilisateurs.
+
+    `dernier_message` et `derniere_activite` sont dénormalisés (aperçu de la
+    boîte de réception sans parcourir les messages); ils sont tenus à jour
+    par messaging.conversations à l'envoi, à la lecture et à la suppression.
+    """
+    # 'petit_id:grand_id': une seule conversation par paire d'utilisateurs
+    cle = models.CharField(max_length=41, unique=True)
+    # Sans contrainte en base (messages partitionnés, voir BoiteMessage);
+    # SET_NULL est appliqué par Django à la suppression d'un message
+    dernier_message = models.ForeignKey(
+        'Message',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        db_constraint=False,
+        related_name='+',
+        verbose_name="Dernier message"
+    )
+    derniere_activite = models.DateTimeField(verbose_name="Dernière activité")
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        db_table = 'messaging_conversation'
+        verbose_name = 'Conversation'
+        verbose_name_plural = 'Conversations'
+    
+    def __str__(self):
+        return f"Conversation {self.cle}"
+
+
+class ParticipantConversation(models.Model):
+    """
+    Place d'un utilisateur dans une conversation: interlocuteur, messages
+    non lus et copie de la dernière activité, pour que la liste des
+    conversations d'un utilisateur soit un seul parcours d'index.
+    """
+    conversation = models.ForeignKey(Conversation, on_delete=models.CASCADE, related_name='participants')
+    utilisateur = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='conversations',
+        db_index=False,
+        verbose_name="Utilisateur"
+    )
+    interlocuteur = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name="Interlocuteur"
+    )
+    non_lus = models.PositiveIntegerField(default=0, verbose_name="Messages non lus")
+    derniere_activite = models.DateTimeField(verbose_name="Dernière activité")
+    
+    class Meta:
+        db_table = 'messaging_participant'
+        verbose_name = 'Participant'
+        verbose_name_plural = 'Participants'
+        ordering = ['-derniere_activite']
+        constraints = [
+            models.UniqueConstraint(fields=['conversation', 'utilisateur'], name='participants_unique'),
+        ]
+        indexes = [
+            # Conversations d'un utilisateur, de la plus récente à la plus
+            # ancienne (pagination par curseur sur derniere_activite puis id)
+            models.Index(
+                fields=['utilisateur', '-derniere_activite', '-id'],
+                name='participants_activite_idx',
+            ),
+        ]
+    
+    def __str__(self):
+        return f"{self.utilisateur} - {self.conversation}"
+
+
 class Message(models.Model):
     """
     Modèle pour les messages entre utilisateurs
@@ -24,6 +103,15 @@ class Message(models.Model):
         related_name='messages_recus',
         verbose_name="Destinataire"
     )
+    conversation = models.ForeignKey(
+        Conversation,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='messages',
+        db_index=False,
+        verbose_name="Conversation"
+    )
     sujet = models.CharField(max_length=255, verbose_name="Sujet")
     contenu = models.TextField(verbose_name="Contenu")
     status = models.CharField(
@@ -34,20 +122,135 @@ class Message(models.Model):
     )
     date_envoi = models.DateTimeField(auto_now_add=True, verbose_name="Date d'envoi")
     date_lecture = models.DateTimeField(null=True, blank=True, verbose_name="Date de lecture")
+    # Sujet (poids A) et contenu (poids B), maintenu par le trigger
+    # messaging_search_vector_update (migration 0006)
+    search_vector = SearchVectorField(null=True, editable=False)
     
     class Meta:
         db_table = 'messaging_message'
         verbose_name = 'Message'
         verbose_name_plural = 'Messages'
         ordering = ['-date_envoi']
+        indexes = [
+            # Messages d'une conversation (?conversation=), même tri que la liste
+            models.Index(
+                fields=['conversation', '-date_envoi', '-id'],
+                name='messages_conversation_idx',
+            ),
+            # Recherche plein texte (action recherche, admin)
+            GinIndex(fields=['search_vector'], name='messages_search_idx'),
+        ]
     
     def __str__(self):
         return f"{self.sujet} - De: {self.expediteur.username} À: {self.destinataire.username}"
     
     def marquer_comme_lu(self):
         """Marquer le message comme lu"""
+        from django.db import transaction
         from django.utils import timezone
+        from messaging.conversations import marquer_boite_lue
         if self.status == 'sent':
             self.status = 'read'
             self.date_lecture = timezone.now()
-            self.save()
\ No newline at end of file
+            with transaction.atomic():
+                # Boîte avant message, comme marquer_messages_lus
+                marquer_boite_lue(self)
+                # Les deux seules colonnes modifiées, pas la ligne entière
+                self.save(update_fields=['status', 'date_lecture'])
+
+
+def _index_boite(nom, condition):
+    # Un dossier = un index partiel trié comme les listes de messages:
+    # chaque vue de la boîte est un parcours d'intervalle de son index
+    return models.Index(
+        fields=['utilisateur', '-date_envoi', '-message'],
+        condition=condition,
+        name=nom,
+    )
+
+
+class BoiteMessage(models.Model):
+    """
+    Entrée d'un message dans la boîte d'un utilisateur (une par utilisateur
+    et par message, écrite à l'envoi).
+
+    Porte l'état propre à chacun: un message archivé ou lu ne l'est que
+    pour cet utilisateur. `date_envoi` est une copie de celle du message,
+    pour trier sur l'index de la boîte sans lire la table des messages, et
+    pour joindre la table partitionnée des messages sur sa clé complète.
+    """
+    utilisateur = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='boite_messages',
+        db_index=False,
+        verbose_name="Utilisateur"
+    )
+    # Contrainte en base sur (message_id, date_envoi) (migration 0007):
+    # messaging_message est partitionnée, sa clé primaire est (id, date_envoi)
+    message = models.ForeignKey(Message, on_delete=models.CASCADE, related_name='+', db_constraint=False)
+    recu = models.BooleanField(default=False, verbose_name="Reçu")
+    envoye = models.BooleanField(default=False, verbose_name="Envoyé")
+    lu = models.BooleanField(default=False, verbose_name="Lu")
+    archive = models.BooleanField(default=False, verbose_name="Archivé")
+    date_envoi = models.DateTimeField(verbose_name="Date d'envoi")
+    # Même message, joint aussi sur date_envoi: `Message.objects.filter(boites__...)`
+    # ne lit alors que la partition du mois de chaque message
+    message_partitionne = models.ForeignObject(
+        Message,
+        on_delete=models.DO_NOTHING,
+        from_fields=['message', 'date_envoi'],
+        to_fields=['id', 'date_envoi'],
+        related_name='boites',
+    )
+    
+    class Meta:
+        db_table = 'messaging_mailbox'
+        verbose_name = 'Entrée de boîte'
+        verbose_name_plural = 'Entrées de boîte'
+        constraints = [
+            models.UniqueConstraint(fields=['utilisateur', 'message'], name='mailbox_unique'),
+        ]
+        indexes = [
+            _index_boite('mailbox_tous_idx', models.Q(archive=False)),
+            _index_boite('mailbox_recus_idx', models.Q(recu=True, archive=False)),
+            _index_boite('mailbox_envoyes_idx', models.Q(envoye=True, archive=False)),
+            _index_boite('mailbox_non_lus_idx', models.Q(recu=True, lu=False, archive=False)),
+            _index_boite('mailbox_archives_idx', models.Q(archive=True)),
+        ]
+    
+    def __str__(self):
+        return f"{self.utilisateur} - {self.message_id}"
+
+
+class CompteurMessages(models.Model):
+    """
+    Compteurs de la boîte d'un utilisateur, lus en une recherche par clé
+    primaire par les statistiques et le tableau de bord.
+
+    Copie de ce que compterait un agrégat sur ses entrées BoiteMessage,
+    tenue à jour par messaging.conversations (UPDATE avec F() dans la
+    transaction de chaque écriture). En cas d'écart: commande
+    `reconcile_message_counters`.
+    """
+    utilisateur = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='compteur_messages',
+        verbose_name="Utilisateur"
+    )
+    # Entrées de la boîte (un message à soi-même n'en compte qu'une)
+    total = models.PositiveIntegerField(default=0)
+    recus = models.PositiveIntegerField(default=0, verbose_name="Reçus")
+    envoyes = models.PositiveIntegerField(default=0, verbose_name="Envoyés")
+    non_lus = models.PositiveIntegerField(default=0, verbose_name="Non lus")
+    archives = models.PositiveIntegerField(default=0, verbose_name="Archivés")
+    
+    class Meta:
+        db_table = 'messaging_counters'
+        verbose_name = 'Compteurs de messages'
+        verbose_name_plural = 'Compteurs de messages'
+    
+    def __str__(self):
+        return f"{self.utilisateur}: {self.recus} reçus, {self.non_lus} non lus"
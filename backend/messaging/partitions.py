@@ -0,0 +1,243 @@
+"""
+Partitions mensuelles de messaging_message (migration 0007).
+
+La table est partitionnée par plage de date_envoi, un mois UTC par
+partition (`messaging_message_pAAAA_MM`), plus une partition par défaut
+pour les lignes hors de ces mois. Les listes de la boîte joignent les
+messages sur (id, date_envoi) (BoiteMessage.message_partitionne): chaque
+message n'est lu que dans la partition de son mois, et les mois anciens ne
+coûtent rien aux lectures courantes. Index et VACUUM restent à la taille
+d'un mois.
+
+Cycle de vie d'une partition (commande `maintain_message_partitions`):
+- créée quelques mois à l'avance (`creer_partition`)
+- froide: réécrite sans espace mort, gelée, éventuellement déplacée vers
+  un tablespace moins coûteux (`compacter`); elle reste lisible
+- retirée: entrées de boîte, compteurs et conversations mis à jour, puis
+  détachée de la table (`detacher`), gardée à part ou supprimée
+"""
+import datetime
+import re
+
+from django.db import connection, transaction
+
+
+TABLE = 'messaging_message'
+PARTITION_DEFAUT = 'messaging_message_default'
+
+# Commentaire posé sur une partition compactée
+MARQUE_FROIDE = 'messaging:froide'
+
+NOM_RE = re.compile(r'^messaging_message_p(\d{4})_(\d{2})$')
+
+# Contrainte des entrées de boîte sur les messages (migration 0007)
+CONTRAINTE_BOITE = 'mailbox_message_fk'
+DEFINITION_CONTRAINTE_BOITE = (
+    'FOREIGN KEY (message_id, date_envoi) REFERENCES messaging_message (id, date_envoi) '
+    'DEFERRABLE INITIALLY DEFERRED'
+)
+
+
+def mois_de(date):
+    """Premier jour du mois (UTC) de `date`"""
+    if isinstance(date, datetime.datetime):
+        date = date.astimezone(datetime.timezone.utc)
+    return datetime.date(date.year, date.month, 1)
+
+
+def decaler(mois, nombre):
+    """Premier jour du mois `nombre` mois après `mois` (négatif: avant)"""
+    index = mois.year * 12 + mois.month - 1 + nombre
+    return datetime.date(index // 12, index % 12 + 1, 1)
+
+
+def nom_partition(mois):
+    return f'{TABLE}_p{mois:%Y_%m}'
+
+
+def bornes(mois):
+    """[début, fin[ de la partition du mois, en UTC"""
+    debut = datetime.datetime(mois.year, mois.month, 1, tzinfo=datetime.timezone.utc)
+    suivant = decaler(mois, 1)
+    return debut, datetime.datetime(suivant.year, suivant.month, 1, tzinfo=datetime.timezone.utc)
+
+
+def partitions():
+    """
+    Partitions mensuelles attachées, par mois croissant:
+    [{'nom', 'mois', 'taille', 'froide', 'tablespace'}]
+    """
+    with connection.cursor() as cursor:
+        cursor.execute("""
+            SELECT c.relname,
+                   pg_total_relation_size(c.oid),
+                   coalesce(obj_description(c.oid, 'pg_class') = %s, false),
+                   t.spcname
+            FROM pg_inherits AS i
+            JOIN pg_class AS c ON c.oid = i.inhrelid
+            LEFT JOIN pg_tablespace AS t ON t.oid = c.reltablespace
+            WHERE i.inhparent = %s::regclass
+        """, [MARQUE_FROIDE, TABLE])
+        lignes = cursor.fetchall()
+    resultat = []
+    for nom, taille, froide, tablespace in lignes:
+        correspondance = NOM_RE.match(nom)
+        if correspondance:
+            resultat.append({
+                'nom': nom,
+                'mois': datetime.date(int(correspondance[1]), int(correspondance[2]), 1),
+                'taille': taille,
+                'froide': froide,
+                'tablespace': tablespace,
+            })
+    return sorted(resultat, key=lambda partition: partition['mois'])
+
+
+def lignes_hors_partitions():
+    """Nombre de messages tombés dans la partition par défaut"""
+    with connection.cursor() as cursor:
+        cursor.execute(f'SELECT count(*) FROM {connection.ops.quote_name(PARTITION_DEFAUT)}')
+        return cursor.fetchone()[0]
+
+
+@transaction.atomic
+def creer_partition(mois):
+    """
+    Créer la partition du mois; False si elle existe déjà. Les messages du
+    mois déjà reçus par la partition par défaut y sont déplacés.
+    """
+    nom = nom_partition(mois)
+    if any(partition['nom'] == nom for partition in partitions()):
+        return False
+    debut, fin = bornes(mois)
+    table, defaut, partition = (connection.ops.quote_name(n) for n in (TABLE, PARTITION_DEFAUT, nom))
+    with connection.cursor() as cursor:
+        # Verrou pris avant la lecture: aucune ligne du mois n'y arrive ensuite
+        cursor.execute(f'LOCK TABLE {defaut} IN SHARE ROW EXCLUSIVE MODE')
+        cursor.execute(
+            f'SELECT EXISTS (SELECT 1 FROM {defaut} WHERE date_envoi >= %s AND date_envoi < %s)',
+            [debut, fin],
+        )
+        if not cursor.fetchone()[0]:
+            cursor.execute(
+                f'CREATE TABLE {partition} PARTITION OF {table} FOR VALUES FROM (%s) TO (%s)',
+                [debut, fin],
+            )
+            return True
+        # Une partition ne peut couvrir des lignes de la partition par défaut:
+        # table remplie à part, puis attachée. Les entrées de boîte de ces
+        # messages les référencent pendant le déplacement: contrainte retirée
+        # puis revalidée (cas rare, partitions créées en retard).
+        cursor.execute(f'ALTER TABLE messaging_mailbox DROP CONSTRAINT {CONTRAINTE_BOITE}')
+        cursor.execute(f'CREATE TABLE {partition} (LIKE {table} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)')
+        cursor.execute(f"""
+            WITH deplaces AS (
+                DELETE FROM {defaut} WHERE date_envoi >= %s AND date_envoi < %s RETURNING *
+            )
+            INSERT INTO {partition} SELECT * FROM deplaces
+        """, [debut, fin])
+        cursor.execute(
+            f'ALTER TABLE {table} ATTACH PARTITION {partition} FOR VALUES FROM (%s) TO (%s)',
+            [debut, fin],
+        )
+        cursor.execute(
+            f'ALTER TABLE messaging_mailbox ADD CONSTRAINT {CONTRAINTE_BOITE} '
+            f'{DEFINITION_CONTRAINTE_BOITE} NOT VALID'
+        )
+        cursor.execute(f'ALTER TABLE messaging_mailbox VALIDATE CONSTRAINT {CONTRAINTE_BOITE}')
+    return True
+
+
+def compacter(nom, tablespace=None):
+    """
+    Partition froide: déplacée vers `tablespace` (index compris), réécrite
+    sans espace mort, gelée et analysée. Bloque la seule partition le temps
+    de la réécriture. Hors transaction (VACUUM).
+    """
+    partition = connection.ops.quote_name(nom)
+    with connection.cursor() as cursor:
+        if tablespace:
+            espace = connection.ops.quote_name(tablespace)
+            cursor.execute(f'ALTER TABLE {partition} SET TABLESPACE {espace}')
+            cursor.execute("SELECT indexrelid::regclass::text FROM pg_index WHERE indrelid = %s::regclass", [nom])
+            for (index,) in cursor.fetchall():
+                cursor.execute(f'ALTER INDEX {index} SET TABLESPACE {espace}')
+        cursor.execute(f'VACUUM (FULL) {partition}')
+        # Pages entièrement gelées: l'autovacuum n'y revient plus
+        cursor.execute(f'VACUUM (FREEZE, ANALYZE) {partition}')
+        cursor.execute(f'COMMENT ON TABLE {partition} IS %s', [MARQUE_FROIDE])
+
+
+@transaction.atomic
+def detacher(mois, supprimer=False):
+    """
+    Retirer de l'application les messages du mois puis détacher leur
+    partition (supprimée si `supprimer`, sinon gardée sous son nom, hors de
+    la table, pour export). Retourne le nombre d'entrées de boîte retirées.
+
+    Entrées de boîte, compteurs (CompteurMessages) et non lus des
+    conversations sont mis à jour en quelques requêtes ensemblistes.
+    """
+    nom = nom_partition(mois)
+    debut, fin = bornes(mois)
+    table, partition = connection.ops.quote_name(TABLE), connection.ops.quote_name(nom)
+    with connection.cursor() as cursor:
+        # Plus de lecture ni d'écriture du mois pendant le retrait
+        cursor.execute(f'LOCK TABLE {partition} IN ACCESS EXCLUSIVE MODE')
+        cursor.execute(f"""
+            WITH retirees AS (
+                DELETE FROM messaging_mailbox WHERE date_envoi >= %s AND date_envoi < %s
+                RETURNING utilisateur_id, message_id, date_envoi, recu, envoye, lu, archive
+            ),
+            non_lues AS (
+                SELECT r.utilisateur_id, m.conversation_id, count(*) AS nombre
+                FROM retirees AS r
+                JOIN {partition} AS m ON m.id = r.message_id
+                WHERE r.recu AND NOT r.lu AND NOT r.archive AND m.conversation_id IS NOT NULL
+                GROUP BY r.utilisateur_id, m.conversation_id
+            ),
+            participants AS (
+                UPDATE messaging_participant AS p
+                SET non_lus = greatest(p.non_lus - n.nombre, 0)
+                FROM non_lues AS n
+                WHERE p.utilisateur_id = n.utilisateur_id AND p.conversation_id = n.conversation_id
+            ),
+            comptes AS (
+                SELECT utilisateur_id,
+                       count(*) AS total,
+                       count(*) FILTER (WHERE recu) AS recus,
+                       count(*) FILTER (WHERE envoye) AS envoyes,
+                       count(*) FILTER (WHERE recu AND NOT lu AND NOT archive) AS non_lus,
+                       count(*) FILTER (WHERE archive) AS archives
+                FROM retirees
+                GROUP BY utilisateur_id
+            ),
+            compteurs AS (
+                UPDATE messaging_counters AS c
+                SET total = greatest(c.total - d.total, 0),
+                    recus = greatest(c.recus - d.recus, 0),
+                    envoyes = greatest(c.envoyes - d.envoyes, 0),
+                    non_lus = greatest(c.non_lus - d.non_lus, 0),
+                    archives = greatest(c.archives - d.archives, 0)
+                FROM comptes AS d
+                WHERE c.utilisateur_id = d.utilisateur_id
+            )
+            SELECT count(*) FROM retirees
+        """, [debut, fin])
+        retirees = cursor.fetchone()[0]
+
+        cursor.execute(f'ALTER TABLE {table} DETACH PARTITION {partition}')
+        # Dernier message retiré: le plus récent des messages restants
+        cursor.execute(f"""
+            UPDATE messaging_conversation AS c
+            SET dernier_message_id = (
+                SELECT m.id FROM {table} AS m
+                WHERE m.conversation_id = c.id
+                ORDER BY m.date_envoi DESC, m.id DESC
+                LIMIT 1
+            )
+            WHERE c.dernier_message_id IN (SELECT id FROM {partition})
+        """)
+        if supprimer:
+            cursor.execute(f'DROP TABLE {partition}')
+    return retirees
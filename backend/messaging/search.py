@@ -0,0 +1,48 @@
+"""
+Recherche plein texte dans les messages: `search_vector` (sujet poids A,
+contenu poids B, index GIN messages_search_idx), avec la configuration et
+la saisie de la recherche d'hôtels (hotels.search).
+
+Les extraits surlignés sont calculés par ts_headline, coûteux: PostgreSQL
+ne l'évalue qu'après le tri et le LIMIT, pour les seules lignes de la page.
+"""
+from html import escape
+
+from django.contrib.postgres.search import SearchHeadline, SearchRank
+from django.db.models import F
+
+from hotels.search import SEARCH_CONFIG, build_search_query
+
+
+# Délimiteurs posés par ts_headline, remplacés par <mark> après
+# échappement du texte: le contenu des messages n'est jamais interprété
+DEBUT = '\x02'
+FIN = '\x03'
+
+
+def _extrait(champ, query, **options):
+    return SearchHeadline(
+        champ, query, config=SEARCH_CONFIG, start_sel=DEBUT, stop_sel=FIN, **options,
+    )
+
+
+def rechercher(messages, terms):
+    """
+    Messages de `messages` correspondant à `terms`, annotés `rang`,
+    `extrait_sujet` et `extrait_contenu`; None si la saisie ne contient aucun mot
+    """
+    query = build_search_query(terms)
+    if query is None:
+        return None
+    return messages.filter(search_vector=query).annotate(
+        rang=SearchRank(F('search_vector'), query),
+        extrait_sujet=_extrait('sujet', query, highlight_all=True),
+        extrait_contenu=_extrait(
+            'contenu', query, max_words=30, min_words=10, max_fragments=2, fragment_delimiter=' … ',
+        ),
+    )
+
+
+def surligner(extrait):
+    """Extrait ts_headline en HTML: texte échappé, termes trouvés entre <mark>"""
+    return escape(extrait).replace(DEBUT, '<mark>').replace(FIN, '</mark>')
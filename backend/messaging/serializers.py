@@ -1,16 +1,19 @@
 from rest_framework import serializers
-from messaging.models import Message
+from messaging.conversations import envoyer_message
+from messaging.models import BoiteMessage, Message, ParticipantConversation
+from messaging.search import surligner
 from accounts.models import User
+from red_product.sparse import SparseFieldsMixin
 
 
-class UserMinimalSerializer(serializers.ModelSerializer):
+class UserMinimalSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """Serializer minimal pour les utilisateurs dans les messages"""
     class Meta:
         model = User
         fields = ['id', 'username', 'email', 'first_name', 'last_name']
 
 
-class MessageSerializer(serializers.ModelSerializer):
+class MessageSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """Serializer complet pour les messages"""
     expediteur = UserMinimalSerializer(read_only=True)
     destinataire = UserMinimalSerializer(read_only=True)
@@ -40,22 +43,63 @@ class MessageSerializer(serializers.ModelSerializer):
         return value
     
     def create(self, validated_data):
-        """Créer un message"""
+        """Créer un message dans la conversation de l'expéditeur et du destinataire"""
         destinataire_id = validated_data.pop('destinataire_id')
         destinataire = User.objects.get(id=destinataire_id)
+        expediteur = validated_data.pop('expediteur')
         
-        message = Message.objects.create(
-            destinataire=destinataire,
-            **validated_data
-        )
-        return message
+        return envoyer_message(expediteur, destinataire, **validated_data)
 
 
-class MessageListSerializer(serializers.ModelSerializer):
+class SelectionMessagesSerializer(serializers.Serializer):
+    """
+    Messages visés par une action groupée: liste d'ids et/ou filtre
+    (ex: `{"non_lus": true, "avant": "2024-01-01T00:00:00Z"}`)
+    """
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        required=False,
+        allow_empty=False,
+        max_length=5000,
+    )
+    avant = serializers.DateTimeField(required=False, help_text="Messages envoyés avant cette date")
+    conversation = serializers.IntegerField(required=False, min_value=1)
+    non_lus = serializers.BooleanField(required=False, default=False)
+    
+    def validate(self, data):
+        """Sauf indication contraire du contexte, une sélection vide est refusée"""
+        if self.context.get('selection_requise', True) and not (
+            data.get('ids') or data.get('avant') or data.get('conversation') or data['non_lus']
+        ):
+            raise serializers.ValidationError({
+                'ids': ["Indiquer des ids ou un filtre (avant, conversation, non_lus)."]
+            })
+        return data
+    
+    def boites(self, utilisateur):
+        """Entrées BoiteMessage de `utilisateur` correspondant à la sélection"""
+        criteres = {'utilisateur': utilisateur}
+        if 'ids' in self.validated_data:
+            criteres['message_id__in'] = self.validated_data['ids']
+        if 'avant' in self.validated_data:
+            criteres['date_envoi__lt'] = self.validated_data['avant']
+        if 'conversation' in self.validated_data:
+            criteres['message_partitionne__conversation_id'] = self.validated_data['conversation']
+        if self.validated_data['non_lus']:
+            criteres.update(recu=True, lu=False, archive=False)
+        return BoiteMessage.objects.filter(**criteres)
+
+
+class MessageListSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """Serializer simplifié pour la liste des messages"""
     expediteur_nom = serializers.CharField(source='expediteur.username', read_only=True)
     destinataire_nom = serializers.CharField(source='destinataire.username', read_only=True)
     est_lu = serializers.SerializerMethodField()
+    method_field_sources = {'est_lu': ['status']}
+    expandable_fields = {
+        'expediteur': (UserMinimalSerializer, {}),
+        'destinataire': (UserMinimalSerializer, {}),
+    }
     
     class Meta:
         model = Message
@@ -70,4 +114,49 @@ class MessageListSerializer(serializers.ModelSerializer):
         ]
     
     def get_est_lu(self, obj):
-        return obj.status == 'read'
\ No newline at end of file
+        return obj.status == 'read'
+
+
+class MessageRechercheSerializer(MessageListSerializer):
+    """Résultat de recherche: ligne de liste, pertinence et extraits surlignés (HTML)"""
+    rang = serializers.SerializerMethodField()
+    extrait_sujet = serializers.SerializerMethodField()
+    extrait_contenu = serializers.SerializerMethodField()
+    # Annotations du queryset (messaging.search), aucune colonne à lire
+    method_field_sources = {
+        **MessageListSerializer.method_field_sources,
+        'rang': [],
+        'extrait_sujet': [],
+        'extrait_contenu': [],
+    }
+    
+    class Meta(MessageListSerializer.Meta):
+        fields = MessageListSerializer.Meta.fields + ['rang', 'extrait_sujet', 'extrait_contenu']
+    
+    def get_rang(self, obj):
+        return obj.rang
+    
+    def get_extrait_sujet(self, obj):
+        return surligner(obj.extrait_sujet)
+    
+    def get_extrait_contenu(self, obj):
+        return surligner(obj.extrait_contenu)
+
+
+class MessageApercuSerializer(serializers.ModelSerializer):
+    """Aperçu du dernier message d'une conversation"""
+    
+    class Meta:
+        model = Message
+        fields = ['id', 'expediteur', 'sujet', 'status', 'date_envoi']
+
+
+class ConversationSerializer(serializers.ModelSerializer):
+    """Conversation vue par l'un de ses participants"""
+    id = serializers.IntegerField(source='conversation_id', read_only=True)
+    interlocuteur = UserMinimalSerializer(read_only=True)
+    dernier_message = MessageApercuSerializer(source='conversation.dernier_message', read_only=True)
+    
+    class Meta:
+        model = ParticipantConversation
+        fields = ['id', 'interlocuteur', 'non_lus', 'derniere_activite', 'dernier_message']
@@ -0,0 +1,35 @@
+from django.db.models import Count, Q
+
+from messaging.models import CompteurMessages
+
+
+CHAMPS = ('total', 'recus', 'envoyes', 'non_lus', 'archives')
+
+
+def comptages():
+    """Expressions des compteurs sur les entrées BoiteMessage (recalcul)"""
+    return {
+        'total': Count('pk'),
+        'recus': Count('pk', filter=Q(recu=True)),
+        'envoyes': Count('pk', filter=Q(envoye=True)),
+        'non_lus': Count('pk', filter=Q(recu=True, lu=False, archive=False)),
+        'archives': Count('pk', filter=Q(archive=True)),
+    }
+
+
+def statistiques_boite(utilisateur):
+    """
+    Compteurs de la boîte d'un utilisateur: une recherche par clé primaire
+    dans messaging_counters (tenue à jour par messaging.conversations)
+    """
+    compteurs = CompteurMessages.objects.filter(pk=utilisateur.pk).values(*CHAMPS).first()
+    if compteurs is None:
+        # Aucun message échangé depuis sa création
+        compteurs = dict.fromkeys(CHAMPS, 0)
+    return {
+        'total': compteurs['total'],
+        'total_recus': compteurs['recus'],
+        'total_envoyes': compteurs['envoyes'],
+        'non_lus': compteurs['non_lus'],
+        'archives': compteurs['archives'],
+    }
@@ -1,10 +1,12 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from messaging.views import MessageViewSet
+from messaging.views import ConversationViewSet, MessageViewSet
 
 app_name = 'messaging'
 
 router = DefaultRouter()
+# Avant la route racine, dont le détail {id}/ capturerait 'conversations'
+router.register(r'conversations', ConversationViewSet, basename='conversation')
 router.register(r'', MessageViewSet, basename='message')
 
 urlpatterns = [
@@ -12,11 +14,13 @@ urlpatterns = [
 ]
 
 # Routes générées automatiquement:
-# GET    /api/messages/                    - Liste des messages
+# GET    /api/messages/                    - Liste des messages (?conversation=<id>: un fil)
 # POST   /api/messages/                    - Envoyer un message
 # GET    /api/messages/{id}/               - Détails d'un message
 # DELETE /api/messages/{id}/               - Supprimer un message
 # GET    /api/messages/non_lus/            - Messages non lus
 # GET    /api/messages/statistiques/       - Statistiques des messages
 # POST   /api/messages/{id}/marquer_lu/    - Marquer comme lu
-# POST   /api/messages/{id}/archiver/      - Archiver un message
\ No newline at end of file
+# POST   /api/messages/{id}/archiver/      - Archiver un message
+# GET    /api/messages/conversations/      - Conversations (dernier message, non lus)
+# GET    /api/messages/conversations/{id}/ - Une conversation
@@ -1,52 +1,115 @@
 from rest_framework import viewsets, status, permissions
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
-from django.db.models import Q
-from messaging.models import Message
-from messaging.serializers import MessageSerializer, MessageListSerializer
+from django.db.models import F
+from messaging.conversations import (
+    archiver_message,
+    archiver_messages,
+    marquer_messages_lus,
+    supprimer_message,
+    supprimer_messages,
+)
+from messaging.models import Message, ParticipantConversation
+from messaging.search import rechercher
+from messaging.serializers import (
+    ConversationSerializer,
+    MessageListSerializer,
+    MessageRechercheSerializer,
+    MessageSerializer,
+    SelectionMessagesSerializer,
+)
+from messaging.stats import statistiques_boite
+from red_product.conditional import ConditionalGetMixin
+from red_product.fastpath import FastListMixin
+from red_product.pagination import HybridPagination
+from red_product.sparse import SparseQuerysetMixin
 
 
-class MessageViewSet(viewsets.ModelViewSet):
+class MessageViewSet(ConditionalGetMixin, FastListMixin, SparseQuerysetMixin, viewsets.ModelViewSet):
     """
     ViewSet pour gérer les messages
     
-    list: Retourner tous les messages (reçus et envoyés)
+    list: Retourner les messages d'un dossier de la boîte (?type=)
     retrieve: Retourner les détails d'un message
     create: Créer un nouveau message
     destroy: Supprimer un message
+
+    Lectures: `?fields=` et `?expand=expediteur,destinataire` (red_product.sparse)
     """
     serializer_class = MessageSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = HybridPagination
+    # Annotation de get_queryset: date de l'entrée de boîte
+    ordering = ['-date_tri']
+    # Lus par retrieve (marquage comme lu) quels que soient les champs demandés
+    sparse_required_fields = ['expediteur', 'destinataire', 'status']
+    
+    # Dossiers de la boîte (?type=): conditions sur l'entrée de l'utilisateur
+    DOSSIERS = {
+        'all': {'boites__archive': False},
+        'received': {'boites__recu': True, 'boites__archive': False},
+        'sent': {'boites__envoye': True, 'boites__archive': False},
+        'archived': {'boites__archive': True},
+    }
     
     def get_queryset(self):
-        """Retourner les messages de l'utilisateur connecté"""
+        """
+        Messages de la boîte de l'utilisateur connecté
+
+        La liste lit un dossier (`?type=all|received|sent|archived`) par
+        l'index partiel de ce dossier sur messaging_mailbox, triée par la
+        date copiée dans l'entrée de boîte (`date_tri`). Les autres actions
+        accèdent à tout message présent dans la boîte, archivé ou non.
+        """
         user = self.request.user
         
-        # Filtrer selon le paramètre 'type'
-        message_type = self.request.query_params.get('type', 'all')
-        
-        if message_type == 'received':
-            # Messages reçus uniquement
-            return Message.objects.filter(destinataire=user)
-        elif message_type == 'sent':
-            # Messages envoyés uniquement
-            return Message.objects.filter(expediteur=user)
-        else:
-            # Tous les messages (reçus et envoyés)
+        # Messages d'une conversation: parcours de l'index (conversation, date_envoi, id)
+        conversation = self.request.query_params.get('conversation')
+        if conversation:
+            if not conversation.isdigit():
+                raise ValidationError({'conversation': ['Identifiant numérique attendu.']})
             return Message.objects.filter(
-                Q(expediteur=user) | Q(destinataire=user)
-            ).distinct()
+                boites__utilisateur=user, conversation_id=conversation,
+            ).annotate(date_tri=F('date_envoi'))
+        
+        if self.action != 'list':
+            return Message.objects.filter(boites__utilisateur=user).defer('search_vector')
+        
+        # Filtrer selon le paramètre 'type' (un seul filter(): une seule jointure)
+        dossier = self.DOSSIERS.get(self.request.query_params.get('type', 'all'), self.DOSSIERS['all'])
+        return self.dossier(Message.objects.filter(boites__utilisateur=user, **dossier))
+    
+    def dossier(self, messages):
+        """Tri par la date de l'entrée de boîte: celui de l'index du dossier"""
+        return messages.annotate(date_tri=F('boites__date_envoi')).order_by('-date_tri', '-id')
     
     def get_serializer_class(self):
         """Utiliser un serializer simplifié pour la liste"""
         if self.action == 'list':
             return MessageListSerializer
+        if self.action == 'recherche':
+            return MessageRechercheSerializer
         return MessageSerializer
     
     def perform_create(self, serializer):
         """Associer l'expéditeur lors de la création"""
         serializer.save(expediteur=self.request.user)
     
+    def perform_destroy(self, instance):
+        """Supprimer en tenant à jour la conversation (non lus, dernier message)"""
+        supprimer_message(instance)
+    
+    def list(self, request, *args, **kwargs):
+        """Liste paginée, lue par values() sans serializer par ligne (red_product.fastpath)"""
+        queryset, represent = self.fast_list_queryset(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(queryset)
+        if represent is None:
+            data = self.get_serializer(page, many=True).data
+        else:
+            data = [represent(message) for message in page]
+        return self.get_paginated_response(data)
+    
     def retrieve(self, request, *args, **kwargs):
         """Marquer le message comme lu lors de la consultation"""
         instance = self.get_object()
@@ -60,28 +123,74 @@ class MessageViewSet(viewsets.ModelViewSet):
     
     @action(detail=False, methods=['get'])
     def non_lus(self, request):
-        """Retourner uniquement les messages non lus"""
-        messages = Message.objects.filter(
-            destinataire=request.user,
-            status='sent'
+        """
+        Messages non lus, paginés (`?page=` ou `?pagination=cursor`)
+
+        Servis par l'index partiel mailbox_non_lus_idx: en mode curseur, le
+        coût d'une page ne dépend pas du nombre de messages en attente. Un
+        message ne sort de cette liste qu'en étant lu ou archivé et n'y entre
+        qu'avec un nouvel id: les ids de la page suffisent à valider la
+        réponse (ETag / 304).
+        """
+        messages = self.sparse_queryset(self.dossier(Message.objects.filter(
+            boites__utilisateur=request.user,
+            boites__recu=True,
+            boites__lu=False,
+            boites__archive=False,
+        )))
+        messages, represent = self.fast_list_queryset(messages)
+        page = self.paginate_queryset(messages)
+        
+        def reponse():
+            if represent is not None:
+                data = [represent(message) for message in page]
+            else:
+                data = self.get_serializer(page, many=True).data
+            return self.get_paginated_response(data)
+        
+        return self.conditional_response(
+            request,
+            reponse,
+            [message.pk for message in page],
+            self.paginator.get_page_version(),
         )
-        serializer = self.get_serializer(messages, many=True)
-        return Response(serializer.data)
+    
+    @action(detail=False, methods=['get'])
+    def recherche(self, request):
+        """
+        Recherche plein texte dans la boîte de l'utilisateur (`?q=`)
+
+        Sujet et contenu, par pertinence puis du plus récent au plus ancien;
+        le dernier mot saisi vaut pour préfixe. `?type=` restreint à un
+        dossier (défaut: toute la boîte, archives comprises). Chaque résultat
+        porte `rang` et des extraits HTML où les termes trouvés sont entre
+        `<mark>`.
+        """
+        criteres = self.DOSSIERS.get(request.query_params.get('type'), {})
+        messages = rechercher(
+            Message.objects.filter(boites__utilisateur=request.user, **criteres).defer('search_vector'),
+            request.query_params.get('q', '').strip(),
+        )
+        if messages is None:
+            raise ValidationError({'q': ['Terme de recherche requis.']})
+        
+        # Tri de la pagination (curseur compris): pertinence, puis id
+        self.ordering = ['-rang']
+        messages, represent = self.fast_list_queryset(
+            self.sparse_queryset(messages.order_by('-rang', '-id'))
+        )
+        page = self.paginate_queryset(messages)
+        if represent is not None:
+            data = [represent(message) for message in page]
+        else:
+            data = self.get_serializer(page, many=True).data
+        return self.get_paginated_response(data)
     
     @action(detail=False, methods=['get'])
     def statistiques(self, request):
         """Retourner les statistiques des messages"""
-        user = request.user
-        
-        stats = {
-            'total_recus': Message.objects.filter(destinataire=user).count(),
-            'total_envoyes': Message.objects.filter(expediteur=user).count(),
-            'non_lus': Message.objects.filter(destinataire=user, status='sent').count(),
-            'archives': Message.objects.filter(
-                Q(expediteur=user) | Q(destinataire=user),
-                status='archived'
-            ).count(),
-        }
+        stats = statistiques_boite(request.user)
+        del stats['total']
         
         return Response(stats)
     
@@ -102,7 +211,12 @@ class MessageViewSet(viewsets.ModelViewSet):
     
     @action(detail=True, methods=['post'])
     def archiver(self, request, pk=None):
-        """Archiver un message"""
+        """
+        Archiver un message dans la boîte de l'utilisateur connecté
+
+        L'autre partie garde le message dans ses dossiers; il se retrouve
+        par `?type=archived`.
+        """
         message = self.get_object()
         
         # Seul l'expéditeur ou le destinataire peut archiver
@@ -112,8 +226,60 @@ class MessageViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_403_FORBIDDEN
             )
         
-        message.status = 'archived'
-        message.save()
+        archiver_message(message, request.user)
         
         serializer = self.get_serializer(message)
-        return Response(serializer.data)
\ No newline at end of file
+        return Response(serializer.data)
+
+    
+    def selection(self, request, selection_requise=True):
+        """Entrées de boîte visées par une action groupée (SelectionMessagesSerializer)"""
+        serializer = SelectionMessagesSerializer(
+            data=request.data, context={'selection_requise': selection_requise},
+        )
+        serializer.is_valid(raise_exception=True)
+        return serializer.boites(request.user)
+    
+    @action(detail=False, methods=['post'])
+    def marquer_lus(self, request):
+        """
+        Marquer lus plusieurs messages reçus en une fois
+
+        Sans ids ni filtre: tous les messages non lus. Quelques requêtes
+        ensemblistes quel que soit le nombre de messages.
+        """
+        nombre = marquer_messages_lus(request.user, self.selection(request, selection_requise=False))
+        return Response({'nombre': nombre})
+    
+    @action(detail=False, methods=['post'])
+    def archiver_lot(self, request):
+        """Archiver dans la boîte de l'utilisateur les messages sélectionnés"""
+        nombre = archiver_messages(request.user, self.selection(request))
+        return Response({'nombre': nombre})
+    
+    @action(detail=False, methods=['post'])
+    def supprimer_lot(self, request):
+        """Supprimer les messages sélectionnés (pour les deux parties, comme destroy)"""
+        nombre = supprimer_messages(request.user, self.selection(request))
+        return Response({'nombre': nombre})
+
+
+class ConversationViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    Conversations de l'utilisateur connecté, de la plus récente à la plus ancienne
+
+    Une seule requête par page, servie par l'index (utilisateur,
+    derniere_activite, id): interlocuteur, non lus et dernier message sont
+    dénormalisés (messaging.conversations). Les messages d'une conversation
+    se lisent par `/api/messages/?conversation=<id>`.
+    """
+    serializer_class = ConversationSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    pagination_class = HybridPagination
+    ordering = ['-derniere_activite']
+    lookup_field = 'conversation'
+    
+    def get_queryset(self):
+        return ParticipantConversation.objects.filter(
+            utilisateur=self.request.user
+        ).select_related('interlocuteur', 'conversation__dernier_message')
@@ -3,6 +3,10 @@ ASGI config for red_product project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+En plus de Django, sert le canal temps réel (WebSocket /ws/evenements/ et
+SSE /api/evenements/, voir red_product.realtime), par exemple avec:
+    uvicorn red_product.asgi:application
+
 For more information on this file, see
 https://docs.djangoproject.com/en/4.2/howto/deployment/asgi/
 """
@@ -13,4 +17,9 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'red_product.settings')
 
-application = get_asgi_application()
\ No newline at end of file
+django_application = get_asgi_application()
+
+# Après le chargement de Django: importe les réglages et DRF
+from red_product.realtime import RealtimeApplication  # noqa: E402
+
+application = RealtimeApplication(django_application)
\ No newline at end of file
@@ -0,0 +1,47 @@
+import hashlib
+
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date
+
+
+class ConditionalGetMixin:
+    """
+    Requêtes GET conditionnelles (ETag / Last-Modified / 304) pour un ViewSet.
+
+    Le validateur est calculé à partir de quelques valeurs peu coûteuses
+    (ex: max(updated_at) et nombre de lignes) avant toute sérialisation:
+    si le client possède déjà cette version, la réponse est un
+    `304 Not Modified` vide et le serializer n'est jamais exécuté.
+    """
+    conditional_cache_control = 'private, no-cache'
+
+    def conditional_response(self, request, build_response, *validators, last_modified=None):
+        """
+        Retourner un 304 si le client est à jour, sinon `build_response()`.
+
+        `validators` identifient la version des données; l'ETag y ajoute le
+        chemin complet (filtres, page, tri), l'utilisateur et le format de
+        rendu, qui changent aussi la représentation.
+        """
+        etag = self.compute_etag(request, *validators)
+        timestamp = int(last_modified.timestamp()) if last_modified else None
+
+        response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+        if response is None:
+            response = build_response()
+
+        if response.status_code in (200, 304):
+            response['ETag'] = etag
+            if timestamp is not None:
+                response['Last-Modified'] = http_date(timestamp)
+            # Le client doit toujours revalider: réponses propres à l'utilisateur
+            response['Cache-Control'] = self.conditional_cache_control
+            patch_vary_headers(response, ('Accept', 'Authorization'))
+        return response
+
+    def compute_etag(self, request, *validators):
+        renderer = getattr(request, 'accepted_media_type', '')
+        parts = (request.get_full_path(), request.user.pk, renderer) + validators
+        digest = hashlib.md5(repr(parts).encode(), usedforsecurity=False).hexdigest()
+        # ETag faible: même contenu, octets éventuellement différents (gzip, indentation)
+        return f'W/"{digest}"'
@@ -0,0 +1,146 @@
+"""
+Listes sans instance de modèle ni serializer par ligne.
+
+Les lignes sont lues par `values()` et converties en dictionnaires par des
+fonctions préparées une fois par requête à partir des champs du serializer
+(celui de la vue, après `?fields=` / `?expand=`). Chaque valeur passe par le
+`to_representation()` du champ correspondant: le JSON produit est
+identique, octet pour octet, à celui du serializer.
+
+Les lignes (`Row`) restent accessibles par attribut comme des instances:
+pagination par curseur, validateurs d'ETag et `get_<champ>()` des
+SerializerMethodField fonctionnent sans changement.
+"""
+from django.conf import settings
+from django.db.models.query import ValuesIterable
+from rest_framework import serializers
+
+from red_product.sparse import serializer_columns, sort_columns
+
+
+class Row(dict):
+    """Ligne lue par values(), accessible par attribut (`row.nom`, `row.pk`)"""
+    __slots__ = ()
+    pk_name = 'id'
+
+    def __getattr__(self, name):
+        if name == 'pk':
+            name = self.pk_name
+        try:
+            return self[name]
+        except KeyError:
+            raise AttributeError(name) from None
+
+
+class RowIterable(ValuesIterable):
+    def __iter__(self):
+        for row in super().__iter__():
+            yield Row(row)
+
+
+def _file_url(field, model_field, request):
+    """Équivalent de FileField.to_representation à partir du chemin stocké"""
+    storage = model_field.storage
+    use_url = getattr(field, 'use_url', True)
+
+    def represent(name):
+        if not name:
+            return None
+        if not use_url:
+            return name
+        url = storage.url(name)
+        return request.build_absolute_uri(url) if request is not None else url
+    return represent
+
+
+def _representer(serializer, prefix=''):
+    """
+    Fonction `row -> dict` pour un serializer dont les colonnes sont lues
+    sous `prefix` (relations imbriquées), ou None si un champ n'est pas
+    pris en charge (le serializer classique est alors utilisé).
+    """
+    model = serializer.Meta.model
+    request = serializer.context.get('request')
+    steps = []
+
+    for name, field in serializer.fields.items():
+        if field.write_only:
+            continue
+        if isinstance(field, serializers.SerializerMethodField):
+            # get_<champ>(row): la ligne se lit comme une instance
+            steps.append((name, None, getattr(serializer, field.method_name), True))
+            continue
+        if field.source == '*':
+            return None
+        path = field.source.split('.')
+        key = prefix + '__'.join(path)
+        if isinstance(field, serializers.BaseSerializer):
+            if isinstance(field, serializers.ListSerializer) or len(path) > 1:
+                return None
+            nested = _representer(field, f'{key}__')
+            if nested is None:
+                return None
+            # Clé étrangère nulle: objet imbriqué None, comme le serializer
+            steps.append((name, key, nested, True))
+            continue
+        if isinstance(field, serializers.PrimaryKeyRelatedField):
+            if field.pk_field is not None:
+                return None
+            convert = _identity
+        elif isinstance(field, serializers.RelatedField):
+            return None
+        elif isinstance(field, serializers.FileField):
+            if len(path) > 1:
+                return None
+            convert = _file_url(field, model._meta.get_field(path[0]), request)
+        else:
+            convert = field.to_representation
+        steps.append((name, key, convert, False))
+
+    # (clé de sortie, colonne testée à None, conversion, conversion de la ligne entière)
+    def represent(row):
+        data = {}
+        for name, key, convert, whole_row in steps:
+            if key is not None and row[key] is None:
+                data[name] = None
+            elif whole_row:
+                data[name] = convert(row)
+            else:
+                data[name] = convert(row[key])
+        return data
+    return represent
+
+
+def _identity(value):
+    return value
+
+
+class FastListMixin:
+    """
+    Vue dont la liste est produite par `values()` plutôt que par le serializer.
+
+    `fast_list` (réglage API_FAST_LISTS, activé par défaut) permet de revenir
+    au serializer. Les champs que le chemin rapide ne sait pas reproduire
+    (relations multiples, sources calculées) font aussi revenir au
+    serializer, pour toute la requête.
+    """
+    fast_list = getattr(settings, 'API_FAST_LISTS', True)
+
+    def fast_list_queryset(self, queryset):
+        """(queryset, fonction de rendu d'une ligne), ou (queryset, None) sans chemin rapide"""
+        if not self.fast_list:
+            return queryset, None
+        serializer = self.get_serializer()
+        found = serializer_columns(serializer)
+        represent = _representer(serializer) if found is not None else None
+        if represent is None:
+            return queryset, None
+
+        columns, _ = found
+        # Comme pour `?fields=`: colonnes de tri et champs toujours lus (ETag...)
+        columns |= sort_columns(queryset) | set(getattr(self, 'sparse_required_fields', ()))
+        columns.add(queryset.model._meta.pk.name)
+        # Les annotations (distance, rang de recherche) restent lisibles par les get_<champ>()
+        queryset = queryset.values(*columns, *queryset.query.annotations)
+        queryset._iterable_class = RowIterable
+        return queryset, represent
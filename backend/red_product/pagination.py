@@ -0,0 +1,255 @@
+import base64
+import json
+from collections import OrderedDict
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Pagination par curseur (keyset) sur le couple (champ de tri, id).
+
+    Chaque page est obtenue par une condition `WHERE (champ, id) < (valeur, pk)`
+    suivie d'un `LIMIT`: pas d'OFFSET ni de COUNT(*), le coût reste constant
+    quelle que soit la profondeur de la page.
+    """
+    cursor_query_param = 'cursor'
+    page_size = api_settings.PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    default_ordering = '-id'
+    invalid_cursor_message = 'Curseur invalide.'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        self.field, self.descending = self.get_ordering(request, queryset, view)
+        self.model_field = self.get_sort_field(queryset, self.field)
+
+        self.cursor = self.decode_cursor(request)
+        reverse = bool(self.cursor and self.cursor['r'])
+
+        queryset = queryset.order_by(*self.order_by(reverse))
+        if self.cursor is not None:
+            queryset = queryset.filter(self.keyset_filter(self.cursor, reverse))
+
+        results = list(queryset[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        results = results[:self.page_size]
+
+        if reverse:
+            results.reverse()
+            self.has_next = True
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = self.cursor is not None
+
+        self.page = results
+        return results
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+            if page_size > 0:
+                return min(page_size, self.max_page_size)
+        except (KeyError, ValueError):
+            pass
+        return self.page_size
+
+    def get_ordering(self, request, queryset, view):
+        """
+        Retourner le champ de tri et son sens.
+
+        Le tri suit le filtre OrderingFilter de la vue (paramètre `ordering`),
+        sinon l'attribut `ordering` de la vue. Seul le premier champ est
+        retenu, l'id servant systématiquement de départage.
+        """
+        ordering = None
+        for backend in getattr(view, 'filter_backends', []):
+            if hasattr(backend, 'get_ordering'):
+                ordering = backend().get_ordering(request, queryset, view)
+                break
+        if ordering is None:
+            ordering = getattr(view, 'ordering', None) or self.default_ordering
+        if isinstance(ordering, str):
+            ordering = [ordering]
+
+        term = ordering[0] if ordering else self.default_ordering
+        field = term.lstrip('-')
+        if field == 'pk':
+            field = queryset.model._meta.pk.name
+        if self.get_sort_field(queryset, field) is None:
+            term = self.default_ordering
+            field = term.lstrip('-')
+        return field, term.startswith('-')
+
+    def get_sort_field(self, queryset, field):
+        """
+        Champ utilisable comme clé de tri: champ concret non nul du modèle,
+        ou annotation du queryset (ex: distance calculée), None sinon.
+        """
+        if field in queryset.query.annotations:
+            return queryset.query.annotations[field].output_field
+        try:
+            model_field = queryset.model._meta.get_field(field)
+        except FieldDoesNotExist:
+            return None
+        if not model_field.concrete or model_field.null:
+            return None
+        return model_field
+
+    def order_by(self, reverse):
+        descending = self.descending != reverse
+        prefix = '-' if descending else ''
+        if self.field == 'id':
+            return [f'{prefix}id']
+        return [f'{prefix}{self.field}', f'{prefix}id']
+
+    def keyset_filter(self, cursor, reverse):
+        """Condition de reprise strictement après la position du curseur"""
+        op = 'lt' if self.descending != reverse else 'gt'
+        if self.field == 'id':
+            return Q(**{f'id__{op}': cursor['pk']})
+        value = cursor['v']
+        return Q(**{f'{self.field}__{op}e': value}) & (
+            Q(**{f'{self.field}__{op}': value}) | Q(**{f'id__{op}': cursor['pk']})
+        )
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            padding = '=' * (-len(encoded) % 4)
+            data = json.loads(base64.urlsafe_b64decode(encoded + padding).decode('utf-8'))
+            if data['o'] != self.ordering_key:
+                raise ValueError
+            cursor = {'pk': int(data['pk']), 'r': bool(data['r'])}
+            if self.field != 'id':
+                cursor['v'] = self.model_field.to_python(data['v'])
+        except (TypeError, ValueError, KeyError, ValidationError, UnicodeDecodeError):
+            raise NotFound(self.invalid_cursor_message)
+        return cursor
+
+    def encode_cursor(self, obj, reverse):
+        data = {'o': self.ordering_key, 'pk': obj.pk, 'r': int(reverse)}
+        if self.field != 'id':
+            if getattr(self.model_field, 'model', None) is None:
+                # Annotation: la valeur est portée par l'instance
+                data['v'] = str(getattr(obj, self.field))
+            else:
+                data['v'] = self.model_field.value_to_string(obj)
+        encoded = base64.urlsafe_b64encode(
+            json.dumps(data, separators=(',', ':')).encode('utf-8')
+        ).decode('ascii').rstrip('=')
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    @property
+    def ordering_key(self):
+        return f"{'-' if self.descending else ''}{self.field}"
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def get_results(self, data):
+        return data['results']
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                'name': self.cursor_query_param,
+                'required': False,
+                'in': 'query',
+                'description': 'Curseur opaque de pagination.',
+                'schema': {'type': 'string'},
+            },
+            {
+                'name': self.page_size_query_param,
+                'required': False,
+                'in': 'query',
+                'description': 'Nombre de résultats par page.',
+                'schema': {'type': 'integer'},
+            },
+        ]
+
+
+class HybridPagination(BasePagination):
+    """
+    Pagination par numéro de page (comportement historique) ou par curseur.
+
+    Le mode curseur est activé par `?pagination=cursor` ou par la présence
+    d'un paramètre `cursor`; sans ces paramètres la réponse reste identique
+    à celle de PageNumberPagination.
+    """
+    mode_query_param = 'pagination'
+
+    def __init__(self):
+        self.page_number = PageNumberPagination()
+        self.keyset = KeysetPagination()
+        self.active = self.page_number
+
+    def cursor_requested(self, request):
+        return (
+            request.query_params.get(self.mode_query_param) == 'cursor'
+            or self.keyset.cursor_query_param in request.query_params
+        )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.active = self.keyset if self.cursor_requested(request) else self.page_number
+        return self.active.paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        return self.active.get_paginated_response(data)
+
+    def get_page_version(self):
+        """
+        Ce qui, avec les lignes de la page, identifie la réponse (ETag):
+        nombre total en mode page, existence des pages voisines en mode curseur
+        """
+        if self.active is self.page_number:
+            return self.page_number.page.paginator.count
+        return (self.keyset.has_next, self.keyset.has_previous)
+
+    def get_paginated_response_schema(self, schema):
+        return self.page_number.get_paginated_response_schema(schema)
+
+    def get_results(self, data):
+        return self.active.get_results(data)
+
+    def get_schema_operation_parameters(self, view):
+        return (
+            self.page_number.get_schema_operation_parameters(view)
+            + self.keyset.get_schema_operation_parameters(view)
+        )
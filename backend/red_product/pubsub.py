@@ -0,0 +1,251 @@
+"""
+Publication / abonnement pour les événements temps réel (red_product.realtime).
+
+Le code Django (synchrone, threads des vues) publie sur un canal; les
+connexions WebSocket / SSE (asynchrones, boucle de l'application ASGI)
+s'y abonnent. Le broker se choisit par REALTIME_BROKER:
+
+- `BrokerMemoire` (défaut): dans le processus. Suffit quand les vues et les
+  connexions temps réel sont servies par le même processus ASGI.
+- `BrokerRedis`: canaux PUBLISH / SUBSCRIBE d'un serveur parlant le
+  protocole Redis (Redis, Valkey, KeyDB...), pour plusieurs processus ou
+  des vues servies en WSGI. Protocole RESP écrit directement sur socket:
+  aucune dépendance.
+
+Dans un processus, toutes les connexions d'un même canal partagent un
+seul abonnement; une connexion inactive ne coûte qu'une file vide.
+"""
+import asyncio
+import json
+import logging
+import socket
+import threading
+import urllib.parse
+from collections import defaultdict
+from contextlib import asynccontextmanager
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+
+logger = logging.getLogger(__name__)
+
+# Événements en attente par connexion: au-delà, un client trop lent perd
+# les plus récents et se resynchronise par l'API REST
+TAILLE_FILE = 100
+
+
+class BrokerMemoire:
+    """Diffusion aux abonnés du processus courant"""
+
+    def __init__(self):
+        self._verrou = threading.Lock()
+        # canal -> {(boucle, file)}
+        self._abonnes = defaultdict(set)
+
+    def publier(self, canal, message):
+        """Déposer `message` (str) dans la file de chaque abonné; appelable de tout thread"""
+        with self._verrou:
+            abonnes = list(self._abonnes.get(canal, ()))
+        for boucle, file in abonnes:
+            boucle.call_soon_threadsafe(_deposer, file, message)
+
+    @asynccontextmanager
+    async def abonner(self, canal):
+        """File asyncio des messages du canal, tant que le contexte est ouvert"""
+        abonne = (asyncio.get_running_loop(), asyncio.Queue(TAILLE_FILE))
+        with self._verrou:
+            premier = not self._abonnes[canal]
+            self._abonnes[canal].add(abonne)
+        try:
+            if premier:
+                await self._premier_abonne(canal)
+            yield abonne[1]
+        finally:
+            with self._verrou:
+                self._abonnes[canal].discard(abonne)
+                dernier = not self._abonnes[canal]
+                if dernier:
+                    del self._abonnes[canal]
+            if dernier:
+                await self._dernier_abonne(canal)
+
+    async def _premier_abonne(self, canal):
+        pass
+
+    async def _dernier_abonne(self, canal):
+        pass
+
+
+def _deposer(file, message):
+    try:
+        file.put_nowait(message)
+    except asyncio.QueueFull:
+        logger.warning('File temps réel pleine: événement abandonné')
+
+
+# Protocole RESP (Redis)
+
+def _commande(*arguments):
+    morceaux = [f'*{len(arguments)}\r\n'.encode()]
+    for argument in arguments:
+        donnees = argument if isinstance(argument, bytes) else str(argument).encode()
+        morceaux.append(b'$%d\r\n%s\r\n' % (len(donnees), donnees))
+    return b''.join(morceaux)
+
+
+async def _lire_reponse(lecteur):
+    ligne = await lecteur.readline()
+    if not ligne:
+        raise ConnectionError('Connexion fermée par le serveur')
+    type_, valeur = ligne[:1], ligne[1:-2]
+    if type_ in (b'+', b':'):
+        return valeur
+    if type_ == b'-':
+        raise ConnectionError(valeur.decode())
+    if type_ == b'$':
+        taille = int(valeur)
+        return None if taille < 0 else (await lecteur.readexactly(taille + 2))[:-2]
+    if type_ in (b'*', b'>'):
+        return [await _lire_reponse(lecteur) for _ in range(max(int(valeur), 0))]
+    raise ConnectionError(f'Réponse inattendue: {ligne!r}')
+
+
+def _lire_reponse_synchrone(fichier):
+    ligne = fichier.readline()
+    if not ligne:
+        raise ConnectionError('Connexion fermée par le serveur')
+    type_, valeur = ligne[:1], ligne[1:-2]
+    if type_ in (b'+', b':'):
+        return valeur
+    if type_ == b'-':
+        raise ConnectionError(valeur.decode())
+    if type_ == b'$':
+        taille = int(valeur)
+        return None if taille < 0 else fichier.read(taille + 2)[:-2]
+    if type_ == b'*':
+        return [_lire_reponse_synchrone(fichier) for _ in range(max(int(valeur), 0))]
+    raise ConnectionError(f'Réponse inattendue: {ligne!r}')
+
+
+class BrokerRedis(BrokerMemoire):
+    """
+    Diffusion par PUBLISH / SUBSCRIBE (REALTIME_REDIS_URL, ex:
+    redis://:motdepasse@localhost:6379/0).
+
+    Publication: une connexion bloquante par thread. Abonnement: une seule
+    connexion par processus, ouverte au premier abonné, qui s'abonne à un
+    canal au premier abonné local et s'en désabonne au départ du dernier;
+    les messages reçus sont redistribués localement comme par BrokerMemoire.
+    Connexion perdue: reconnexion et réabonnement, les événements de
+    l'intervalle sont perdus.
+    """
+    delai_connexion = 5
+    delai_reconnexion = 1
+
+    def __init__(self, url=None):
+        super().__init__()
+        url = urllib.parse.urlsplit(url or getattr(settings, 'REALTIME_REDIS_URL', 'redis://localhost:6379/0'))
+        self.hote = url.hostname or 'localhost'
+        self.port = url.port or 6379
+        self.mot_de_passe = urllib.parse.unquote(url.password) if url.password else None
+        self.utilisateur = urllib.parse.unquote(url.username) if url.username else None
+        self._local = threading.local()
+        self._ecrivain = None
+        self._lecture = None
+        self._pret = None
+
+    def _authentification(self):
+        if self.mot_de_passe is None:
+            return []
+        if self.utilisateur:
+            return [_commande('AUTH', self.utilisateur, self.mot_de_passe)]
+        return [_commande('AUTH', self.mot_de_passe)]
+
+    def publier(self, canal, message):
+        for tentative in range(2):
+            connexion = getattr(self._local, 'connexion', None)
+            try:
+                if connexion is None:
+                    connexion = socket.create_connection((self.hote, self.port), timeout=5)
+                    self._local.connexion = connexion
+                    self._local.fichier = connexion.makefile('rb')
+                    for commande in self._authentification():
+                        connexion.sendall(commande)
+                        _lire_reponse_synchrone(self._local.fichier)
+                connexion.sendall(_commande('PUBLISH', canal, message.encode()))
+                _lire_reponse_synchrone(self._local.fichier)
+                return
+            except (OSError, ConnectionError):
+                if connexion is not None:
+                    connexion.close()
+                self._local.connexion = None
+                if tentative:
+                    logger.exception('Publication temps réel impossible sur %s', canal)
+
+    async def _premier_abonne(self, canal):
+        await self._connecter()
+        # Sans connexion, le canal sera réabonné à la reconnexion
+        if self._ecrivain is not None and not self._ecrivain.is_closing():
+            self._ecrivain.write(_commande('SUBSCRIBE', canal))
+            await self._ecrivain.drain()
+
+    async def _dernier_abonne(self, canal):
+        if self._ecrivain is not None and not self._ecrivain.is_closing():
+            self._ecrivain.write(_commande('UNSUBSCRIBE', canal))
+            await self._ecrivain.drain()
+
+    async def _connecter(self):
+        if self._lecture is None or self._lecture.done():
+            self._pret = asyncio.Event()
+            self._lecture = asyncio.create_task(self._lire())
+        try:
+            await asyncio.wait_for(self._pret.wait(), self.delai_connexion)
+        except asyncio.TimeoutError:
+            # Serveur injoignable: l'abonné attend, réabonné à la reconnexion
+            logger.warning('Serveur temps réel injoignable (%s:%s)', self.hote, self.port)
+
+    async def _lire(self):
+        """Tâche de fond: connexion d'abonnement et redistribution locale"""
+        while True:
+            try:
+                lecteur, self._ecrivain = await asyncio.open_connection(self.hote, self.port)
+                for commande in self._authentification():
+                    self._ecrivain.write(commande)
+                    await self._ecrivain.drain()
+                    await _lire_reponse(lecteur)
+                with self._verrou:
+                    canaux = list(self._abonnes)
+                if canaux:
+                    self._ecrivain.write(_commande('SUBSCRIBE', *canaux))
+                    await self._ecrivain.drain()
+                self._pret.set()
+                while True:
+                    reponse = await _lire_reponse(lecteur)
+                    if isinstance(reponse, list) and len(reponse) == 3 and reponse[0] == b'message':
+                        BrokerMemoire.publier(self, reponse[1].decode(), reponse[2].decode())
+            except (OSError, ConnectionError, asyncio.IncompleteReadError):
+                logger.warning('Connexion temps réel perdue, reconnexion', exc_info=True)
+                if self._ecrivain is not None:
+                    self._ecrivain.close()
+                self._ecrivain = None
+                await asyncio.sleep(self.delai_reconnexion)
+
+
+_broker = None
+
+
+def get_broker():
+    """Broker configuré (REALTIME_BROKER), partagé par le processus"""
+    global _broker
+    if _broker is None:
+        _broker = import_string(getattr(settings, 'REALTIME_BROKER', 'red_product.pubsub.BrokerMemoire'))()
+    return _broker
+
+
+def publier(canal, evenement):
+    """Publier `evenement` (dict JSON) sur `canal` une fois la transaction validée"""
+    message = json.dumps(evenement, cls=DjangoJSONEncoder)
+    transaction.on_commit(lambda: get_broker().publier(canal, message))
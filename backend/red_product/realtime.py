@@ -0,0 +1,180 @@
+"""
+Canal temps réel des utilisateurs, servi par l'application ASGI
+(red_product.asgi) à côté de Django:
+
+- WebSocket: `ws(s)://<hôte>/ws/evenements/?token=<jeton d'accès>`
+- Server-Sent Events: `GET /api/evenements/?token=<jeton d'accès>`
+  (ou en-tête `Authorization: Bearer <jeton>`)
+
+Le jeton est le jeton d'accès SimpleJWT de l'API. Chaque connexion
+s'abonne au canal de son utilisateur et reçoit, en JSON, les événements
+publiés par `red_product.pubsub.publier` (ex: `{"type": "message.nouveau",
+...}`). Une connexion inactive n'occupe qu'une tâche asyncio en attente sur
+sa file: ni thread, ni requête en base après l'authentification.
+"""
+import asyncio
+import json
+import urllib.parse
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+
+from red_product.pubsub import get_broker
+
+
+CHEMIN_WEBSOCKET = '/ws/evenements/'
+CHEMIN_SSE = '/api/evenements/'
+
+# Commentaire SSE envoyé sans événement pendant ce délai (secondes), pour
+# que proxies et répartiteurs ne ferment pas la connexion
+BATTEMENT = getattr(settings, 'REALTIME_SSE_HEARTBEAT', 25)
+
+# Code de fermeture WebSocket: jeton absent ou invalide (expiré: le
+# rafraîchir puis se reconnecter). Envoyé après l'acceptation: une
+# fermeture avant devient un refus HTTP 403, sans code visible du client
+CODE_NON_AUTHENTIFIE = 4401
+
+
+def canal_utilisateur(user_id):
+    return f'utilisateur:{user_id}'
+
+
+def _jeton(scope):
+    parametres = urllib.parse.parse_qs(scope.get('query_string', b'').decode('latin-1'))
+    if parametres.get('token'):
+        return parametres['token'][0]
+    for nom, valeur in scope.get('headers', []):
+        if nom == b'authorization':
+            type_, _, jeton = valeur.decode('latin-1').partition(' ')
+            if type_.lower() == 'bearer':
+                return jeton.strip()
+    return None
+
+
+def _utilisateur(authentification, jeton):
+    close_old_connections()
+    try:
+        return authentification.get_user(authentification.get_validated_token(jeton))
+    finally:
+        close_old_connections()
+
+
+async def authentifier(scope):
+    """Utilisateur actif du jeton d'accès de la connexion, None sinon"""
+    jeton = _jeton(scope)
+    if not jeton:
+        return None
+    try:
+        return await sync_to_async(_utilisateur)(JWTAuthentication(), jeton)
+    except (InvalidToken, TokenError, AuthenticationFailed):
+        return None
+
+
+async def _relayer(file, receive, envoyer, fin, battement=None):
+    """Transmettre la file au client jusqu'à sa déconnexion (message ASGI `fin`)"""
+    async def transmettre():
+        while True:
+            try:
+                message = await asyncio.wait_for(file.get(), battement)
+            except asyncio.TimeoutError:
+                message = None
+            await envoyer(message)
+
+    async def attendre_fin():
+        while (await receive())['type'] != fin:
+            pass
+
+    taches = {asyncio.ensure_future(transmettre()), asyncio.ensure_future(attendre_fin())}
+    try:
+        await asyncio.wait(taches, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        for tache in taches:
+            tache.cancel()
+        # Client parti pendant un envoi: rien à signaler
+        await asyncio.gather(*taches, return_exceptions=True)
+
+
+async def websocket(scope, receive, send):
+    if (await receive())['type'] != 'websocket.connect':
+        return
+    utilisateur = await authentifier(scope)
+    if utilisateur is None:
+        await send({'type': 'websocket.accept'})
+        await send({'type': 'websocket.close', 'code': CODE_NON_AUTHENTIFIE})
+        return
+
+    async def envoyer(message):
+        await send({'type': 'websocket.send', 'text': message})
+
+    async with get_broker().abonner(canal_utilisateur(utilisateur.pk)) as file:
+        await send({'type': 'websocket.accept'})
+        await _relayer(file, receive, envoyer, 'websocket.disconnect')
+
+
+def _entetes_cors(scope):
+    """En-têtes CORS de la réponse SSE (EventSource d'une autre origine)"""
+    origine = dict(scope.get('headers', [])).get(b'origin', b'').decode('latin-1')
+    if origine and (
+        getattr(settings, 'CORS_ALLOW_ALL_ORIGINS', False)
+        or origine in getattr(settings, 'CORS_ALLOWED_ORIGINS', [])
+    ):
+        return [(b'access-control-allow-origin', origine.encode('latin-1')), (b'vary', b'Origin')]
+    return []
+
+
+async def sse(scope, receive, send):
+    utilisateur = await authentifier(scope)
+    if utilisateur is None:
+        await send({
+            'type': 'http.response.start',
+            'status': 401,
+            'headers': [(b'content-type', b'application/json'), *_entetes_cors(scope)],
+        })
+        await send({
+            'type': 'http.response.body',
+            'body': json.dumps({'error': "Jeton d'accès absent ou invalide"}).encode(),
+        })
+        return
+
+    async def envoyer(message):
+        if message is None:
+            corps = b': battement\n\n'
+        else:
+            corps = f"event: {json.loads(message)['type']}\ndata: {message}\n\n".encode()
+        await send({'type': 'http.response.body', 'body': corps, 'more_body': True})
+
+    async with get_broker().abonner(canal_utilisateur(utilisateur.pk)) as file:
+        await send({
+            'type': 'http.response.start',
+            'status': 200,
+            'headers': [
+                (b'content-type', b'text/event-stream; charset=utf-8'),
+                (b'cache-control', b'no-cache'),
+                # Pas de mise en tampon par nginx: chaque événement part aussitôt
+                (b'x-accel-buffering', b'no'),
+                *_entetes_cors(scope),
+            ],
+        })
+        await send({'type': 'http.response.body', 'body': b': connecte\n\n', 'more_body': True})
+        await _relayer(file, receive, envoyer, 'http.disconnect', BATTEMENT)
+
+
+class RealtimeApplication:
+    """Application ASGI: canal temps réel sur ses deux chemins, Django pour le reste"""
+
+    def __init__(self, django_application):
+        self.django_application = django_application
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'websocket':
+            if scope['path'] == CHEMIN_WEBSOCKET:
+                return await websocket(scope, receive, send)
+            await receive()
+            return await send({'type': 'websocket.close'})
+        if scope['type'] == 'http' and scope['path'] == CHEMIN_SSE and scope['method'] == 'GET':
+            return await sse(scope, receive, send)
+        return await self.django_application(scope, receive, send)
@@ -21,6 +21,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     
     # Third party apps
     'rest_framework',
@@ -98,6 +99,39 @@ STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 # Media files
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
+# Fichiers nommés par empreinte SHA-256: dédupliqués et cachables indéfiniment
+DEFAULT_FILE_STORAGE = 'hotels.storage.ContentAddressedStorage'
+
+# Géocodage des adresses d'hôtels: hors ligne par défaut, ou
+# 'hotels.geo.GeocodeurNominatim' (OpenStreetMap)
+HOTEL_GEOCODER = os.environ.get('HOTEL_GEOCODER', 'hotels.geo.GeocodeurHorsLigne')
+
+# Flux de modifications des hôtels (/api/hotels/changes/): durée de
+# conservation des suppressions, donc de validité d'un jeton
+HOTEL_CHANGES_RETENTION_DAYS = int(os.environ.get('HOTEL_CHANGES_RETENTION_DAYS', 30))
+
+# Cache (facettes de recherche): mémoire locale par défaut; un cache partagé
+# (ex: django.core.cache.backends.memcached.PyMemcacheCache) propage
+# l'invalidation à tous les processus
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('CACHE_LOCATION', ''),
+    }
+}
+
+# Listes hôtels / messages lues par values() sans serializer par ligne
+# (red_product.fastpath); False pour revenir aux serializers
+API_FAST_LISTS = os.environ.get('API_FAST_LISTS', 'True') == 'True'
+
+# Canal temps réel (red_product.realtime): broker dans le processus par
+# défaut; 'red_product.pubsub.BrokerRedis' quand l'API et le serveur ASGI
+# tournent dans des processus différents (Redis ou compatible)
+REALTIME_BROKER = os.environ.get('REALTIME_BROKER', 'red_product.pubsub.BrokerMemoire')
+REALTIME_REDIS_URL = os.environ.get('REALTIME_REDIS_URL', 'redis://localhost:6379/0')
+
+# Tâches d'arrière-plan (miniatures...): threads du processus web
+BACKGROUND_TASK_WORKERS = int(os.environ.get('BACKGROUND_TASK_WORKERS', 2))
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
@@ -0,0 +1,188 @@
+"""
+Champs à la demande: `?fields=` et `?expand=`.
+
+- `fields=id,nom,created_by.email` ne renvoie que ces clés (notation pointée
+  pour les objets imbriqués)
+- `expand=created_by` ajoute une relation déclarée dans `expandable_fields`
+
+Côté base, `SparseQuerysetMixin` lit ensuite la liste des champs retenus par
+le serializer pour restreindre le SELECT (`only()`) et les jointures
+(`select_related()`) à ce qui sera réellement sérialisé.
+"""
+from django.core.exceptions import FieldDoesNotExist
+from django.utils.module_loading import import_string
+from rest_framework import permissions, serializers
+
+
+def parse_fields(value):
+    """'id,created_by.email' -> {'id': None, 'created_by': {'email': None}} (None: tout)"""
+    tree = {}
+    for path in value.split(','):
+        names = [name.strip() for name in path.split('.')]
+        if not all(names):
+            continue
+        node = tree
+        for name in names[:-1]:
+            if name in node and node[name] is None:
+                break
+            node = node.setdefault(name, {})
+        else:
+            node[names[-1]] = None
+    return tree
+
+
+class SparseFieldsMixin:
+    """
+    Serializer dont les clés se choisissent à la requête (lecture seulement).
+
+    Le serializer racine lit `fields` / `expand` dans la requête; il transmet
+    aux serializers imbriqués la partie qui les concerne.
+    """
+    fields_query_param = 'fields'
+    expand_query_param = 'expand'
+    # {nom: (serializer ou son chemin d'import, kwargs)}: relations absentes
+    # par défaut, ajoutées par `?expand=nom`
+    expandable_fields = {}
+    # Les serializers déclarent aussi `method_field_sources`:
+    # {SerializerMethodField: [champs du modèle lus]}. Un champ calculé absent
+    # de ce dictionnaire empêche de restreindre le SELECT. (Pas de valeur par
+    # défaut ici: elle masquerait celle d'un mixin placé après dans le MRO.)
+
+    # Champs demandés, transmis par le serializer parent (None: lire la requête)
+    sparse_fields = None
+
+    def get_fields(self):
+        fields = super().get_fields()
+        requested, expand = self.get_sparse_options()
+
+        for name in expand | set(requested or ()):
+            if name in self.expandable_fields and name not in fields:
+                serializer_class, options = self.expandable_fields[name]
+                if isinstance(serializer_class, str):
+                    serializer_class = import_string(serializer_class)
+                fields[name] = serializer_class(read_only=True, **options)
+
+        if requested is None:
+            return fields
+        kept = {name: field for name, field in fields.items() if name in requested}
+        for name, field in kept.items():
+            nested = getattr(field, 'child', field)
+            if requested[name] is not None and isinstance(nested, SparseFieldsMixin):
+                nested.sparse_fields = requested[name]
+        return kept
+
+    def get_sparse_options(self):
+        """(arbre des champs demandés ou None, relations à ajouter)"""
+        if self.sparse_fields is not None:
+            return self.sparse_fields, set()
+
+        parent = self.parent
+        if isinstance(parent, serializers.ListSerializer):
+            parent = parent.parent
+        request = self.context.get('request')
+        # Jamais en écriture: des champs retirés seraient ignorés à la validation
+        if parent is not None or request is None or request.method not in permissions.SAFE_METHODS:
+            return None, set()
+
+        params = request.query_params
+        requested = parse_fields(params[self.fields_query_param]) if params.get(self.fields_query_param) else None
+        expand = {name.strip() for name in params.get(self.expand_query_param, '').split(',') if name.strip()}
+        return requested, expand
+
+
+def serializer_columns(serializer, prefix=''):
+    """
+    (colonnes, relations) nécessaires pour sérialiser le modèle, ou None si
+    un champ ne peut pas être rattaché à des colonnes connues.
+    """
+    model = serializer.Meta.model
+    sources = getattr(serializer, 'method_field_sources', {})
+    columns, relations = set(), set()
+
+    for name, field in serializer.fields.items():
+        if field.write_only:
+            continue
+        if field.source == '*':
+            if name not in sources:
+                return None
+            columns.update(prefix + source for source in sources[name])
+            continue
+
+        path = field.source.split('.')
+        try:
+            model_field = model._meta.get_field(path[0])
+        except FieldDoesNotExist:
+            return None
+        if not model_field.concrete:
+            return None
+
+        if isinstance(field, serializers.BaseSerializer):
+            if isinstance(field, serializers.ListSerializer) or not model_field.many_to_one:
+                return None
+            nested = serializer_columns(field, prefix=f'{prefix}{path[0]}__')
+            if nested is None:
+                return None
+            columns.add(prefix + path[0])
+            columns.update(nested[0])
+            relations.add(prefix + path[0])
+            relations.update(nested[1])
+        elif len(path) > 1:
+            # Attribut d'une relation (source='expediteur.username')
+            if not model_field.many_to_one:
+                return None
+            columns.add(prefix + path[0])
+            columns.add(prefix + '__'.join(path))
+            relations.add(prefix + '__'.join(path[:-1]))
+        else:
+            columns.add(prefix + path[0])
+    return columns, relations
+
+
+def sort_columns(queryset):
+    """Colonnes du tri, lues par la pagination par curseur"""
+    columns = set()
+    for term in queryset.query.order_by or queryset.model._meta.ordering:
+        name = term.lstrip('-') if isinstance(term, str) else None
+        if name and name != 'pk' and name not in queryset.query.annotations:
+            columns.add(name)
+    return columns
+
+
+class SparseQuerysetMixin:
+    """
+    Vue dont le queryset suit `?fields=` / `?expand=`: seules les colonnes et
+    jointures utilisées par le serializer sont lues.
+
+    Appliqué aux actions `sparse_actions` via filter_queryset; les actions
+    personnalisées appellent `sparse_queryset()` elles-mêmes.
+    """
+    sparse_actions = ('list', 'retrieve')
+    # Champs toujours lus (ETag, permissions...), en plus de ceux du serializer
+    sparse_required_fields = ()
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        # Vue générique hors ViewSet: pas d'action, une seule lecture possible
+        action = getattr(self, 'action', None)
+        if action is None or action in self.sparse_actions:
+            queryset = self.sparse_queryset(queryset)
+        return queryset
+
+    def sparse_queryset(self, queryset):
+        params = self.request.query_params
+        if self.request.method not in permissions.SAFE_METHODS or not (
+            params.get(SparseFieldsMixin.fields_query_param)
+            or params.get(SparseFieldsMixin.expand_query_param)
+        ):
+            return queryset
+
+        found = serializer_columns(self.get_serializer())
+        if found is None:
+            return queryset
+        columns, relations = found
+
+        columns |= sort_columns(queryset) | set(self.sparse_required_fields)
+        queryset = queryset.select_related(None)
+        if relations:
+            queryset = queryset.select_related(*relations)
+        return queryset.only(*columns)
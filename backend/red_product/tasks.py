@@ -0,0 +1,45 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connections, transaction
+
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=getattr(settings, 'BACKGROUND_TASK_WORKERS', 2),
+            thread_name_prefix='red-product-tache',
+        )
+    return _executor
+
+
+def _run(func, args, kwargs):
+    try:
+        func(*args, **kwargs)
+    except Exception:
+        logger.exception("Échec de la tâche d'arrière-plan %s", func.__qualname__)
+    finally:
+        # Les connexions sont propres au thread: ne pas les laisser ouvertes
+        connections.close_all()
+
+
+def run_in_background(func, *args, **kwargs):
+    """
+    Exécuter `func` hors du cycle requête/réponse.
+
+    La tâche n'est soumise qu'après le commit de la transaction courante,
+    pour qu'elle voie les données écrites (et rien si la transaction est
+    annulée). Avec BACKGROUND_TASKS_EAGER, elle s'exécute directement au
+    commit, dans le thread appelant.
+    """
+    if getattr(settings, 'BACKGROUND_TASKS_EAGER', False):
+        transaction.on_commit(lambda: func(*args, **kwargs))
+    else:
+        transaction.on_commit(lambda: _get_executor().submit(_run, func, args, kwargs))
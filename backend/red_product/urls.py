@@ -1,11 +1,15 @@
+import re
+
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, include, re_path
 from django.conf import settings
 from django.conf.urls.static import static
 from rest_framework import permissions
 from drf_yasg.views import get_schema_view
 from drf_yasg import openapi
 
+from red_product.views import serve_media
+
 # Configuration de la documentation API (Swagger)
 schema_view = get_schema_view(
     openapi.Info(
@@ -35,8 +39,11 @@ urlpatterns = [
 ]
 
 # Configuration pour servir les fichiers media en développement
+# (photos adressées par contenu, cache immuable)
 if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+    urlpatterns += [
+        re_path(r'^%s(?P<path>.*)$' % re.escape(settings.MEDIA_URL.lstrip('/')), serve_media),
+    ]
     urlpatterns += static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
 
 # Configuration du site admin
@@ -0,0 +1,37 @@
+from django.conf import settings
+from django.utils.cache import get_conditional_response
+from django.views.static import serve
+
+from hotels.storage import CONTENT_ADDRESSED_RE
+
+
+# Un nom de fichier adressé par contenu ne change jamais de contenu: cache d'un an
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+
+def serve_media(request, path):
+    """
+    Servir un fichier media.
+
+    Les fichiers nommés par leur empreinte SHA-256 (voir
+    hotels.storage.ContentAddressedStorage) reçoivent un ETag fort dérivé de
+    l'empreinte et un Cache-Control `immutable`: ni le navigateur ni un CDN
+    n'ont besoin de les revalider. Les autres fichiers gardent le
+    comportement de django.views.static.serve.
+
+    Routée seulement en développement (DEBUG), comme avant: en production,
+    MEDIA_ROOT est servi par le serveur web ou le CDN, qui doit appliquer le
+    même Cache-Control aux chemins `hotels/<ab>/<sha256>.<ext>`.
+    """
+    match = CONTENT_ADDRESSED_RE.search(path)
+    if match is None:
+        return serve(request, path, document_root=settings.MEDIA_ROOT)
+
+    etag = '"%s%s"' % (match['digest'], match['suffix'] or '')
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = serve(request, path, document_root=settings.MEDIA_ROOT)
+    response['ETag'] = etag
+    response['Cache-Control'] = IMMUTABLE_CACHE_CONTROL
+    response.headers.pop('Last-Modified', None)
+    return response
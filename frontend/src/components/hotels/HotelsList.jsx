@@ -2,6 +2,9 @@ import React, { useState, useEffect } from 'react';
 import { Search } from 'lucide-react';
 import api from '../../api/api';
 
+// Largeur affichée des cartes selon la grille (1, 2 puis 4 colonnes)
+const CARD_SIZES = '(min-width: 1024px) 25vw, (min-width: 768px) 50vw, 100vw';
+
 const HotelsList = ({ token }) => {
   const [hotels, setHotels] = useState([]);
   const [search, setSearch] = useState('');
@@ -52,11 +55,23 @@ const HotelsList = ({ token }) => {
       <div className="grid grid-cols-1 md:grid-cols-2 lg:grid-cols-4 gap-6">
         {hotels.map((hotel) => (
           <div key={hotel.id} className="bg-white rounded-lg shadow overflow-hidden">
-            <img
-              src={hotel.image || 'https://via.placeholder.com/300x200'}
-              alt={hotel.nom}
-              className="w-full h-48 object-cover"
-            />
+            {/* Miniatures générées par le backend (image_srcset), photo originale en dernier recours */}
+            <picture>
+              {hotel.image_srcset?.avif && (
+                <source type="image/avif" srcSet={hotel.image_srcset.avif} sizes={CARD_SIZES} />
+              )}
+              {hotel.image_srcset?.webp && (
+                <source type="image/webp" srcSet={hotel.image_srcset.webp} sizes={CARD_SIZES} />
+              )}
+              <img
+                src={hotel.image || 'https://via.placeholder.com/300x200'}
+                srcSet={hotel.image_srcset?.jpeg}
+                sizes={CARD_SIZES}
+                alt={hotel.nom}
+                loading="lazy"
+                className="w-full h-48 object-cover"
+              />
+            </picture>
             <div className="p-4">
               <p className="text-xs text-gray-500 mb-1">{hotel.adresse}</p>
               <h3 className="font-semibold text-lg mb-2">{hotel.nom}</h3>